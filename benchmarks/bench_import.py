@@ -0,0 +1,40 @@
+"""
+times the import of simpleseg entry points in fresh interpreters, as a worker process or a script sees it
+
+python benchmarks/bench_import.py [--repeat 5]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+STATEMENTS = {
+    "python": "pass",
+    "import simpleseg": "import simpleseg",
+    "AbstractData, validate_data": "from simpleseg import AbstractData, validate_data",
+    "read_image": "from simpleseg.data.io import read_image",
+    "frame stats worker": "from simpleseg.data.frame_stats import frame_stats_worker",
+    "SegmentationApp": "from simpleseg import SegmentationApp",
+}
+
+
+def time_import(statement: str, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="the fastest of repeat runs is reported")
+    args = parser.parse_args()
+
+    for name, statement in STATEMENTS.items():
+        print(f"{name:30s} {time_import(statement, args.repeat) * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
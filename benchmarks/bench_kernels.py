@@ -0,0 +1,67 @@
+"""
+times the drawing and rendering kernels of every installed backend
+
+python benchmarks/bench_kernels.py [--size 4000]
+"""
+import argparse
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+from simpleseg.data.mask_ops import bresenham_circle_mask
+from simpleseg.gui.overlay import COLOR_LUT
+from simpleseg.kernels.backend import load_backend
+
+
+def timeit(func: Callable[[], Any], repeat: int = 5) -> float:
+    func()  # warm up, includes the jit compilation
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=4000, help="frames are size x size pixels")
+    args = parser.parse_args()
+    size = args.size
+
+    rng = np.random.default_rng(0)
+    img = rng.random((size, size, 1))
+    mask = rng.integers(0, 4, (size, size))
+    out = np.empty((size, size, 3))
+    img_uint16 = rng.integers(0, 4096, (size, size), dtype=np.uint16)
+    window_lut = np.clip((np.arange(65536) - 100) / 3000, 0.0, 1.0)
+    out_gray = np.empty((size, size))
+    brush_x, brush_y = bresenham_circle_mask(25)
+    stroke_x, stroke_y = rng.integers(0, size, 64), rng.integers(0, size, 64)
+    angles = np.linspace(0, 2 * np.pi, 500, endpoint=False)
+    lasso = np.column_stack((np.cos(angles), np.sin(angles))) * size / 3 + size / 2
+
+    for name in ("numpy", "numba"):
+        kernels = load_backend(name)
+        if kernels.NAME != name:
+            print(f"{name}: not installed")
+            continue
+        results = {
+            "bresenham_line": timeit(lambda kernels=kernels: kernels.bresenham_line(0, 0, size, size // 3)),
+            "draw_polyline (64 points, width 25)": timeit(
+                lambda kernels=kernels: kernels.draw_polyline(mask, stroke_x, stroke_y, brush_x, brush_y, 1)
+            ),
+            "colorize": timeit(lambda kernels=kernels: kernels.colorize(mask, COLOR_LUT, out)),
+            "lookup (uint16, window lut)": timeit(
+                lambda kernels=kernels: kernels.lookup(img_uint16, window_lut, out_gray)
+            ),
+            "blend_colorized": timeit(lambda kernels=kernels: kernels.blend_colorized(img, mask, COLOR_LUT, out)),
+            "polygon_mask (500 vertices)": timeit(lambda kernels=kernels: kernels.polygon_mask(lasso, mask.shape)),
+        }
+        for kernel, seconds in results.items():
+            print(f"{name:6s} {kernel:40s} {seconds * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,20 @@ from loguru import logger
 from PIL import Image
 from simpleseg import AbstractData
 from simpleseg.data.io import read_image
+from simpleseg.data.mask_archive import MaskArchive
 from simpleseg.validation.data_validation import is_2d_img, is_3d_img, is_float_img, is_int_img
 
 
 class DemoData(AbstractData):
-    def __init__(self, dataset_path: Path, name: str):
+    def __init__(self, dataset_path: Path, name: str, mask_archive_path: Optional[Path] = None):
+        """
+        mask_archive_path: if set, masks are saved to a single compressed mask archive instead of one file per mask
+        """
         assert isinstance(dataset_path, Path)
         self.dataset_path = dataset_path
         self.name = name.replace(" ", "_")
         self.path_handler = PathHandler(dataset_path)
+        self.mask_archive = MaskArchive(mask_archive_path) if mask_archive_path else None
 
     def __len__(self) -> int:
         return len(self.path_handler)
@@ -36,6 +41,11 @@ class DemoData(AbstractData):
         return img
 
     def get_mask(self, index: int) -> npt.NDArray[Any]:
+        if self.mask_archive is not None and index in self.mask_archive:
+            mask = self.mask_archive.read(index)
+            assert mask is not None
+            return mask
+
         mask_path: Optional[Path] = self.path_handler[index]["mask"]
         assert isinstance(mask_path, Path)
         if mask_path.is_file():
@@ -43,7 +53,7 @@ class DemoData(AbstractData):
         else:
             logger.info(f"mask with frame_index {index} not found")
             mask = self.get_image(index).copy()
-            if is_3d_img(mask):
+            if mask.ndim == 3:
                 mask = mask[..., 0]
             mask.fill(0)
             mask = mask.astype(int)
@@ -56,9 +66,22 @@ class DemoData(AbstractData):
 
         return mask
 
+    def get_mask_mtime(self, index: int) -> Optional[float]:
+        """
+        lets simpleseg notice masks changed by other programs, the records of a mask archive have no own time
+        """
+        if self.mask_archive is not None:
+            return None
+        mask_path = self.path_handler[index]["mask"]
+        assert isinstance(mask_path, Path)
+        return mask_path.stat().st_mtime if mask_path.is_file() else 0.0
+
     def save_mask(self, mask: npt.NDArray[Any], index: int) -> None:
         assert is_int_img(mask)
         assert is_2d_img(mask)
+        if self.mask_archive is not None:
+            self.mask_archive.write(mask, index)
+            return
         path = self.path_handler[index]["mask"]
         mask = mask.astype(np.uint8)
         im = Image.fromarray(mask)
@@ -4,17 +4,19 @@ from simpleseg import SegmentationApp, validate_data
 
 from example_data import DemoData
 
-datasets: list[DemoData] = [
-    DemoData(
-        dataset_path=Path(r"example_data/bw-data"),
-        name="bw demo data",
-    ),
-    DemoData(
-        dataset_path=Path(r"example_data/rgb-data"),
-        name="rgb demo data",
-    ),
-]
+if __name__ == "__main__":
+    # the guard is required, background jobs start worker processes that import this module
+    datasets: list[DemoData] = [
+        DemoData(
+            dataset_path=Path(r"example_data/bw-data"),
+            name="bw demo data",
+        ),
+        DemoData(
+            dataset_path=Path(r"example_data/rgb-data"),
+            name="rgb demo data",
+        ),
+    ]
 
-validate_data(datasets[0])
+    validate_data(datasets[0])
 
-gui = SegmentationApp(datasets=datasets, n_classes=3)
+    gui = SegmentationApp(datasets=datasets, n_classes=3)
@@ -1,5 +1,51 @@
-from simpleseg.app import SegmentationApp
-from simpleseg.data.dataclass import AbstractData
-from simpleseg.validation.dataclass_validation import validate_data
+"""
+the public names are imported on first access (PEP 562), `import simpleseg` does not load tkinter,
+matplotlib or scikit-image. headless data tooling and the worker processes of background jobs, which
+import simpleseg to unpickle their functions, only pay for the modules they use.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["SegmentationApp", "validate_data", "AbstractData"]
+if TYPE_CHECKING:
+    from simpleseg.app import SegmentationApp
+    from simpleseg.data.dataclass import AbstractData
+    from simpleseg.data.presegmentation import PresegmentationSettings
+    from simpleseg.data.remap import preview_remap_classes, remap_classes
+    from simpleseg.data.superpixels import SuperpixelSettings
+    from simpleseg.data.tiff_data import TiffStackData
+    from simpleseg.validation.dataclass_validation import validate_data
+
+# public name -> module defining it
+_LAZY_EXPORTS = {
+    "SegmentationApp": "simpleseg.app",
+    "validate_data": "simpleseg.validation.dataclass_validation",
+    "AbstractData": "simpleseg.data.dataclass",
+    "TiffStackData": "simpleseg.data.tiff_data",
+    "remap_classes": "simpleseg.data.remap",
+    "preview_remap_classes": "simpleseg.data.remap",
+    "PresegmentationSettings": "simpleseg.data.presegmentation",
+    "SuperpixelSettings": "simpleseg.data.superpixels",
+}
+
+__all__ = [
+    "SegmentationApp",
+    "validate_data",
+    "AbstractData",
+    "TiffStackData",
+    "remap_classes",
+    "preview_remap_classes",
+    "PresegmentationSettings",
+    "SuperpixelSettings",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module 'simpleseg' has no attribute '{name}'")
+    value = getattr(import_module(_LAZY_EXPORTS[name]), name)
+    globals()[name] = value  # later lookups do not go through __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,22 +1,51 @@
+import os
 import time
 import tkinter as tk
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Optional
 
+import numpy as np
 import numpy.typing as npt
 from loguru import logger
 from matplotlib.backend_bases import MouseButton
 
 from simpleseg.data.dataclass import AbstractData
+from simpleseg.data.frame_stats import FrameStatsIndex
+from simpleseg.data.mask_ops import count_changed_pixels, mask_operation, union_regions
+from simpleseg.data.morphology import MorphologyOperation
+from simpleseg.data.parallel import MaskJob
+from simpleseg.data.presegmentation import Presegmentation, PresegmentationSettings
+from simpleseg.data.propagation import Propagation, PropagationMethod
+from simpleseg.data.stroke_journal import StrokeJournal
+from simpleseg.data.superpixels import SuperpixelCache, Superpixels, SuperpixelSettings, compute_superpixels
+from simpleseg.data.work_queue import LEASE_RENEW_INTERVAL, WorkQueue
+from simpleseg.gui.display import (
+    IDENTITY_WINDOW,
+    ChannelMapping,
+    DisplayCache,
+    WindowLevel,
+    auto_window,
+    initial_channel_mapping,
+    initial_window,
+    intensity_range,
+)
 from simpleseg.gui.gui import GUI
 from simpleseg.gui.gui_canvasframe import CanvasFrameMpl
+from simpleseg.gui.gui_filmstrip import THUMBNAIL_SIZE, Filmstrip
 from simpleseg.gui.gui_mpl_tools import AvailableTools
 from simpleseg.gui.gui_tool_frame import ToolFrame
 from simpleseg.gui.gui_treeview import TreeViewDatasets, TreeViewFiles
-from simpleseg.gui.overlay import AvailableViewModes, ViewModeSelector
-from simpleseg.shared_variables import N_CLASSES_MAX
-from simpleseg.validation.data_validation import is_2d_img, is_3d_img, is_float_img, is_int_img
+from simpleseg.gui.interactions import InteractionRecorder
+from simpleseg.gui.overlay import AvailableViewModes, ViewCache, ViewModeSelector
+from simpleseg.gui.render_scheduler import PREVIEW_SIZE, RenderScheduler
+from simpleseg.gui.thumbnails import ThumbnailCache, make_thumbnail
+from simpleseg.gui.tk_worker import TkWorker
+from simpleseg.shared_variables import N_CLASSES_MAX, Region
+from simpleseg.validation.data_validation import is_2d_img, is_float_img, is_int_img, validate_image_specs
+
+# superpixels are computed ahead for the frames up to SUPERPIXEL_PREFETCH after the current frame
+SUPERPIXEL_PREFETCH = 2
 
 
 @dataclass
@@ -29,6 +58,11 @@ class AppState:
     _pencil_width: Optional[tk.IntVar] = None
     _tool_selected_int: Optional[tk.IntVar] = None
     _view_mode_selected_int: Optional[tk.IntVar] = None
+    _morphology_operation_int: Optional[tk.IntVar] = None
+    _morphology_radius: Optional[tk.IntVar] = None
+    _window_level: Optional[tk.DoubleVar] = None
+    _window_width: Optional[tk.DoubleVar] = None
+    _channels_selected: list[tk.BooleanVar] = field(default_factory=list)
 
     @property
     def n_classes(self) -> int:
@@ -57,6 +91,33 @@ class AppState:
         logger.warning("pencil width could not be derived from tk.IntVar")
         return 5
 
+    @property
+    def morphology_operation(self) -> MorphologyOperation:
+        assert isinstance(self._morphology_operation_int, tk.IntVar)
+        return MorphologyOperation(self._morphology_operation_int.get())
+
+    @property
+    def morphology_radius(self) -> int:
+        if self._morphology_radius:
+            radius = self._morphology_radius.get()
+            if 1 <= radius <= 50:
+                return radius
+        logger.warning("morphology radius could not be derived from tk.IntVar")
+        return 1
+
+    @property
+    def window_level(self) -> WindowLevel:
+        if self._window_level and self._window_width:
+            width = self._window_width.get()
+            if width > 0:
+                return WindowLevel.from_level_width(self._window_level.get(), width)
+        logger.warning("window could not be derived from tk.DoubleVar")
+        return IDENTITY_WINDOW
+
+    @property
+    def selected_channels(self) -> tuple[int, ...]:
+        return tuple(channel for channel, selected in enumerate(self._channels_selected) if selected.get())
+
     @property
     def tool_selected(self) -> AvailableTools:
         assert isinstance(self._tool_selected_int, tk.IntVar)
@@ -72,87 +133,404 @@ class SegmentationApp:
     cache_img: dict[int, npt.NDArray[Any]] = dict()
     cache_mask: dict[int, npt.NDArray[Any]] = dict()
     cache_mask_overwrite: dict[int, npt.NDArray[Any]] = dict()
+    dirty_regions: dict[int, Optional[Region]] = dict()  # edited regions of the modified masks, None: unknown
+    unjournaled: set[int] = set()  # modified masks from background jobs, journaled with their first edit
+    saving: dict[int, npt.NDArray[Any]] = dict()  # mask of the last save submitted per frame, until it is written
 
     def __init__(
         self,
         datasets: list[AbstractData],
         n_classes: int = 1,
+        thumbnail_dir: Optional[Path] = None,
+        render_threads: int = 1,
+        presegmentation: Optional[PresegmentationSettings] = None,
+        superpixel_settings: Optional[SuperpixelSettings] = None,
+        record_path: Optional[Path] = None,
+        work_queue_batch: int = 0,
+        annotator: Optional[str] = None,
     ) -> None:
+        """
+        thumbnail_dir: if set, filmstrip thumbnails of saved masks are cached on disk in thumbnail_dir/<dataset name>/
+        render_threads: if > 1, large frames are rendered in row bands on that many threads
+        presegmentation: if set, empty masks are pre-segmented in the background and show up as modified masks
+        superpixel_settings: segmentation used by the superpixel tool, slic with default parameters if not set
+        record_path: if set, pencil, lasso and navigation events are recorded to this file (.gz: compressed),
+            see replay_interactions()
+        work_queue_batch: if > 0, several annotators can work on a dataset at the same time. frames are leased
+            in batches of this size via lock files next to the dataset, the file list shows the claimed frames,
+            saved frames are released and frames leased by others cannot be saved, see WorkQueue
+        annotator: owner of the leases, user@host:pid if not set. must differ between concurrent sessions,
+            a restarted session with the same annotator gets its leases and its unsaved edits (journal) back
+        """
         assert isinstance(n_classes, int)
         assert 1 <= n_classes <= N_CLASSES_MAX
+        assert presegmentation is None or presegmentation.n_classes <= n_classes
+        assert work_queue_batch >= 0
         self.state = AppState(_n_classes_init_val=n_classes)
 
         self.gui = GUI(app=self)
         self.tool_frame: ToolFrame = self.gui.sidebar_left
         self.view_mode_selector = ViewModeSelector(self.state)
+        self.view_mode_selector.set_render_threads(render_threads)
+        # views dropping out of the cache are reused as render buffers
+        self.view_cache = ViewCache(on_evict=self.view_mode_selector.buffers.release)
+        self.display_cache = DisplayCache()  # images of the current window, if the dataset needs one
         self.canvas_frame: CanvasFrameMpl = self.gui.canvas_frame
         self.tree_frames: TreeViewFiles = self.gui.sidebar_treeview_frames
         self.tree_datasets: TreeViewDatasets = self.gui.sidebar_treeview_datasets
+        self.render_scheduler = RenderScheduler(
+            self.gui.root, render_full=self.render_frame, render_preview=self.render_preview
+        )
+        self.filmstrip: Filmstrip = self.gui.filmstrip
+        self.thumbnail_dir = thumbnail_dir
+
+        # reading runs on two threads, writing on one thread to keep saves of a frame in order
+        self.io_reader = TkWorker(self.gui.root, max_workers=2, name="reader")
+        self.io_writer = TkWorker(self.gui.root, max_workers=1, name="writer")
+        self.thumbnail_worker = TkWorker(self.gui.root, max_workers=2, name="thumbnails")
+        self.superpixel_worker = TkWorker(self.gui.root, max_workers=1, name="superpixels")
+        self.superpixel_settings = superpixel_settings or SuperpixelSettings()
+        self.superpixel_cache = SuperpixelCache()
+        self.dataset_generation = 0  # incremented on dataset change, results for an old dataset are dropped
+        self.journal = StrokeJournal(None)  # replaced by the journal of the dataset in load_dataset()
+        self.recorder = InteractionRecorder(record_path)
+        self.presegmentation_settings = presegmentation
+        self.mask_jobs: list[MaskJob] = []  # background jobs filling masks, e.g. pre-segmentation
+        self.work_queue_batch = work_queue_batch
+        self.annotator = annotator
+        self.work_queue = WorkQueue(None)  # replaced by the work queue of the dataset in load_dataset()
+        self.stats_index = FrameStatsIndex(0)  # replaced by the index of the dataset in load_dataset()
 
         self.datasets: list[AbstractData] = datasets
         self.dataset_names: list[str] = [item.name for item in datasets]
         self.tree_datasets.init_tree(self.dataset_names)
 
         self.load_dataset_by_id(0)
+        self.poll_frame_stats()
+        self.poll_mask_jobs()
+        self.poll_work_queue()
         tk.mainloop()
+        self.stats_index.cancel()
+        self.io_writer.shutdown()
+        self.work_queue.release_all()
+        self.journal.close()
+        self.recorder.close(self.get_mask)
 
     def reset_caches(self) -> None:
         self.cache_img.clear()
         self.cache_mask.clear()
         self.cache_mask_overwrite.clear()
+        self.dirty_regions.clear()
+        self.unjournaled.clear()
+        self.saving.clear()
 
     def get_img(self, index) -> npt.NDArray[Any]:
         if index in self.cache_img:
             return self.cache_img[index]
         else:
-            img = self.dataset.get_image(index)
-            assert is_float_img(img)
-            assert img.shape == self.resolution
+            img = self.read_img(index)
             self.cache_img[index] = img
             return img
 
+    def read_img(self, index) -> npt.NDArray[Any]:
+        """reads from the dataset without touching the caches, safe to call from worker threads"""
+        img = self.dataset.get_image(index)
+        assert is_float_img(img) if self.default_window is None else validate_image_specs(img)
+        assert img.shape == self.resolution
+        return img
+
+    def get_window(self) -> Optional[WindowLevel]:
+        """None: the images are floats in [0, 1] and the window is not adjusted, they are shown as they are"""
+        window = self.state.window_level
+        if self.default_window is None and window == IDENTITY_WINDOW:
+            return None
+        return window
+
+    def get_channel_mapping(self) -> Optional[ChannelMapping]:
+        """None for gray and rgb images"""
+        if self.default_mapping is None:
+            return None
+        return ChannelMapping.from_channels(self.state.selected_channels)
+
+    def get_display_img(self, index: int) -> npt.NDArray[Any]:
+        """
+        the image mapped through the current window and channel mapping, gray or rgb float in [0, 1].
+        computed on first use and cached per (frame, channel mapping), see DisplayCache
+        """
+        img = self.get_img(index)
+        window, mapping = self.get_window(), self.get_channel_mapping()
+        if window is None and mapping is None:
+            return img
+        return self.display_cache.get(index, img, window, mapping, renderer=self.view_mode_selector.renderer)
+
+    def set_window(self, window: WindowLevel):
+        self.tool_frame.set_window(window)
+        self.refresh_images()
+
+    def auto_window(self):
+        """saturates the darkest and brightest pixels of the current frame"""
+        self.set_window(auto_window(self.get_current_img()))
+
+    def read_mask(self, index) -> npt.NDArray[Any]:
+        """
+        reads from the dataset without touching the caches, safe to call from worker threads.
+        the returned mask is read-only, it is shared by the clean mask cache and the views.
+        """
+        mask = self.dataset.get_mask(index)
+        assert is_int_img(mask)
+        assert mask.shape == self.resolution[:2]
+        mask = mask.view()  # the dataset might keep a reference, only the view is made read-only
+        mask.flags.writeable = False
+        return mask
+
+    def frame_is_loaded(self, index) -> bool:
+        return index in self.cache_img and (index in self.cache_mask or index in self.cache_mask_overwrite)
+
+    def load_frame_async(self, index: int):
+        """
+        reads image and mask of a frame on a worker thread, the previous frame stays on screen meanwhile.
+        the result is cached in any case, it is only drawn if the frame is still selected.
+        """
+        generation = self.dataset_generation
+        load_img = index not in self.cache_img
+        load_mask = index not in self.cache_mask and index not in self.cache_mask_overwrite
+
+        def load():
+            img = self.read_img(index) if load_img else None
+            mask = self.read_mask(index) if load_mask else None
+            return img, mask
+
+        def on_done(result):
+            if generation != self.dataset_generation:
+                return
+            img, mask = result
+            if img is not None:
+                self.cache_img.setdefault(index, img)
+            if mask is not None:
+                self.cache_mask.setdefault(index, mask)
+            if index == self.current_frame_index:
+                self.canvas_frame.set_title(self.frame_names[index])
+                self.refresh_images()
+
+        def on_error(exception: BaseException):
+            if generation != self.dataset_generation:
+                logger.opt(exception=exception).warning(f"reading frame {index} of the previous dataset failed")
+                return
+            self.on_io_error(exception)
+
+        self.canvas_frame.set_title(f"loading {self.frame_names[index]} ...")
+        self.io_reader.submit(load, on_done=on_done, on_error=on_error)
+
+    def request_thumbnail(self, index: int):
+        """
+        renders the thumbnail of a frame on the thumbnail workers.
+        requests of frames that scrolled out of the filmstrip before their turn are skipped.
+        """
+        if index in self.thumbnail_requests:
+            return
+        self.thumbnail_requests.add(index)
+        generation = self.dataset_generation
+        thumbnail_generation = self.thumbnails.generation(index)
+        # the current window and channels are not applied, thumbnails are cached on disk
+        window, mapping = self.default_window, self.default_mapping
+        img = self.cache_img.get(index)
+        is_modified = index in self.cache_mask_overwrite
+        mask = self.cache_mask_overwrite[index] if is_modified else self.cache_mask.get(index)
+        mask_time = None if is_modified else self.get_mask_time(index)
+
+        def render():
+            if index not in self.filmstrip.slots:
+                return None
+            img_thumbnail = img if img is not None else self.read_img(index)
+            mask_thumbnail = mask if mask is not None else self.read_mask(index)
+            return make_thumbnail(img_thumbnail, mask_thumbnail, THUMBNAIL_SIZE, window, mapping)
+
+        def on_done(thumbnail):
+            if generation != self.dataset_generation:
+                return
+            self.thumbnail_requests.discard(index)
+            if thumbnail is not None:
+                self.thumbnails.put(index, thumbnail, thumbnail_generation, mask_time)
+                self.filmstrip.update_thumbnail(index)
+
+        def on_error(exception: BaseException):
+            self.thumbnail_requests.discard(index)
+            logger.opt(exception=exception).warning(f"could not render thumbnail of frame {index}")
+
+        self.thumbnail_worker.submit(render, on_done=on_done, on_error=on_error)
+
+    def get_mask_time(self, index: int) -> Optional[float]:
+        """time of the stored mask according to the frame stats, None while the stats are missing"""
+        stats = self.stats_index[index]
+        return None if stats is None else stats.timestamp
+
+    def get_thumbnail(self, index: int) -> Optional[npt.NDArray[np.uint8]]:
+        return self.thumbnails.get(index, self.get_mask_time(index))
+
+    def request_superpixels(self, index: int):
+        """computes the superpixels of a frame on the superpixel worker, they are cached per (frame, settings)"""
+        key = (index, self.superpixel_settings)
+        if key in self.superpixel_cache or key in self.superpixel_requests:
+            return
+        self.superpixel_requests.add(key)
+        generation = self.dataset_generation
+        img = self.cache_img.get(index)
+
+        def compute():
+            return compute_superpixels(img if img is not None else self.read_img(index), key[1])
+
+        def on_done(superpixels: Superpixels):
+            if generation != self.dataset_generation:
+                return
+            self.superpixel_requests.discard(key)
+            self.superpixel_cache.put(key, superpixels)
+
+        def on_error(exception: BaseException):
+            self.superpixel_requests.discard(key)
+            logger.opt(exception=exception).warning(f"could not compute superpixels of frame {index}")
+
+        self.superpixel_worker.submit(compute, on_done=on_done, on_error=on_error)
+
+    def prefetch_superpixels(self):
+        for offset in range(SUPERPIXEL_PREFETCH + 1):
+            self.request_superpixels((self.current_frame_index + offset) % self.n)
+
+    def get_superpixels(self, index: int) -> Optional[Superpixels]:
+        """
+        the cached superpixels of a frame, None while they are computed. superpixels are not computed on the
+        tk thread, a frame that was not prefetched is requested and the click has to be repeated
+        """
+        superpixels = self.superpixel_cache.get((index, self.superpixel_settings))
+        if superpixels is None:
+            self.request_superpixels(index)
+            self.canvas_frame.set_title(f"{self.frame_names[index]} (computing superpixels, click again in a moment)")
+        return superpixels
+
+    def mask_version(self, index: int) -> int:
+        return self.mask_versions.get(index, 0)
+
+    def bump_mask_version(self, index: int):
+        """called whenever the mask shown for a frame changes, outdates cached views and thumbnails"""
+        self.mask_versions[index] = self.mask_version(index) + 1
+        self.thumbnails.invalidate(index)
+        self.filmstrip.update_thumbnail(index)
+
+    def on_io_error(self, exception: BaseException):
+        logger.opt(exception=exception).error("reading or writing the dataset failed")
+        self.canvas_frame.set_title(f"error: {exception}")
+
     def get_mask(self, index) -> npt.NDArray[Any]:
+        """returns a read-only mask without copying, use get_mask_for_edit() to modify it"""
         if index in self.cache_mask_overwrite:
-            return self.cache_mask_overwrite[index]
+            mask = self.cache_mask_overwrite[index].view()
+            mask.flags.writeable = False
+            return mask
         elif index in self.cache_mask:
-            return self.cache_mask[index].copy()
+            return self.cache_mask[index]
         else:
-            mask = self.dataset.get_mask(index)
-            assert is_int_img(mask)
-            assert mask.shape == self.resolution[:2]
+            mask = self.read_mask(index)
             self.cache_mask[index] = mask
             return mask
 
+    def get_mask_for_edit(self, index) -> npt.NDArray[Any]:
+        """
+        copy on write access to a mask. the modified mask of a frame is edited in place,
+        a clean mask is copied once and has to be handed back with set_mask() to become the modified mask.
+        """
+        if index in self.cache_mask_overwrite:
+            return self.cache_mask_overwrite[index]
+        return self.get_mask(index).copy()
+
     def save_mask(self, frame_index: int):
+        """
+        writes the mask on the writer thread. the frame stays modified until the write finished,
+        it is only marked clean (and its lease released) if it was not edited again in the meantime.
+        the stored mask has to equal the clean mask the edit started from, a mask saved meanwhile by
+        another annotator is not overwritten.
+        """
         if frame_index not in self.cache_mask_overwrite:
             logger.warn("cannot save_mask(), index not in cache_mask_overwrite")
             return
-        old_mask = self.dataset.get_mask(frame_index)
-        new_mask = self.cache_mask_overwrite[frame_index]
-        if old_mask.shape != new_mask.shape:
-            logger.error("cannot save_mask(), shape of new and old mask mismatch")
-            return
+        new_mask = self.cache_mask_overwrite[frame_index].copy()
         assert is_int_img(new_mask)
         assert is_2d_img(new_mask)
-        self.dataset.save_mask(new_mask, frame_index)
-        self.cache_mask[frame_index] = self.cache_mask_overwrite[frame_index]
-        self.discard_mask(frame_index)
+        if not self.work_queue.claim(frame_index):
+            owner = self.work_queue.owner_of(frame_index) or "another annotator"
+            logger.error(f"cannot save_mask(), frame {frame_index} is leased by {owner}")
+            self.canvas_frame.set_title(f"not saved, {self.frame_names[frame_index]} is leased by {owner}")
+            return
+        generation = self.dataset_generation
+        dataset = self.dataset
+        stats_index = self.stats_index
+        frame_name = self.frame_names[frame_index]
+        # a save still waiting for the writer is written first, it is the clean mask of this save.
+        # None for masks never read (results of background jobs), the stored mask is not checked then
+        base_mask = self.saving.get(frame_index, self.cache_mask.get(frame_index))
+        self.saving[frame_index] = new_mask
+
+        def write() -> Optional[str]:
+            """returns an error message, None if the mask was saved"""
+            old_mask = dataset.get_mask(frame_index)
+            if old_mask.shape != new_mask.shape:
+                logger.error("cannot save_mask(), shape of new and old mask mismatch")
+                return f"not saved, the mask shape of {frame_name} changed"
+            if np.array_equal(old_mask, new_mask):
+                return None  # nothing to write
+            if base_mask is not None and not np.array_equal(old_mask, base_mask):
+                logger.error(f"cannot save_mask(), frame {frame_index} was saved by someone else meanwhile")
+                return f"not saved, {frame_name} was changed by someone else"
+            dataset.save_mask(new_mask, frame_index)
+            stats_index.update(frame_index, new_mask, dataset.get_mask_mtime(frame_index))
+            return None
+
+        def on_done(error: Optional[str]):
+            if generation != self.dataset_generation:
+                return
+            if self.saving.get(frame_index) is new_mask:
+                del self.saving[frame_index]
+            if error is not None:
+                self.canvas_frame.set_title(error)
+                return
+            new_mask.flags.writeable = False
+            self.cache_mask[frame_index] = new_mask
+            current_mask = self.cache_mask_overwrite.get(frame_index)
+            if current_mask is not None and np.array_equal(current_mask, new_mask):
+                self.discard_mask(frame_index)
+                self.finish_frame(frame_index)
+            else:
+                # edited while writing, the edited regions refer to the previous clean mask.
+                # the lease is kept until the edits are saved as well
+                self.dirty_regions[frame_index] = None
+                self.bump_mask_version(frame_index)
+
+        def on_error(exception: BaseException):
+            if generation == self.dataset_generation and self.saving.get(frame_index) is new_mask:
+                del self.saving[frame_index]  # not written, the next save starts from the clean mask again
+            self.on_io_error(exception)
+
+        self.io_writer.submit(write, on_done=on_done, on_error=on_error)
 
     def save_current_mask(self):
         self.save_mask(self.current_frame_index)
 
     def save_all_masks(self):
-        for frame_index in self.cache_mask_overwrite.keys():
+        for frame_index in list(self.cache_mask_overwrite.keys()):
             self.save_mask(frame_index)
 
     def discard_mask(self, frame_index: int):
+        """also called when a save finished, the journal of the frame is not needed anymore in both cases"""
         del self.cache_mask_overwrite[frame_index]
+        self.dirty_regions.pop(frame_index, None)
+        self.unjournaled.discard(frame_index)
+        self.journal.drop(frame_index)
+        self.bump_mask_version(frame_index)
         self.refresh_images()
         self.refresh_modified_masks_state()
         self.update_button_states()
         self.update_tree_list()
 
     def discard_current_mask(self):
+        self.recorder.record("discard", frame=self.current_frame_index)
         self.discard_mask(self.current_frame_index)
 
     def get_current_img(self) -> npt.NDArray[Any]:
@@ -163,11 +541,57 @@ class SegmentationApp:
         frame_index = self.current_frame_index
         return self.get_mask(frame_index)
 
-    def set_current_mask(self, mask: npt.NDArray[Any], update: bool = True):
+    def set_current_mask(
+        self,
+        mask: npt.NDArray[Any],
+        update: bool = True,
+        region: Optional[Region] = None,
+        operation: Optional[dict[str, Any]] = None,
+    ):
+        self.set_mask(self.current_frame_index, mask, update=update, region=region, operation=operation)
+
+    def set_mask(
+        self,
+        frame_index: int,
+        mask: npt.NDArray[Any],
+        update: bool = True,
+        region: Optional[Region] = None,
+        operation: Optional[dict[str, Any]] = None,
+        journal: bool = True,
+    ):
+        """
+        stores mask as the modified mask of the frame, the app takes ownership of the array.
+        region: bounding box of the edited pixels, None if unknown.
+        operation: the edit as mask operation (see mask_ops) for the journal, the whole mask is journaled without it.
+        journal: False for masks that can be computed again (results of background jobs), such a frame is
+            journaled as a whole mask with its first edit.
+        the edited regions are collected per frame, if the mask equals the clean mask inside them
+        the frame reverts to clean, e.g. after painting and erasing the same pixels.
+        """
         assert is_2d_img(mask)
         assert is_int_img(mask)
-        frame_index = self.current_frame_index
-        self.cache_mask_overwrite[frame_index] = mask
+        assert mask.flags.writeable, "pass a mask from get_mask_for_edit()"
+        if frame_index in self.cache_mask_overwrite:
+            previous_region = self.dirty_regions.get(frame_index)
+            region = None if previous_region is None or region is None else union_regions(previous_region, region)
+        clean_mask = self.cache_mask.get(frame_index)
+        whole_frame = (slice(None), slice(None))
+        if clean_mask is not None and count_changed_pixels(mask, clean_mask, region or whole_frame) == 0:
+            self.cache_mask_overwrite.pop(frame_index, None)
+            self.dirty_regions.pop(frame_index, None)
+            self.unjournaled.discard(frame_index)
+            self.journal.drop(frame_index)
+        else:
+            self.cache_mask_overwrite[frame_index] = mask
+            self.dirty_regions[frame_index] = region
+            if not journal:
+                self.unjournaled.add(frame_index)
+            elif frame_index in self.unjournaled:
+                self.unjournaled.discard(frame_index)
+                self.journal.append(frame_index, mask_operation(mask))  # the job result and the edit
+            else:
+                self.journal.append(frame_index, operation if operation is not None else mask_operation(mask))
+        self.bump_mask_version(frame_index)
         if update:
             self.update_all_new_func()
 
@@ -184,25 +608,148 @@ class SegmentationApp:
     def update_tree_list(self):
         self.tree_frames.update_tree(self.is_modified_list)
 
+    def poll_frame_stats(self):
+        """the frame stats are computed in the background, the file list picks up new results periodically"""
+        self.tree_frames.update_stats(self.stats_index)
+        self.gui.root.after(500, self.poll_frame_stats)
+
+    def poll_mask_jobs(self):
+        """results of the background jobs become modified masks, frames edited or labelled meanwhile are skipped"""
+        n_results = 0
+        for job in self.mask_jobs:
+            for frame_index, mask in job.pop_results():
+                clean_mask = self.cache_mask.get(frame_index)
+                stats = self.stats_index[frame_index]
+                if frame_index in self.cache_mask_overwrite or (clean_mask is not None and clean_mask.any()):
+                    continue
+                if stats is not None and stats.labelled:
+                    continue
+                if clean_mask is None:
+                    # the job found the stored mask empty, a save checks that it still is
+                    clean_mask = np.zeros_like(mask)
+                    clean_mask.flags.writeable = False
+                    self.cache_mask[frame_index] = clean_mask
+                self.set_mask(frame_index, mask, update=False, journal=False)
+                n_results += 1
+        self.mask_jobs = [job for job in self.mask_jobs if job.running or not job.results.empty()]
+        if n_results:
+            self.update_all_new_func()
+        self.gui.root.after(500, self.poll_mask_jobs)
+
+    def poll_work_queue(self):
+        """renews the leases, frames taken over by others after their lease expired drop out of the claimed frames"""
+        if self.work_queue.renew():
+            self.tree_frames.update_claimed()
+        self.gui.root.after(int(LEASE_RENEW_INTERVAL * 1000), self.poll_work_queue)
+
+    def claim_frames(self):
+        """
+        claims the next batch of frames without labels that were not saved in this session yet,
+        frames with recovered edits come first
+        """
+        if not self.work_queue.enabled:
+            return
+        self.stats_index.refresh()  # frames labelled by the other annotators
+
+        def is_open(index: int) -> bool:
+            stats = self.stats_index[index]
+            return index not in self.finished_frames and (stats is None or not stats.labelled)
+
+        recovered = [index for index in self.journal.frames() if index not in self.finished_frames]
+        candidates = [*recovered, *filter(is_open, range(self.n))]
+        if not self.work_queue.claim_batch(candidates, self.work_queue_batch):
+            logger.info("no frames left to claim")
+        self.tree_frames.update_claimed()
+
+    def finish_frame(self, frame_index: int):
+        """a saved frame is released, the next batch is claimed when all claimed frames are done"""
+        if not self.work_queue.enabled:
+            return
+        self.work_queue.release(frame_index)
+        self.finished_frames.add(frame_index)
+        if self.work_queue.claimed:
+            self.tree_frames.update_claimed()
+        else:
+            self.claim_frames()
+
+    def cancel_mask_jobs(self):
+        for job in self.mask_jobs:
+            job.cancel()
+        self.mask_jobs = []
+
     def refresh_modified_masks_state(self):
         self.is_modified_list = [self.mask_is_modified(index) for index in range(self.n)]
         self.any_frame_modified = any(self.is_modified_list)
 
     def set_frame_index_prev(self):
-        self.set_frame_index(self.current_frame_index - 1)
+        self.set_frame_index(self.step_frame_index(-1))
 
     def set_frame_index_next(self):
-        self.set_frame_index(self.current_frame_index + 1)
+        self.set_frame_index(self.step_frame_index(1))
+
+    def step_frame_index(self, step: int) -> int:
+        """with claimed frames the steps go from claimed frame to claimed frame, wrapping around"""
+        claimed = sorted(self.work_queue.claimed)
+        if not claimed:
+            return self.current_frame_index + step
+        if step > 0:
+            later = [index for index in claimed if index > self.current_frame_index]
+            return later[0] if later else claimed[0]
+        earlier = [index for index in claimed if index < self.current_frame_index]
+        return earlier[-1] if earlier else claimed[-1]
 
     def set_frame_index(self, frame_index: int):
+        """the frame is drawn by the render scheduler, rapid changes are merged into one render"""
         self.current_frame_index = frame_index
         self.check_frame_range()
-        self.refresh_images()
+        self.recorder.record("frame", index=self.current_frame_index)
+        self.filmstrip.show(self.current_frame_index)
+        self.tree_frames.select(self.current_frame_index)
         self.update_button_states()
+        self.render_scheduler.request(self.current_frame_index)
+        if self.state.tool_selected is AvailableTools.SUPERPIXEL:
+            self.prefetch_superpixels()
+
+    def render_frame(self, frame_index: int):
+        if frame_index != self.current_frame_index:
+            return
+        if self.frame_is_loaded(frame_index):
+            self.canvas_frame.set_title(self.get_frame_title(frame_index))
+            self.refresh_images()
+        else:
+            self.load_frame_async(frame_index)
+
+    def get_frame_title(self, frame_index: int) -> str:
+        title = self.frame_names[frame_index]
+        if self.work_queue.is_leased_by_other(frame_index):
+            title += f" (leased by {self.work_queue.owner_of(frame_index)})"
+        return title
+
+    def render_preview(self, frame_index: int):
+        """
+        cheap stand-in while scrubbing through frames, nothing is read from disk:
+        a cached view, the thumbnail or a reduced resolution overlay of a loaded frame
+        """
+        if frame_index != self.current_frame_index:
+            return
+        if self.view_cache.get(self.get_view_key(frame_index), self.get_window()) is not None:
+            self.render_frame(frame_index)
+            return
+        title = f"{self.frame_names[frame_index]} (preview)"
+        preview = self.get_thumbnail(frame_index)
+        if preview is None and self.frame_is_loaded(frame_index):
+            img, mask = self.get_img(frame_index), self.get_mask(frame_index)
+            preview = make_thumbnail(img, mask, PREVIEW_SIZE, self.get_window(), self.get_channel_mapping())
+        if preview is None:
+            title = f"{self.frame_names[frame_index]} ..."
+        else:
+            self.canvas_frame.draw_preview(preview)
+        self.canvas_frame.set_title(title)
 
     def check_frame_range(self):
+        """wraps around at both ends"""
         lower_boundary = 0
-        upper_boundary = self.n
+        upper_boundary = self.n - 1
         if self.current_frame_index < lower_boundary:
             self.current_frame_index = upper_boundary
         if self.current_frame_index > upper_boundary:
@@ -216,31 +763,103 @@ class SegmentationApp:
         return frame_index in self.cache_mask_overwrite.keys()
 
     def load_dataset(self, dataset: AbstractData):
+        self.dataset_generation += 1
         self.dataset = dataset
         self.n = len(dataset)
-        self.resolution = dataset.get_image(0).shape
+        img = dataset.get_image(0)
+        self.resolution = img.shape
+        self.default_window = initial_window(img)
+        self.tool_frame.set_window_range(*intensity_range(img))
+        self.tool_frame.set_window(self.default_window or IDENTITY_WINDOW)
+        self.default_mapping = initial_channel_mapping(img)
+        self.tool_frame.set_channels(img.shape[-1] if self.default_mapping else 0)
+        self.display_cache.clear()
         self.canvas_frame.init_imshow(self.resolution)
         self.reset_caches()
+        self.cache_img[0] = img
+        self.io_writer.drain()  # a lease is released after its frame was written
+        self.work_queue.release_all()
+        self.work_queue = WorkQueue(None)
+        self.journal.close()
+        if self.work_queue_batch:
+            self.work_queue = WorkQueue.for_dataset(dataset, owner=self.annotator)
+            # every annotator journals (and recovers) only its own edits
+            self.journal = StrokeJournal.for_dataset(dataset, owner=self.work_queue.owner)
+        else:
+            self.journal = StrokeJournal.for_dataset(dataset)
+        self.recover_from_journal()
         self.refresh_modified_masks_state()
-        self.tree_frames.init_tree(dataset.get_frame_names())
-        self.set_frame_index(0)
-        self.refresh_images()
+        self.stats_index.cancel()
+        self.stats_index = FrameStatsIndex.for_dataset(dataset)
+        self.stats_index.compute_in_background(dataset)
+        self.finished_frames: set[int] = set()  # saved in this session, not claimed again
+        self.cancel_mask_jobs()
+        self.start_presegmentation()
+        self.thumbnails = ThumbnailCache(cache_dir=self.thumbnail_dir / dataset.name if self.thumbnail_dir else None)
+        self.thumbnail_requests: set[int] = set()
+        self.superpixel_cache.clear()
+        self.superpixel_requests: set[tuple[int, SuperpixelSettings]] = set()
+        self.mask_versions: dict[int, int] = {}
+        self.view_cache.clear()
+        self.view_mode_selector.buffers.clear()  # the resolution may have changed
+        self.frame_names = dataset.get_frame_names()
+        self.tree_frames.init_tree(self.frame_names)
+        self.render_scheduler.cancel()
+        self.claim_frames()
+        if self.work_queue.enabled:
+            self.tree_frames.set_filter(TreeViewFiles.FILTER_CLAIMED)
+        self.set_frame_index(min(self.work_queue.claimed, default=0))
+
+    def start_presegmentation(self):
+        """frames with recovered edits are left out"""
+        if self.presegmentation_settings is None:
+            return
+        indices = [index for index in range(self.n) if index not in self.cache_mask_overwrite]
+        n_workers = max(1, (os.cpu_count() or 2) - 1)  # leave a core for the gui
+        presegmentation = Presegmentation(self.dataset, self.presegmentation_settings)
+        presegmentation.start(indices, n_workers)
+        self.mask_jobs.append(presegmentation)
+
+    def propagate_keyframes(self, method: PropagationMethod):
+        """
+        fills the unlabelled frames between the labelled keyframes (saved or modified) in the background,
+        the results show up as modified masks
+        """
+        modified_masks = {index: mask.copy() for index, mask in self.cache_mask_overwrite.items()}
+        labelled = {}
+        for index in range(self.n):
+            stats = self.stats_index[index]
+            if stats is not None:
+                labelled[index] = stats.labelled
+        propagation = Propagation(self.dataset, method, modified_masks, labelled)
+        propagation.start()
+        self.mask_jobs.append(propagation)
+
+    def recover_from_journal(self):
+        """unsaved edits of a previous session that did not end normally become modified masks again"""
+        recovered = []
+        for frame_index, clean_mask, mask in self.journal.replay(self.read_mask, self.n):
+            self.cache_mask[frame_index] = clean_mask
+            if count_changed_pixels(mask, clean_mask, (slice(None), slice(None))):
+                self.cache_mask_overwrite[frame_index] = mask
+                self.dirty_regions[frame_index] = None
+                recovered.append(frame_index)
+            else:
+                self.journal.drop(frame_index)
+        if recovered:
+            logger.info(f"recovered unsaved edits of frames {recovered} from {self.journal.path}")
 
     def get_mask_dirs_of_dataset(self, dataset_path: Path) -> list[Path]:
         dataset_path = Path(dataset_path)
         mask_dirs = [f for f in dataset_path.iterdir() if f.is_dir() and "masks" in str(f)]
         return mask_dirs
 
-    def img_2d_to_3d(self, img: npt.NDArray[Any]) -> npt.NDArray[Any]:
-        if is_2d_img(img):
-            img = img[..., None].repeat(3, axis=-1)
-        assert is_3d_img(img)
-        return img
-
     def refresh_images(self):
         """
         here all images are float
         """
+        if not self.frame_is_loaded(self.current_frame_index):
+            return  # drawn by load_frame_async() when the frame is loaded
         logger.debug("time: refresh_images")
         t0 = time.perf_counter()
 
@@ -249,16 +868,33 @@ class SegmentationApp:
 
         logger.debug(time.perf_counter() - t0)
 
+    def get_view_key(self, frame_index: int) -> tuple:
+        """the window is not part of the key, it is the variant of the cached view (see ViewCache)"""
+        mask_version = self.mask_version(frame_index)
+        view_mode = self.state.view_strategy_selected
+        return (frame_index, mask_version, view_mode, self.get_channel_mapping())
+
     def get_current_overlay(self):
-        img = self.get_current_img()
-        mask = self.get_current_mask()
-        special_3d_float = self.view_mode_selector.get_view(img, mask)
+        """
+        views are cached per (frame, mask version, view mode, channel mapping) with the window they were
+        rendered with, revisiting a frame or mode is a lookup
+        """
+        frame_index = self.current_frame_index
+        key, window = self.get_view_key(frame_index), self.get_window()
+        special_3d_float = self.view_cache.get(key, window)
+        if special_3d_float is None:
+            img = self.get_display_img(frame_index)
+            mask = self.get_current_mask()
+            special_3d_float = self.view_mode_selector.get_view(img, mask)
+            self.view_cache.put(key, special_3d_float, window)
         return special_3d_float
 
-    def get_overlay(self, img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    def get_overlay(
+        self, img: npt.NDArray[Any], mask: npt.NDArray[Any], out: Optional[npt.NDArray[Any]] = None
+    ) -> npt.NDArray[Any]:
         """
         img: 2d or 3d, float
         mask: 2d, int
-        out: 3d, float
+        out: 3d, float, rendered into the given buffer if there is one
         """
-        return self.view_mode_selector.get_view(img, mask)
+        return self.view_mode_selector.get_view(img, mask, out=out)
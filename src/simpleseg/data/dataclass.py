@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Optional
 
 import numpy.typing as npt
 
@@ -20,12 +20,16 @@ class AbstractData(ABC):
     def get_image(self, index: int) -> npt.NDArray[Any]:
         """
         returns the image of the specified index as an np.ndarray
-        * dtype must be float with values between 0 and 1
+        * dtype must be float (float64) with values between 0 and 1
+          or the stored dtype (uint8, uint16, float32 of any range), shown through an adjustable window.
+          all images of a dataset share the dtype, the display is decided by it
         * shape must be one of the following:
             * shape = (WIDTH, HEIGHT)
               -> for monochrome images the array will be of shape
             * shape = (WIDTH, HEIGHT, 3)
               -> for rgb colored images the array will be of shape
+            * shape = (WIDTH, HEIGHT, N)
+              -> for images with N != 3 channels, composited to rgb from a selection of the channels
         """
         ...
 
@@ -44,3 +48,13 @@ class AbstractData(ABC):
         this function handles mask manipulation.
         """
         ...
+
+    def get_mask_mtime(self, index: int) -> Optional[float]:
+        """
+        optional, returns the modification time of the stored mask of the specified index
+        * 0.0 if no mask is stored for the frame
+        * None if unknown (default)
+        cached frame stats of masks changed outside of simpleseg (other programs, other annotators)
+        are recomputed when the time differs, with None they are trusted.
+        """
+        return None
@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def lock_fd(fd: int) -> None:
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)  # gives up after ~10 s, so retry
+                return
+            except OSError:
+                time.sleep(0.05)
+
+    def unlock_fd(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def lock_fd(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def unlock_fd(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    """
+    exclusive lock on a lock file, held between processes and between handles of the same process
+    (every acquire opens the lock file again). reentrant for the owner, but not thread safe:
+    guard it with a threading lock when the object is shared between threads.
+    """
+
+    def __init__(self, lock_path: Path):
+        self.lock_path = lock_path
+        self.fd: Optional[int] = None
+        self.depth = 0
+
+    def acquire(self) -> None:
+        if self.fd is None:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                lock_fd(fd)
+            except BaseException:
+                os.close(fd)
+                raise
+            self.fd = fd
+        self.depth += 1
+
+    def release(self) -> None:
+        assert self.fd is not None
+        self.depth -= 1
+        if self.depth == 0:
+            fd, self.fd = self.fd, None
+            try:
+                unlock_fd(fd)
+            finally:
+                os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+    def __getstate__(self) -> dict:
+        # a pickled copy (e.g. in a worker process) must not inherit a held lock
+        return {"lock_path": self.lock_path, "fd": None, "depth": 0}
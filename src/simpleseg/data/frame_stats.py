@@ -0,0 +1,330 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from loguru import logger
+
+from simpleseg.data.dataclass import AbstractData
+from simpleseg.data.parallel import map_frames
+
+# seconds between the writes of the index while the background job computes it
+PERSIST_INTERVAL = 30.0
+# number of updates appended to the log after which it is merged into the index file
+COMPACT_INTERVAL = 1000
+
+
+@dataclass
+class FrameStats:
+    """
+    class_counts[i]: number of pixels with label i
+    last_modified: unix time of the last save through simpleseg, None if the mask was only read
+    mask_mtime: modification time of the stored mask the stats describe (AbstractData.get_mask_mtime)
+    """
+
+    class_counts: list[int]
+    last_modified: Optional[float] = None
+    mask_mtime: Optional[float] = None
+
+    @property
+    def labelled(self) -> bool:
+        return any(self.class_counts[1:])
+
+    @property
+    def classes(self) -> list[int]:
+        return [class_int for class_int, count in enumerate(self.class_counts) if count and class_int > 0]
+
+    def contains(self, class_int: int) -> bool:
+        return class_int < len(self.class_counts) and self.class_counts[class_int] > 0
+
+    @property
+    def timestamp(self) -> float:
+        """age of the mask the stats describe, the newer of two entries of a frame wins when they are merged"""
+        if self.mask_mtime is not None:
+            return self.mask_mtime
+        return self.last_modified or 0.0
+
+
+def compute_frame_stats(
+    mask: npt.NDArray[Any], last_modified: Optional[float] = None, mask_mtime: Optional[float] = None
+) -> FrameStats:
+    class_counts = np.bincount(mask.ravel()).tolist()
+    return FrameStats(class_counts=class_counts, last_modified=last_modified, mask_mtime=mask_mtime)
+
+
+def frame_stats_worker(dataset: AbstractData, index: int) -> tuple[list[int], Optional[float]]:
+    """returns the class counts and the time of the mask, taken before reading it"""
+    mask_mtime = dataset.get_mask_mtime(index)
+    return compute_frame_stats(dataset.get_mask(index)).class_counts, mask_mtime
+
+
+def merge_entry(stats: dict[int, FrameStats], index: int, entry: FrameStats) -> bool:
+    """True if entry replaced the entry in stats, ties go to entry"""
+    current = stats.get(index)
+    if current is not None and current.timestamp > entry.timestamp:
+        return False
+    stats[index] = entry
+    return True
+
+
+def get_stats_path(dataset: AbstractData) -> Optional[Path]:
+    """the index is stored next to the dataset, datasets without a dataset_path attribute are not persisted"""
+    dataset_path = getattr(dataset, "dataset_path", None)
+    if dataset_path is None:
+        return None
+    dataset_path = Path(dataset_path)
+    base_dir = dataset_path if dataset_path.is_dir() else dataset_path.parent
+    return base_dir / f".simpleseg-stats-{dataset.name}.json"
+
+
+class FrameStatsIndex:
+    """
+    per frame mask statistics of a dataset, used to filter and sort the file list.
+    missing entries are computed by compute_in_background(), save_mask() keeps entries up to date via update().
+
+    on disk the index is a json file plus a log (.log) that every update is appended to as a json line, so a save
+    does not rewrite the index. save() merges the log into the index file. several instances (annotators) can
+    share the files, entries are merged by their timestamp and not overwritten with older ones.
+    """
+
+    def __init__(self, n_frames: int, path: Optional[Path] = None):
+        self.n_frames = n_frames
+        self.path = path
+        self.log_path = path.with_suffix(".log") if path is not None else None
+        self.stats: dict[int, FrameStats] = {}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.version = 0  # incremented on every change, lets the gui poll for updates
+        self.n_log_lines = 0
+        self.thread: Optional[threading.Thread] = None
+        self.cancelled = threading.Event()
+        self.load()
+
+    @classmethod
+    def for_dataset(cls, dataset: AbstractData) -> "FrameStatsIndex":
+        return cls(n_frames=len(dataset), path=get_stats_path(dataset))
+
+    def __getitem__(self, index: int) -> Optional[FrameStats]:
+        return self.stats.get(index)
+
+    def __len__(self) -> int:
+        return len(self.stats)
+
+    @property
+    def complete(self) -> bool:
+        return len(self.stats) == self.n_frames
+
+    # ─── Persistence ─────────────────────────────────────────────────
+
+    def get_compacting_paths(self) -> list[Path]:
+        """logs being merged by save(), or left behind by an instance that crashed while merging"""
+        assert self.log_path is not None
+        return sorted(self.log_path.parent.glob(f"{self.log_path.name}.*.compacting"))
+
+    def parse_log(self, path: Path, stats: dict[int, FrameStats]) -> bool:
+        """merges the lines of a log into stats, False if the last line was cut off (e.g. by a crash)"""
+        try:
+            content = path.read_text()
+        except FileNotFoundError:
+            return True
+        for line in content.splitlines():
+            try:
+                entry = json.loads(line)
+                index = int(entry.pop("index"))
+                frame_stats = FrameStats(**entry)
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError, AttributeError):
+                logger.warning(f"skipping damaged line in {path}")
+                continue
+            if 0 <= index < self.n_frames:
+                merge_entry(stats, index, frame_stats)
+        if path == self.log_path:
+            self.n_log_lines = content.count("\n")
+        return not content or content.endswith("\n")
+
+    def read(self) -> tuple[dict[int, FrameStats], list[Path], bool]:
+        """
+        the entries on disk: the index file merged with the logs.
+        returns the entries, the merged logs of save() and whether the files need to be rewritten
+        (the log ends with a cut off line or belongs to an index of another number of frames)
+        """
+        assert self.path is not None and self.log_path is not None
+        stats: dict[int, FrameStats] = {}
+        try:
+            content = json.loads(self.path.read_text())
+            if content.get("n_frames") == self.n_frames:
+                stats = {int(index): FrameStats(**entry) for index, entry in content["stats"].items()}
+            else:
+                logger.info("number of frames changed, frame stats are recomputed")
+                return {}, self.get_compacting_paths(), True  # the log is outdated as well
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+            logger.warning(f"could not read frame stats {self.path}, recomputing")
+        compacting_paths = self.get_compacting_paths()
+        for path in compacting_paths:
+            self.parse_log(path, stats)
+        log_complete = self.parse_log(self.log_path, stats)
+        return stats, compacting_paths, not log_complete
+
+    def load(self) -> None:
+        if self.path is None:
+            return
+        stats, _, rewrite = self.read()
+        self.stats = stats
+        if rewrite:
+            self.save()  # appending to a cut off line would damage the next line as well
+
+    def save(self) -> None:
+        """
+        merges the log and the entries in memory into the index file. the index file is read again first,
+        entries written by other instances meanwhile are kept unless they are older.
+        """
+        if self.path is None or self.log_path is None:
+            return
+        with self.save_lock:
+            # appends of other instances go to a new log from here on
+            suffix = f"{os.getpid()}-{time.monotonic_ns()}.compacting"
+            compacting_path = self.log_path.with_name(f"{self.log_path.name}.{suffix}")
+            try:
+                os.replace(self.log_path, compacting_path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.warning(f"could not move frame stats log {self.log_path}")
+            stats, compacting_paths, _ = self.read()
+            with self.lock:
+                for index, entry in self.stats.items():
+                    merge_entry(stats, index, entry)
+                self.stats = stats
+                self.version += 1
+                content = {"n_frames": self.n_frames, "stats": {index: asdict(entry) for index, entry in stats.items()}}
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            try:
+                tmp_path.write_text(json.dumps(content))
+                os.replace(tmp_path, self.path)
+            except OSError:
+                logger.warning(f"could not write frame stats {self.path}")
+                return
+            for path in compacting_paths:
+                path.unlink(missing_ok=True)
+
+    def refresh(self) -> None:
+        """merges the entries on disk into memory, e.g. frames saved by other annotators"""
+        if self.path is None:
+            return
+        stats, _, _ = self.read()
+        with self.lock:
+            changed = [index for index, entry in stats.items() if self.stats.get(index) != entry]
+            for index in changed:
+                merge_entry(self.stats, index, stats[index])
+            if changed:
+                self.version += 1
+
+    def append_log(self, index: int, stats: FrameStats) -> None:
+        if self.log_path is None:
+            return
+        line = json.dumps({"index": index, **asdict(stats)}) + "\n"
+        with self.save_lock:
+            try:
+                # opened for every line, save() of another instance may have moved the log meanwhile
+                with self.log_path.open("a") as f:
+                    f.write(line)
+            except OSError:
+                logger.warning(f"could not write frame stats log {self.log_path}")
+            self.n_log_lines += 1
+        if self.n_log_lines >= COMPACT_INTERVAL:
+            self.save()
+
+    # ─── Updates ─────────────────────────────────────────────────────
+
+    def set(self, index: int, stats: FrameStats) -> None:
+        with self.lock:
+            self.stats[index] = stats
+            self.version += 1
+
+    def record(self, index: int, stats: FrameStats) -> None:
+        """sets the entry and appends it to the log"""
+        self.set(index, stats)
+        self.append_log(index, stats)
+
+    def update(self, index: int, mask: npt.NDArray[Any], mask_mtime: Optional[float] = None) -> None:
+        """called after a mask was saved, mask_mtime: AbstractData.get_mask_mtime() after the save"""
+        self.record(index, compute_frame_stats(mask, last_modified=time.time(), mask_mtime=mask_mtime))
+
+    def find_stale(self, dataset: AbstractData) -> list[int]:
+        """frames whose stored mask changed after their stats were computed, e.g. edited by another program"""
+        with self.lock:
+            entries = list(self.stats.items())
+        stale = []
+        for index, entry in entries:
+            if self.cancelled.is_set():
+                break
+            mask_mtime = dataset.get_mask_mtime(index)
+            if mask_mtime is not None and mask_mtime != entry.mask_mtime:
+                stale.append(index)
+        return stale
+
+    def compute(self, dataset: AbstractData, n_workers: Optional[int] = None) -> None:
+        """computes missing entries and the entries of masks changed on disk, returns soon after cancel()"""
+        stale = set(self.find_stale(dataset))
+        with self.lock:
+            todo = [index for index in range(self.n_frames) if index not in self.stats or index in stale]
+            outdated = {index: self.stats.get(index) for index in todo}
+        if not todo or self.cancelled.is_set():
+            return
+        logger.info(f"computing frame stats for {len(todo)} frames, {len(stale)} of them changed on disk")
+        t0 = time.perf_counter()
+        last_save = time.monotonic()
+        results = map_frames(dataset, frame_stats_worker, todo, n_workers, cancel=self.cancelled)
+        for index, (class_counts, mask_mtime) in results:
+            with self.lock:
+                # a save through the gui during the computation is newer than the result of the worker
+                if self.stats.get(index) is outdated[index]:
+                    self.stats[index] = FrameStats(class_counts=class_counts, mask_mtime=mask_mtime)
+                    self.version += 1
+            if time.monotonic() - last_save > PERSIST_INTERVAL:
+                self.save()
+                last_save = time.monotonic()
+        self.save()
+        if self.cancelled.is_set():
+            logger.info("computing frame stats cancelled")
+            return
+        logger.info(f"computed frame stats in {time.perf_counter() - t0} seconds")
+
+    def compute_in_background(self, dataset: AbstractData, n_workers: Optional[int] = None) -> None:
+        """computes missing and outdated entries with a process pool, driven by a daemon thread"""
+        if n_workers is None:
+            n_workers = max(1, (os.cpu_count() or 2) - 1)  # leave a core for the gui
+        self.thread = threading.Thread(target=self.compute, args=(dataset, n_workers), daemon=True)
+        self.thread.start()
+
+    def cancel(self) -> None:
+        """stops the background computation, e.g. when another dataset is opened"""
+        self.cancelled.set()
+
+    # ─── Queries ─────────────────────────────────────────────────────
+
+    def filter(self, class_int: Optional[int] = None, labelled: Optional[bool] = None) -> list[int]:
+        """
+        returns the frame indices that match all given conditions
+        * class_int: frame contains pixels of this class
+        * labelled: frame contains (True) or does not contain (False) any labelled pixel
+        frames without stats are only returned when no condition is given
+        """
+        with self.lock:
+            stats = dict(self.stats)
+        indices = []
+        for index in range(self.n_frames):
+            entry = stats.get(index)
+            if class_int is None and labelled is None:
+                indices.append(index)
+            elif entry is None:
+                continue
+            elif (class_int is None or entry.contains(class_int)) and (labelled is None or entry.labelled == labelled):
+                indices.append(index)
+        return indices
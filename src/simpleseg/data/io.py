@@ -8,6 +8,15 @@ from PIL import Image
 from simpleseg.validation.data_validation import is_2d_img, is_3d_img, is_float_img
 
 
+def to_native_dtype(img: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    """native byte order, 32 bit integer images (PIL mode "I", e.g. some 16 bit pngs) with 16 bit values are uint16"""
+    if not img.dtype.isnative:
+        img = img.astype(img.dtype.newbyteorder("="))
+    if img.dtype == np.int32 and img.min() >= 0 and img.max() <= np.iinfo(np.uint16).max:
+        img = img.astype(np.uint16)
+    return img
+
+
 def read_image(image_path: str | Path, dtype=float) -> npt.NDArray[Any]:
     """
     returns an np.array containing the image
@@ -19,15 +28,19 @@ def read_image(image_path: str | Path, dtype=float) -> npt.NDArray[Any]:
     (WIDTH, HEIGHT, 3)
 
     value range:
-    the value range will be from
-    0 to 255 in case of 8 bit
+    dtype float: 0 to 1, 8 bit images are divided by 255, 16 bit images by 65535, float images are not scaled
+    dtype int: the stored values, 0 to 255 in case of 8 bit
+    dtype None: the stored values in their stored dtype, e.g. uint16, see WindowLevel for displaying them
     """
-    assert dtype in (float, int)
+    assert dtype in (float, int, None)
+    with Image.open(image_path) as image:
+        img = to_native_dtype(np.asarray(image))
+        max_value = 65535 if image.mode.startswith("I") else 1 if image.mode == "F" else 255
+    if dtype is None:
+        return img
     if dtype == float:
-        return np.asarray(Image.open(image_path), dtype=dtype) / 255
-    elif dtype == int:
-        return np.asarray(Image.open(image_path), dtype=dtype)
-    raise NotImplementedError
+        return img / max_value
+    return img.astype(int)
 
 
 def img_2d_to_3d(img: npt.NDArray[Any]) -> npt.NDArray[Any]:
@@ -0,0 +1,255 @@
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from loguru import logger
+from PIL import Image
+
+from simpleseg.data.file_lock import FileLock
+from simpleseg.data.mask_store import MaskStore
+from simpleseg.validation.data_validation import is_2d_img, is_int_img
+
+ARCHIVE_MAGIC = b"SSMA"
+ARCHIVE_VERSION = 1
+# magic, version, reserved, file id
+ARCHIVE_HEADER = struct.Struct("<4sHHQ")
+RECORD_MAGIC = b"MREC"
+# magic, frame index, height, width, codec, payload size
+RECORD_HEADER = struct.Struct("<4sIIIBQ")
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+# number of appended records after which the index sidecar is rewritten
+INDEX_PERSIST_INTERVAL = 256
+
+
+class MaskArchive(MaskStore):
+    """
+    packs the label masks of a dataset into a single append-only file
+
+    archive layout:
+    * header: magic, version, file id
+    * records: header (frame index, height, width, codec, payload size) + payload
+
+    every mask is stored as uint8 and compressed with zlib. overwriting a frame appends a new record,
+    the newest record of a frame wins. the frame -> offset index is kept in memory and cached in a
+    sidecar file (<archive>.idx.npz), records appended after the sidecar was written are picked up
+    by scanning only the tail of the archive. compact() drops overwritten records.
+
+    several handles (threads, processes, annotators) may share an archive: writes, index updates and
+    compact() hold an exclusive lock file (<archive>.lock), reads pick up the records appended by
+    other handles when a frame is missing or the archive has changed on disk.
+    """
+
+    def __init__(self, archive_path: Path, compression_level: int = 6):
+        assert isinstance(archive_path, Path)
+        self.archive_path = archive_path
+        self.index_path = archive_path.with_name(archive_path.name + ".idx.npz")
+        self.compression_level = compression_level
+        self.lock = threading.RLock()  # the file handle is shared between reads and writes
+        self.file_lock = FileLock(archive_path.with_name(archive_path.name + ".lock"))
+        with self.file_lock:
+            if not archive_path.is_file():
+                self.write_header(archive_path)
+            self.open()
+
+    @staticmethod
+    def write_header(archive_path: Path) -> None:
+        file_id = int.from_bytes(os.urandom(8), "little")
+        with archive_path.open("wb") as f:
+            f.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, file_id))
+
+    def open(self) -> None:
+        """the caller holds the file lock"""
+        self.file = self.archive_path.open("a+b")
+        self.file_id = self.read_file_id()
+        self.index: dict[int, int] = {}
+        self.scanned_size = ARCHIVE_HEADER.size
+        self.file_size = ARCHIVE_HEADER.size  # archive size at the last scan
+        self.n_unpersisted = 0
+        self.load_index()
+
+    def read_file_id(self) -> int:
+        self.file.seek(0)
+        magic, version, _, file_id = ARCHIVE_HEADER.unpack(self.file.read(ARCHIVE_HEADER.size))
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"{self.archive_path} is not a mask archive")
+        return file_id
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, index: int) -> bool:
+        return index in self.index
+
+    def frames(self) -> list[int]:
+        return sorted(self.index)
+
+    # ─── Index ───────────────────────────────────────────────────────
+
+    def load_index(self) -> None:
+        try:
+            with np.load(self.index_path) as cached:
+                file_size = self.archive_path.stat().st_size
+                if int(cached["file_id"]) == self.file_id and int(cached["scanned_size"]) <= file_size:
+                    self.index = dict(zip(cached["frames"].tolist(), cached["offsets"].tolist()))
+                    self.scanned_size = int(cached["scanned_size"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"ignoring the broken archive index {self.index_path}")
+        self.scan_records()
+
+    def changed_on_disk(self) -> bool:
+        """another handle appended records or replaced the archive (compact)"""
+        try:
+            disk = os.stat(self.archive_path)
+        except FileNotFoundError:
+            return False
+        return disk.st_size != self.file_size or not os.path.samestat(disk, os.fstat(self.file.fileno()))
+
+    def sync(self) -> None:
+        """catches up with the other handles of the archive, the caller holds the file lock"""
+        if os.path.samestat(os.stat(self.archive_path), os.fstat(self.file.fileno())):
+            self.scan_records()
+        else:
+            self.file.close()
+            self.open()
+
+    def scan_records(self) -> None:
+        """reads the record headers behind scanned_size, payloads are skipped"""
+        file_size = self.archive_path.stat().st_size
+        offset = self.scanned_size
+        while offset + RECORD_HEADER.size <= file_size:
+            self.file.seek(offset)
+            magic, frame_index, _, _, _, n_bytes = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+            if magic != RECORD_MAGIC or offset + RECORD_HEADER.size + n_bytes > file_size:
+                logger.warning(f"truncated record at offset {offset} in {self.archive_path}, ignoring the rest")
+                break
+            self.index[frame_index] = offset
+            self.n_unpersisted += 1
+            offset += RECORD_HEADER.size + n_bytes
+        self.scanned_size = offset
+        self.file_size = file_size
+
+    def persist_index(self) -> None:
+        """the caller holds the file lock, the sidecar is replaced atomically for readers without it"""
+        frames = np.fromiter(self.index.keys(), dtype=np.uint32, count=len(self.index))
+        offsets = np.fromiter(self.index.values(), dtype=np.uint64, count=len(self.index))
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with tmp_path.open("wb") as f:
+                np.savez(f, frames=frames, offsets=offsets, scanned_size=self.scanned_size, file_id=self.file_id)
+            os.replace(tmp_path, self.index_path)
+            self.n_unpersisted = 0
+        except OSError:
+            logger.warning(f"could not write archive index {self.index_path}")
+
+    # ─── Read / Write ────────────────────────────────────────────────
+
+    def read(self, index: int) -> Optional[npt.NDArray[Any]]:
+        with self.lock:
+            if index not in self.index or self.changed_on_disk():
+                with self.file_lock:
+                    self.sync()
+            if index not in self.index:
+                return None
+            self.file.seek(self.index[index])
+            _, _, height, width, codec, n_bytes = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+            payload = self.file.read(n_bytes)
+        if codec == CODEC_ZLIB:
+            payload = zlib.decompress(payload)
+        elif codec != CODEC_RAW:
+            raise ValueError(f"unknown codec {codec} for frame {index}")
+        return np.frombuffer(payload, dtype=np.uint8).reshape(height, width).astype(int)
+
+    def write(self, mask: npt.NDArray[Any], index: int) -> None:
+        assert is_int_img(mask)
+        assert is_2d_img(mask)
+        raw = np.ascontiguousarray(mask, dtype=np.uint8).tobytes()
+        payload = zlib.compress(raw, self.compression_level)
+        codec = CODEC_ZLIB
+        if len(payload) >= len(raw):
+            payload, codec = raw, CODEC_RAW
+
+        with self.lock, self.file_lock:
+            # every writer appends complete records while holding the file lock,
+            # so a tail behind the last complete record can only be left behind by a crashed writer
+            self.sync()
+            if self.archive_path.stat().st_size > self.scanned_size:
+                self.file.truncate(self.scanned_size)
+                self.file_size = self.scanned_size
+            offset = self.scanned_size
+            self.file.write(RECORD_HEADER.pack(RECORD_MAGIC, index, *mask.shape, codec, len(payload)) + payload)
+            self.file.flush()
+            self.index[index] = offset
+            self.scanned_size = self.file_size = offset + RECORD_HEADER.size + len(payload)
+            self.n_unpersisted += 1
+            if self.n_unpersisted >= INDEX_PERSIST_INTERVAL:
+                self.persist_index()
+
+    def close(self) -> None:
+        with self.lock, self.file_lock:
+            if self.n_unpersisted:
+                self.sync()  # never replace a newer sidecar of another handle with an older index
+                self.persist_index()
+            self.file.close()
+
+    def __enter__(self) -> "MaskArchive":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["file"]
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.file = self.archive_path.open("a+b")
+        self.lock = threading.RLock()
+
+    # ─── Maintenance ─────────────────────────────────────────────────
+
+    def compact(self) -> None:
+        """rewrites the archive with the newest record of every frame only"""
+        with self.lock, self.file_lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        self.sync()
+        tmp_path = self.archive_path.with_name(self.archive_path.name + ".tmp")
+        self.write_header(tmp_path)
+        new_index: dict[int, int] = {}
+        with tmp_path.open("ab") as f:
+            for frame_index in self.frames():
+                self.file.seek(self.index[frame_index])
+                header = self.file.read(RECORD_HEADER.size)
+                n_bytes = RECORD_HEADER.unpack(header)[-1]
+                new_index[frame_index] = f.tell()
+                f.write(header + self.file.read(n_bytes))
+            scanned_size = f.tell()
+        self.file.close()
+        os.replace(tmp_path, self.archive_path)
+        self.file = self.archive_path.open("a+b")
+        self.file_id = self.read_file_id()
+        self.index = new_index
+        self.scanned_size = self.file_size = scanned_size
+        self.persist_index()
+
+    def export_png(self, mask_dir: Path, frame_names: list[str]) -> None:
+        """writes every mask of the archive as <frame name>.png into mask_dir"""
+        mask_dir.mkdir(parents=True, exist_ok=True)
+        for frame_index in self.frames():
+            mask = self.read(frame_index)
+            assert mask is not None
+            Image.fromarray(mask.astype(np.uint8)).save(mask_dir / f"{Path(frame_names[frame_index]).stem}.png")
@@ -0,0 +1,169 @@
+import base64
+import zlib
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from simpleseg.kernels.backend import draw_polyline, polygon_mask
+from simpleseg.shared_variables import Region
+
+
+def union_regions(a: Region, b: Region) -> Region:
+    """smallest region containing both regions"""
+    return (
+        slice(min(a[0].start, b[0].start), max(a[0].stop, b[0].stop)),
+        slice(min(a[1].start, b[1].start), max(a[1].stop, b[1].stop)),
+    )
+
+
+def brush_region(
+    xs: npt.NDArray[Any], ys: npt.NDArray[Any], brush_x: npt.NDArray[Any], brush_y: npt.NDArray[Any], shape: tuple
+) -> Region:
+    """region touched by stamping the brush at the points (xs[i], ys[i]), clipped to shape"""
+    x_start = max(0, int(np.min(xs)) + int(np.min(brush_x)))
+    x_stop = min(shape[1], int(np.max(xs)) + int(np.max(brush_x)) + 1)
+    y_start = max(0, int(np.min(ys)) + int(np.min(brush_y)))
+    y_stop = min(shape[0], int(np.max(ys)) + int(np.max(brush_y)) + 1)
+    return slice(y_start, max(y_start, y_stop)), slice(x_start, max(x_start, x_stop))
+
+
+def count_changed_pixels(mask: npt.NDArray[Any], clean_mask: npt.NDArray[Any], region: Region) -> int:
+    """number of pixels in region that differ from the clean mask, pixels outside region must be unchanged"""
+    return int(np.count_nonzero(mask[region] != clean_mask[region]))
+
+
+def apply_polyline(
+    mask: npt.NDArray[Any], xs: npt.NDArray[Any], ys: npt.NDArray[Any], width: int, value: int
+) -> Region:
+    """pencil stroke of the given width along the polyline, in place, returns the touched region"""
+    brush_x, brush_y = bresenham_circle_mask(width)
+    draw_polyline(mask, xs, ys, brush_x, brush_y, value)
+    return brush_region(xs, ys, brush_x, brush_y, mask.shape)
+
+
+def apply_polygon(mask: npt.NDArray[Any], verts: Any, value: int) -> Optional[Region]:
+    """lasso fill, in place, returns the touched region or None if no pixel lies inside the polygon"""
+    region, inside = polygon_mask(verts, mask.shape)
+    if not inside.any():
+        return None
+    mask[region][inside] = value
+    return region
+
+
+# ─── Operations ──────────────────────────────────────────────────────
+# edits as json serializable dicts, they are recorded in the stroke journal and replayed with apply_operation()
+
+
+def polyline_operation(xs: Any, ys: Any, width: int, value: int) -> dict[str, Any]:
+    return {"op": "polyline", "xs": [int(x) for x in xs], "ys": [int(y) for y in ys], "width": width, "value": value}
+
+
+def polygon_operation(verts: Any, value: int) -> dict[str, Any]:
+    return {"op": "polygon", "verts": [[float(x), float(y)] for x, y in verts], "value": value}
+
+
+def pixels_operation(region: Region, selected: npt.NDArray[np.bool_], value: int) -> dict[str, Any]:
+    """sets the selected pixels of region, e.g. a superpixel"""
+    data = base64.b64encode(zlib.compress(np.packbits(selected).tobytes(), level=1)).decode("ascii")
+    bounds = [region[0].start, region[0].stop, region[1].start, region[1].stop]
+    return {"op": "pixels", "region": bounds, "data": data, "value": value}
+
+
+def mask_operation(mask: npt.NDArray[Any]) -> dict[str, Any]:
+    """replaces the whole mask, for edits that are not strokes"""
+    data = base64.b64encode(zlib.compress(mask.astype(np.uint8).tobytes(), level=1)).decode("ascii")
+    return {"op": "mask", "shape": list(mask.shape), "data": data}
+
+
+def apply_operation(mask: npt.NDArray[Any], operation: dict[str, Any]) -> Optional[Region]:
+    """applies the operation in place, returns the touched region"""
+    kind = operation["op"]
+    if kind == "polyline":
+        xs, ys = np.array(operation["xs"]), np.array(operation["ys"])
+        return apply_polyline(mask, xs, ys, operation["width"], operation["value"])
+    if kind == "polygon":
+        return apply_polygon(mask, operation["verts"], operation["value"])
+    if kind == "pixels":
+        y_start, y_stop, x_start, x_stop = operation["region"]
+        region = slice(y_start, y_stop), slice(x_start, x_stop)
+        shape = (y_stop - y_start, x_stop - x_start)
+        bits = np.frombuffer(zlib.decompress(base64.b64decode(operation["data"])), dtype=np.uint8)
+        selected = np.unpackbits(bits, count=shape[0] * shape[1]).reshape(shape).astype(bool)
+        mask[region][selected] = operation["value"]
+        return region
+    if kind == "mask":
+        assert tuple(operation["shape"]) == mask.shape, "mask operation of a different resolution"
+        data = np.frombuffer(zlib.decompress(base64.b64decode(operation["data"])), dtype=np.uint8)
+        mask[...] = data.reshape(mask.shape)
+        return slice(0, mask.shape[0]), slice(0, mask.shape[1])
+    raise ValueError(f"unknown mask operation {kind}")
+
+
+@lru_cache(maxsize=None)
+def bresenham_circle_mask(width: int):
+    """Efficient way of creating a circular drawing mask, cached per width, the arrays are read-only"""
+    from skimage.segmentation import flood_fill  # scikit-image is slow to import, only needed here
+
+    assert isinstance(width, int)
+    assert width >= 1, "width must be 1 or larger"
+
+    radius = width // 2
+    if width % 2 == 0:
+        radius -= 1
+
+    coords_set = set()
+    f = 1 - radius
+    ddF_x = 0
+    ddF_y = -2 * radius
+    x = 0
+    y = radius
+
+    offset = 0
+    if width % 2 == 0:
+        offset = -1
+        coords_set.add((offset, radius))
+        coords_set.add((radius, offset))
+        coords_set.add((offset, -radius + offset))
+        coords_set.add((-radius + offset, offset))
+    coords_set.add((0, radius))
+    coords_set.add((radius, 0))
+    coords_set.add((0, -radius + offset))
+    coords_set.add((-radius + offset, 0))
+
+    while x < y:
+        if f >= 0:
+            y -= 1
+            ddF_y += 2
+            f += ddF_y
+        x += 1
+        ddF_x += 2
+        f += ddF_x + 1
+
+        coords_set.add((x, y))
+        coords_set.add((-x + offset, y))
+        coords_set.add((x, -y + offset))
+        coords_set.add((-x + offset, -y + offset))
+        coords_set.add((y, x))
+        coords_set.add((-y + offset, x))
+        coords_set.add((y, -x + offset))
+        coords_set.add((-y + offset, -x + offset))
+
+    arr = np.fromiter(chain.from_iterable(coords_set), int)
+    num_coords = len(coords_set)
+    arr.shape = num_coords, 2
+
+    # filling cirlce with 1 to generate mask depending on pencil width
+    min_val = arr.min()
+    val_range = arr.max() - min_val
+    temp_mask = np.zeros((val_range + 1, val_range + 1))
+    temp_mask[arr[:, 0] - min_val, arr[:, 1] - min_val] = 1
+    flood_mask = flood_fill(temp_mask, (abs(min_val), abs(min_val)), 1, connectivity=1)
+    idcs = np.where(flood_mask == 1)
+    xcoords, ycoords = idcs[0] + min_val, idcs[1] + min_val
+    xcoords.flags.writeable = False
+    ycoords.flags.writeable = False
+    return xcoords, ycoords
+
@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from PIL import Image
+
+from simpleseg.validation.data_validation import is_2d_img, is_int_img
+
+
+class MaskStore(ABC):
+    """
+    storage backend for the label masks of a dataset.
+    masks are addressed by frame index, missing masks are returned as None
+    """
+
+    @abstractmethod
+    def read(self, index: int) -> Optional[npt.NDArray[Any]]:
+        ...
+
+    @abstractmethod
+    def write(self, mask: npt.NDArray[Any], index: int) -> None:
+        ...
+
+    def mtime(self, index: int) -> Optional[float]:
+        """see AbstractData.get_mask_mtime(), None if the store has no modification time per mask"""
+        return None
+
+
+class MaskDirStore(MaskStore):
+    """
+    stores every mask as a single png file inside a directory
+
+    mask_dir/
+        frame-00000.png
+        frame-00001.png
+        ...
+    """
+
+    def __init__(self, mask_dir: Path, frame_names: list[str]):
+        assert isinstance(mask_dir, Path)
+        self.mask_dir = mask_dir
+        self.frame_names = frame_names
+
+    def get_path(self, index: int) -> Path:
+        return self.mask_dir / f"{self.frame_names[index]}.png"
+
+    def read(self, index: int) -> Optional[npt.NDArray[Any]]:
+        path = self.get_path(index)
+        if not path.is_file():
+            return None
+        return np.asarray(Image.open(path), dtype=int)
+
+    def mtime(self, index: int) -> Optional[float]:
+        try:
+            return self.get_path(index).stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def write(self, mask: npt.NDArray[Any], index: int) -> None:
+        assert is_int_img(mask)
+        assert is_2d_img(mask)
+        self.mask_dir.mkdir(parents=True, exist_ok=True)
+        Image.fromarray(mask.astype(np.uint8)).save(self.get_path(index))
@@ -0,0 +1,88 @@
+from enum import IntEnum, auto
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from skimage.measure import label
+from skimage.morphology import dilation, disk, erosion
+
+from simpleseg.data.presegmentation import remove_small_components
+from simpleseg.shared_variables import Region
+
+
+class MorphologyOperation(IntEnum):
+    DILATE = auto()
+    ERODE = auto()
+    FILL_HOLES = auto()
+    REMOVE_SMALL_OBJECTS = auto()
+
+
+def pad_region(region: Region, padding: int, shape: tuple) -> Region:
+    return (
+        slice(max(0, region[0].start - padding), min(shape[0], region[0].stop + padding)),
+        slice(max(0, region[1].start - padding), min(shape[1], region[1].stop + padding)),
+    )
+
+
+def fill_holes(binary: npt.NDArray[np.bool_]) -> npt.NDArray[np.bool_]:
+    """background components that do not touch the border are holes"""
+    components = label(~binary, connectivity=1)
+    border = np.unique(np.concatenate([components[0], components[-1], components[:, 0], components[:, -1]]))
+    return binary | ~np.isin(components, border)
+
+
+def apply_morphology(
+    mask: npt.NDArray[Any],
+    operation: MorphologyOperation,
+    class_int: int,
+    radius: int,
+    region: Optional[Region] = None,
+    inside: Optional[npt.NDArray[np.bool_]] = None,
+) -> Optional[tuple[Region, npt.NDArray[np.bool_], int]]:
+    """
+    applies operation to the pixels of class_int, in place, only pixels in the roi change.
+    roi: region (bounding box, whole frame if None) and optionally the pixels inside it (e.g. a lasso)
+    radius: of the disk footprint for dilate / erode, objects smaller than the disk are removed.
+    the computation is restricted to the region, padded by radius for dilate / erode and by the minimum object
+    size for remove small objects: an object touching the region that reaches the padded border is not small,
+    the others lie inside the padded region and are measured whole.
+    holes are judged by their part inside the region. dilate and fill holes only change background pixels.
+    returns (region, changed pixels in region, value they were set to) or None if nothing changed.
+    """
+    assert radius >= 1
+    if region is None:
+        region = slice(0, mask.shape[0]), slice(0, mask.shape[1])
+    min_size = int(np.count_nonzero(disk(radius)))
+    padding = 0
+    if operation in (MorphologyOperation.DILATE, MorphologyOperation.ERODE):
+        padding = radius
+    elif operation is MorphologyOperation.REMOVE_SMALL_OBJECTS:
+        padding = min_size
+    padded_region = pad_region(region, padding, mask.shape)
+    binary = mask[padded_region] == class_int
+
+    if operation is MorphologyOperation.DILATE:
+        result, value = dilation(binary, disk(radius)), class_int
+    elif operation is MorphologyOperation.ERODE:
+        result, value = erosion(binary, disk(radius)), 0
+    elif operation is MorphologyOperation.FILL_HOLES:
+        result, value = fill_holes(binary), class_int
+    elif operation is MorphologyOperation.REMOVE_SMALL_OBJECTS:
+        result, value = remove_small_components(binary.astype(int), min_size) > 0, 0
+    else:
+        raise ValueError(f"unknown morphology operation {operation}")
+
+    # back from the padded region to the region
+    inner = (
+        slice(region[0].start - padded_region[0].start, region[0].stop - padded_region[0].start),
+        slice(region[1].start - padded_region[1].start, region[1].stop - padded_region[1].start),
+    )
+    changed = result[inner] != binary[inner]
+    if value != 0:
+        changed &= mask[region] == 0  # growing only claims background, other classes are kept
+    if inside is not None:
+        changed &= inside
+    if not changed.any():
+        return None
+    mask[region][changed] = value
+    return region, changed, value
@@ -0,0 +1,158 @@
+import json
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import numpy.typing as npt
+
+from simpleseg.data.dataclass import AbstractData
+
+FrameFunc = Callable[[AbstractData, int], Any]
+
+# seconds between checks of the cancel event of map_frames() while waiting for results
+CANCEL_POLL_INTERVAL = 0.1
+
+# dataset of a worker process, set once by the pool initializer instead of pickling it for every task
+_worker_dataset: Optional[AbstractData] = None
+
+
+def _init_worker(dataset: AbstractData) -> None:
+    global _worker_dataset
+    _worker_dataset = dataset
+
+
+def _run_chunk(func: FrameFunc, indices: list[int]) -> list[tuple[int, Any]]:
+    assert _worker_dataset is not None
+    return [(index, func(_worker_dataset, index)) for index in indices]
+
+
+def map_frames(
+    dataset: AbstractData,
+    func: FrameFunc,
+    indices: Optional[Iterable[int]] = None,
+    n_workers: Optional[int] = None,
+    chunksize: int = 16,
+    cancel: Optional[threading.Event] = None,
+) -> Iterator[tuple[int, Any]]:
+    """
+    applies func(dataset, index) to every frame index and yields (index, result) in completion order
+
+    * func must be a module level function, so it can be sent to the worker processes
+    * the dataset is sent to every worker once, it must be picklable
+    * n_workers = None uses all cores, n_workers = 0 runs everything in the calling process
+    * at most 2 chunks per worker are in flight, so results can be consumed while the pool is busy
+    * setting cancel stops yielding within CANCEL_POLL_INTERVAL seconds, queued chunks are dropped and the
+      chunks in flight are not waited for. the same happens when the consumer closes the iterator early.
+    """
+    indices = list(range(len(dataset))) if indices is None else list(indices)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    if n_workers == 0:
+        for index in indices:
+            if cancel is not None and cancel.is_set():
+                return
+            yield index, func(dataset, index)
+        return
+
+    chunks = [indices[i : i + chunksize] for i in range(0, len(indices), chunksize)]
+    chunks.reverse()
+    pool = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(dataset,))
+    finished = False
+    try:
+        pending: set[Future] = set()
+        while chunks or pending:
+            if cancel is not None and cancel.is_set():
+                return
+            while chunks and len(pending) < 2 * n_workers:
+                pending.add(pool.submit(_run_chunk, func, chunks.pop()))
+            done, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+        finished = True
+    finally:
+        pool.shutdown(wait=finished, cancel_futures=True)
+
+
+class FrameCheckpoint:
+    """
+    append-only json lines file of per frame results. used to resume long running dataset jobs,
+    frames that already have a result in the checkpoint are skipped on the next run.
+    """
+
+    def __init__(self, path: Path):
+        assert isinstance(path, Path)
+        self.path = path
+        self.results: dict[int, Any] = {}
+        if path.is_file():
+            with path.open() as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # incomplete line of an interrupted run
+                    self.results[entry["index"]] = entry["result"]
+
+    def __contains__(self, index: int) -> bool:
+        return index in self.results
+
+    def remove(self) -> None:
+        """deletes the checkpoint once the job completed, the next run starts from scratch"""
+        self.path.unlink(missing_ok=True)
+        self.results = {}
+
+    def todo(self, indices: Iterable[int]) -> list[int]:
+        return [index for index in indices if index not in self.results]
+
+    def record(self, results: Iterable[tuple[int, Any]]) -> Iterator[tuple[int, Any]]:
+        """stores every (index, result) pair while passing it through"""
+        with self.path.open("a+") as f:
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                if f.read(1) != "\n":
+                    f.write("\n")  # terminate the incomplete line of an interrupted run
+            for index, result in results:
+                f.write(json.dumps({"index": index, "result": result}) + "\n")
+                f.flush()
+                self.results[index] = result
+                yield index, result
+
+
+class MaskJob(ABC):
+    """
+    background job that produces masks for frames of a dataset, run() is driven by a daemon thread.
+    results are collected in a queue, the gui takes them with pop_results() on its own thread.
+    """
+
+    def __init__(self, dataset: AbstractData):
+        self.dataset = dataset
+        self.results: queue.SimpleQueue[tuple[int, npt.NDArray[Any]]] = queue.SimpleQueue()
+        self.cancelled = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @abstractmethod
+    def run(self, *args: Any) -> None:
+        """puts (index, mask) pairs into self.results, should return soon after cancel()"""
+
+    def start(self, *args: Any) -> None:
+        self.thread = threading.Thread(target=self.run, args=args, daemon=True)
+        self.thread.start()
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def pop_results(self) -> list[tuple[int, npt.NDArray[Any]]]:
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
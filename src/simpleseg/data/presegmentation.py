@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from loguru import logger
+from skimage.filters import threshold_multiotsu, threshold_otsu
+from skimage.measure import label
+
+from simpleseg.data.dataclass import AbstractData
+from simpleseg.data.parallel import MaskJob, map_frames
+
+
+@dataclass(frozen=True)
+class PresegmentationSettings:
+    """
+    n_classes: number of foreground classes, intensity bands are assigned to classes 1 .. n_classes from dark to bright
+    min_size: connected components with fewer pixels are dropped
+    invert: foreground is darker than the background
+    """
+
+    n_classes: int = 1
+    min_size: int = 64
+    invert: bool = False
+
+
+def to_gray(img: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    return img.mean(axis=-1) if img.ndim == 3 else img
+
+
+def threshold_classes(img: npt.NDArray[Any], n_classes: int) -> npt.NDArray[Any]:
+    """
+    img: 2d float
+    out: 2d int, 0 below the lowest threshold, i in the i-th band above it
+    """
+    if img.min() == img.max():
+        return np.zeros(img.shape, dtype=int)
+    if n_classes == 1:
+        return (img > threshold_otsu(img)).astype(int)
+    thresholds = threshold_multiotsu(img, classes=n_classes + 1)
+    return np.digitize(img, bins=thresholds)
+
+
+def remove_small_components(mask: npt.NDArray[Any], min_size: int) -> npt.NDArray[Any]:
+    """sets connected components of each class with fewer than min_size pixels to 0, in place"""
+    for class_int in np.unique(mask):
+        if class_int == 0:
+            continue
+        components = label(mask == class_int, connectivity=1)
+        sizes = np.bincount(components.ravel())
+        small = sizes < min_size
+        small[0] = False
+        mask[small[components]] = 0
+    return mask
+
+
+def presegment_image(img: npt.NDArray[Any], settings: PresegmentationSettings) -> npt.NDArray[Any]:
+    """
+    img: 2d or 3d, float or in its stored dtype
+    out: 2d int mask
+    """
+    gray = to_gray(img)
+    if settings.invert:
+        gray = gray.max() - gray  # also for images in their stored dtype
+    mask = threshold_classes(gray, settings.n_classes)
+    return remove_small_components(mask, settings.min_size)
+
+
+def presegment_frame(
+    dataset: AbstractData, index: int, settings: PresegmentationSettings
+) -> Optional[npt.NDArray[Any]]:
+    """worker function, frames that already contain labels are skipped (None)"""
+    if dataset.get_mask(index).any():
+        return None
+    mask = presegment_image(dataset.get_image(index), settings)
+    return mask if mask.any() else None
+
+
+class Presegmentation(MaskJob):
+    """pre-segments the empty masks of a dataset with a process pool"""
+
+    def __init__(self, dataset: AbstractData, settings: PresegmentationSettings):
+        super().__init__(dataset)
+        self.settings = settings
+
+    def run(self, indices: Optional[list[int]] = None, n_workers: Optional[int] = None) -> None:
+        indices = list(range(len(self.dataset))) if indices is None else indices
+        logger.info(f"pre-segmenting up to {len(indices)} frames")
+        worker = partial(presegment_frame, settings=self.settings)
+        n_results = 0
+        for index, mask in map_frames(self.dataset, worker, indices, n_workers=n_workers, cancel=self.cancelled):
+            if mask is not None:
+                self.results.put((index, mask))
+                n_results += 1
+        if not self.cancelled.is_set():
+            logger.info(f"pre-segmented {n_results} frames")
@@ -0,0 +1,161 @@
+from enum import IntEnum, auto
+from typing import Any, Callable, Iterator, Optional
+
+import numpy as np
+import numpy.typing as npt
+from loguru import logger
+from scipy.ndimage import distance_transform_edt
+
+from simpleseg.data.dataclass import AbstractData
+from simpleseg.data.parallel import MaskJob
+
+
+class PropagationMethod(IntEnum):
+    NEAREST = auto()  # copy the mask of the nearest keyframe
+    INTERPOLATE = auto()  # interpolate the signed distance transforms of both keyframes
+
+
+def class_distances(mask: npt.NDArray[Any]) -> dict[int, npt.NDArray[np.float32]]:
+    """signed distance to the border of every class in mask, positive inside"""
+    distances = {}
+    for class_int in np.unique(mask):
+        if class_int == 0:
+            continue
+        binary = mask == class_int
+        inside, outside = distance_transform_edt(binary), distance_transform_edt(~binary)
+        distances[int(class_int)] = (inside - outside).astype(np.float32)
+    return distances
+
+
+def interpolate_masks(
+    distances_a: dict[int, npt.NDArray[np.float32]],
+    distances_b: dict[int, npt.NDArray[np.float32]],
+    shape: tuple,
+    ts: list[float],
+) -> Iterator[npt.NDArray[Any]]:
+    """
+    yields the masks at the positions t (0: mask a, 1: mask b) between two masks given by class_distances().
+    a pixel gets the class with the largest interpolated distance if that is positive, 0 otherwise.
+    a class missing in one of the masks has distance -1 there, it shrinks towards that mask and is gone there.
+    shapes should overlap between the keyframes, disjoint shapes fade out and in instead of moving.
+    """
+    classes = np.array(sorted(set(distances_a) | set(distances_b)))
+    if len(classes) == 0:
+        for _ in ts:
+            yield np.zeros(shape, dtype=int)
+        return
+    missing = np.full(shape, -1.0, dtype=np.float32)
+    stack_a = np.stack([distances_a.get(int(class_int), missing) for class_int in classes])
+    stack_b = np.stack([distances_b.get(int(class_int), missing) for class_int in classes])
+    difference = stack_b - stack_a
+    for t in ts:
+        interpolated = stack_a + np.float32(t) * difference
+        best = interpolated.argmax(axis=0)
+        inside = np.take_along_axis(interpolated, best[np.newaxis], axis=0)[0] > 0
+        yield np.where(inside, classes[best], 0)
+
+
+def propagate_masks(
+    keyframes: list[int], targets: list[int], get_mask: Callable[[int], npt.NDArray[Any]], method: PropagationMethod
+) -> Iterator[tuple[int, npt.NDArray[Any]]]:
+    """
+    yields (index, mask) for the target frames, in order.
+    targets before the first / after the last keyframe get a copy of that keyframe.
+    get_mask(index) returns the mask of a keyframe, at most two keyframes are loaded at a time.
+    """
+    assert keyframes, "no keyframes"
+    keyframes = sorted(keyframes)
+    targets = sorted(targets)
+    loaded: dict[int, npt.NDArray[Any]] = {}
+
+    def load(index: int) -> npt.NDArray[Any]:
+        if index not in loaded:
+            while len(loaded) >= 2:
+                loaded.pop(next(iter(loaded)))  # the oldest keyframe
+            loaded[index] = get_mask(index)
+        return loaded[index]
+
+    gap_start = np.searchsorted(keyframes, targets)  # keyframes[gap_start - 1] < target < keyframes[gap_start]
+    distances: dict[int, dict[int, npt.NDArray[np.float32]]] = {}
+    position = 0
+    while position < len(targets):
+        gap = gap_start[position]
+        gap_end = position
+        while gap_end < len(targets) and gap_start[gap_end] == gap:
+            gap_end += 1
+        gap_targets = targets[position:gap_end]
+        position = gap_end
+        if gap == 0 or gap == len(keyframes):
+            source = keyframes[0] if gap == 0 else keyframes[-1]
+            for index in gap_targets:
+                yield index, load(source).copy()
+            continue
+        a, b = keyframes[gap - 1], keyframes[gap]
+        if method is PropagationMethod.NEAREST:
+            for index in gap_targets:
+                yield index, load(a if index - a <= b - index else b).copy()
+            continue
+        for keyframe in (a, b):
+            if keyframe not in distances:
+                distances[keyframe] = class_distances(load(keyframe))
+        distances = {keyframe: distances[keyframe] for keyframe in (a, b)}
+        ts = [(index - a) / (b - a) for index in gap_targets]
+        yield from zip(gap_targets, interpolate_masks(distances[a], distances[b], load(a).shape, ts))
+
+
+class Propagation(MaskJob):
+    """
+    fills the unlabelled frames of a sequence from the labelled keyframes.
+    keyframes are the frames with labels, either in the given modified masks, according to the
+    frame stats or, for frames without stats, in the mask of the dataset.
+    frames with a modified mask are neither keyframes nor targets unless they contain labels.
+    the frame stats may be outdated, a target is only filled if its mask in the dataset is still empty.
+    """
+
+    def __init__(
+        self,
+        dataset: AbstractData,
+        method: PropagationMethod,
+        modified_masks: dict[int, npt.NDArray[Any]],
+        labelled: dict[int, bool],
+    ):
+        super().__init__(dataset)
+        self.method = method
+        self.modified_masks = modified_masks
+        self.labelled = labelled
+
+    def is_labelled(self, index: int) -> Optional[bool]:
+        """None: modified but empty, neither keyframe nor target"""
+        if index in self.modified_masks:
+            return True if self.modified_masks[index].any() else None
+        if index in self.labelled:
+            return self.labelled[index]
+        return bool(self.dataset.get_mask(index).any())
+
+    def get_mask(self, index: int) -> npt.NDArray[Any]:
+        if index in self.modified_masks:
+            return self.modified_masks[index]
+        return self.dataset.get_mask(index)
+
+    def run(self) -> None:
+        keyframes, targets = [], []
+        for index in range(len(self.dataset)):
+            if self.cancelled.is_set():
+                return
+            labelled = self.is_labelled(index)
+            if labelled is not None:
+                (keyframes if labelled else targets).append(index)
+        if not keyframes or not targets:
+            logger.info("nothing to propagate")
+            return
+        logger.info(f"propagating {len(keyframes)} keyframes to {len(targets)} frames ({self.method.name.lower()})")
+        for index, mask in propagate_masks(keyframes, targets, self.get_mask, self.method):
+            if self.cancelled.is_set():
+                return
+            if not mask.any():
+                continue
+            if index in self.labelled and self.dataset.get_mask(index).any():
+                logger.debug(f"frame {index} was labelled since the frame stats were taken, skipped")
+                continue
+            self.results.put((index, mask))
+        logger.info("propagation finished")
@@ -0,0 +1,175 @@
+import hashlib
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+import numpy.typing as npt
+from loguru import logger
+
+from simpleseg.data.dataclass import AbstractData
+from simpleseg.data.frame_stats import FrameStats, FrameStatsIndex, compute_frame_stats, get_stats_path
+from simpleseg.data.parallel import FrameCheckpoint, map_frames
+
+
+def make_lut(mapping: dict[int, int]) -> npt.NDArray[Any]:
+    """
+    lookup table for masks with values 0 to 255, classes not in mapping keep their value
+    * merge class 3 into class 1: {3: 1}
+    * drop class 7: {7: 0}
+    """
+    lut = np.arange(256)
+    for old_class, new_class in mapping.items():
+        assert 0 <= old_class <= 255 and 0 <= new_class <= 255, f"invalid mapping {old_class} -> {new_class}"
+        lut[old_class] = new_class
+    # applying the remap twice must not change the result, an interrupted run can be resumed safely then
+    assert np.array_equal(lut[lut], lut), "classes must not be mapped onto remapped classes, e.g. swaps"
+    return lut
+
+
+@dataclass
+class RemapPreview:
+    """
+    pixels[c]: number of pixels of class c that change
+    frames[c]: number of frames containing class c
+    """
+
+    mapping: dict[int, int]
+    n_frames: int
+    pixels: dict[int, int] = field(default_factory=dict)
+    frames: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def n_pixels(self) -> int:
+        return sum(self.pixels.values())
+
+    def summary(self) -> str:
+        lines = [f"remapping {self.n_pixels} pixels of {self.n_frames} frames"]
+        for old_class, new_class in sorted(self.mapping.items()):
+            lines.append(
+                f"class {old_class} -> {new_class}: {self.pixels.get(old_class, 0)} pixels "
+                f"in {self.frames.get(old_class, 0)} frames"
+            )
+        return "\n".join(lines)
+
+
+@dataclass
+class RemapReport:
+    """
+    counts of the frames processed by this run
+    n_resumed_frames: frames processed by an interrupted run before, taken from the checkpoint
+    """
+
+    n_frames: int
+    n_changed_frames: int = 0
+    n_changed_pixels: int = 0
+    n_resumed_frames: int = 0
+
+    def summary(self) -> str:
+        summary = f"changed {self.n_changed_pixels} pixels in {self.n_changed_frames} of {self.n_frames} frames"
+        if self.n_resumed_frames:
+            summary += f", {self.n_resumed_frames} frames were done by a previous run"
+        return summary
+
+
+def preview_remap_classes(
+    dataset: AbstractData, mapping: dict[int, int], n_workers: Optional[int] = None
+) -> RemapPreview:
+    """
+    dry run of remap_classes(), nothing is written.
+    counts are taken from the frame stats of the dataset, missing stats and the stats of masks changed since
+    they were computed (see AbstractData.get_mask_mtime) are computed (and cached) first.
+    """
+    make_lut(mapping)
+    stats_index = FrameStatsIndex.for_dataset(dataset)
+    stats_index.compute(dataset, n_workers=n_workers)
+    preview = RemapPreview(mapping=dict(mapping), n_frames=len(dataset))
+    for index in range(len(dataset)):
+        stats = stats_index[index]
+        assert stats is not None
+        for old_class, new_class in mapping.items():
+            if old_class != new_class and stats.contains(old_class):
+                preview.pixels[old_class] = preview.pixels.get(old_class, 0) + stats.class_counts[old_class]
+                preview.frames[old_class] = preview.frames.get(old_class, 0) + 1
+    return preview
+
+
+def remap_frame(dataset: AbstractData, index: int, lut: npt.NDArray[Any]) -> dict[str, Any]:
+    """worker function, returns the remapped mask if it changes. nothing is written, see save_remapped()"""
+    mask = dataset.get_mask(index)
+    remapped = lut[mask]
+    n_changed = int(np.count_nonzero(remapped != mask))
+    return {
+        "changed": n_changed,
+        "class_counts": compute_frame_stats(remapped).class_counts,
+        "mask": remapped if n_changed else None,
+    }
+
+
+def save_remapped(
+    dataset: AbstractData, results: Iterable[tuple[int, dict[str, Any]]]
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    """
+    writes the masks returned by remap_frame() in the calling process, mask stores need not be process safe
+    (e.g. a mask archive) and the caller's dataset sees the new masks. the results are yielded without the mask
+    """
+    for index, result in results:
+        mask = result.pop("mask")
+        if mask is not None:
+            dataset.save_mask(mask, index)
+        result["mask_mtime"] = dataset.get_mask_mtime(index)
+        yield index, result
+
+
+def get_remap_checkpoint_path(dataset: AbstractData, lut: npt.NDArray[Any]) -> Optional[Path]:
+    """one checkpoint per dataset and mapping, next to the frame stats"""
+    stats_path = get_stats_path(dataset)
+    if stats_path is None:
+        return None
+    lut_hash = hashlib.sha1(lut.astype(np.int64).tobytes()).hexdigest()[:12]
+    return stats_path.with_name(f".simpleseg-remap-{dataset.name}-{lut_hash}.jsonl")
+
+
+def remap_classes(
+    dataset: AbstractData,
+    mapping: dict[int, int],
+    n_workers: Optional[int] = None,
+    checkpoint_path: Optional[Path] = None,
+) -> RemapReport:
+    """
+    applies mapping {old class: new class} to every mask of the dataset, the masks are remapped in a process
+    pool and saved by the calling process. see preview_remap_classes() for a dry run.
+    * progress is recorded in a checkpoint, an interrupted run continues where it stopped when called again.
+      the default checkpoint lives next to the dataset and is specific to the mapping, it is deleted when the
+      run completes
+    * the frame stats of the dataset are updated, the report counts the frames processed by this run
+    * the dataset must not be open in SegmentationApp meanwhile, unsaved edits there would overwrite the result
+    """
+    lut = make_lut(mapping)
+    if checkpoint_path is None:
+        checkpoint_path = get_remap_checkpoint_path(dataset, lut)
+    checkpoint = FrameCheckpoint(checkpoint_path) if checkpoint_path else None
+    indices = range(len(dataset))
+    todo = checkpoint.todo(indices) if checkpoint else list(indices)
+    report = RemapReport(n_frames=len(dataset), n_resumed_frames=len(indices) - len(todo))
+    logger.info(f"remapping {len(todo)} frames ({report.n_resumed_frames} already done)")
+
+    # the frames of an interrupted run were recorded in the frame stats by that run
+    stats_index = FrameStatsIndex.for_dataset(dataset)
+    results_iter = map_frames(dataset, partial(remap_frame, lut=lut), todo, n_workers=n_workers)
+    # a frame is recorded in the checkpoint only after its mask was saved
+    results_iter = save_remapped(dataset, results_iter)
+    if checkpoint:
+        results_iter = checkpoint.record(results_iter)
+    for index, result in results_iter:
+        if result["changed"]:
+            report.n_changed_frames += 1
+            report.n_changed_pixels += result["changed"]
+            stats = FrameStats(class_counts=result["class_counts"], mask_mtime=result["mask_mtime"])
+            stats_index.record(index, stats)
+    stats_index.save()
+    if checkpoint:
+        checkpoint.remove()
+    logger.info(report.summary())
+    return report
@@ -0,0 +1,123 @@
+import json
+import os
+import re
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator, Optional
+
+import numpy as np
+import numpy.typing as npt
+from loguru import logger
+
+from simpleseg.data.dataclass import AbstractData
+from simpleseg.data.mask_ops import apply_operation
+
+
+def get_journal_path(dataset: AbstractData, owner: Optional[str] = None) -> Optional[Path]:
+    """
+    stored next to the dataset like the frame stats, datasets without a dataset_path attribute have no journal.
+    annotators working on a dataset at the same time (see WorkQueue) need a journal each, named by the owner
+    """
+    dataset_path = getattr(dataset, "dataset_path", None)
+    if dataset_path is None:
+        return None
+    dataset_path = Path(dataset_path)
+    base_dir = dataset_path if dataset_path.is_dir() else dataset_path.parent
+    if owner is None:
+        return base_dir / f".simpleseg-journal-{dataset.name}.jsonl"
+    safe_owner = re.sub(r"[^\w.@-]", "_", owner)  # e.g. the ':' of user@host:pid
+    return base_dir / f".simpleseg-journal-{dataset.name}-{safe_owner}.jsonl"
+
+
+class StrokeJournal:
+    """
+    write-ahead log of the unsaved edits of a dataset, one json line per operation (see mask_ops).
+    every edit is appended and flushed, a crashed session is recovered by replaying the journal onto
+    the saved masks. the operations of a frame are removed from the journal when the frame is saved
+    or discarded, the file is rewritten then and deleted when no unsaved edits are left.
+    without a path the journal does nothing.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.lines: dict[int, list[str]] = {}  # json lines per frame, in order
+        self.file: Optional[IO[str]] = None
+        self.load()
+
+    @classmethod
+    def for_dataset(cls, dataset: AbstractData, owner: Optional[str] = None) -> "StrokeJournal":
+        return cls(get_journal_path(dataset, owner))
+
+    def __contains__(self, frame_index: int) -> bool:
+        return frame_index in self.lines
+
+    def frames(self) -> list[int]:
+        return sorted(self.lines)
+
+    def load(self) -> None:
+        if self.path is None or not self.path.is_file():
+            return
+        content = self.path.read_text()
+        for line in content.splitlines():
+            try:
+                frame_index = int(json.loads(line)["frame"])
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                logger.warning(f"skipping damaged line in {self.path}")  # e.g. cut off by a crash
+                continue
+            self.lines.setdefault(frame_index, []).append(line)
+        if content and not content.endswith("\n"):
+            self.compact()  # appending to a cut off line would damage the next line as well
+
+    def append(self, frame_index: int, operation: dict[str, Any]) -> None:
+        if self.path is None:
+            return
+        line = json.dumps({"frame": frame_index, **operation})
+        self.lines.setdefault(frame_index, []).append(line)
+        if self.file is None:
+            self.file = open(self.path, "a")
+        self.file.write(line + "\n")
+        self.file.flush()  # reaches the os, survives a crash of the process
+
+    def drop(self, frame_index: int) -> None:
+        """forgets the operations of a frame, called when it was saved or discarded"""
+        if self.lines.pop(frame_index, None) is not None:
+            self.compact()
+
+    def compact(self) -> None:
+        if self.path is None:
+            return
+        self.close()
+        if not self.lines:
+            self.path.unlink(missing_ok=True)
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp_path.write_text("".join(line + "\n" for lines in self.lines.values() for line in lines))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.warning(f"could not compact {self.path}")
+
+    def replay(
+        self, read_mask: Callable[[int], npt.NDArray[Any]], n_frames: int
+    ) -> Iterator[tuple[int, npt.NDArray[Any], npt.NDArray[Any]]]:
+        """
+        yields (frame index, clean mask, mask) for every journaled frame,
+        mask is a copy of the clean mask returned by read_mask() with the operations applied
+        """
+        for frame_index in self.frames():
+            if frame_index >= n_frames:
+                logger.warning(f"journal contains frame {frame_index}, the dataset has {n_frames} frames")
+                continue
+            clean_mask = read_mask(frame_index)
+            mask = np.array(clean_mask)
+            try:
+                for line in self.lines[frame_index]:
+                    apply_operation(mask, json.loads(line))
+            except (AssertionError, KeyError, ValueError):
+                logger.opt(exception=True).warning(f"could not replay the journal of frame {frame_index}")
+                continue
+            yield frame_index, clean_mask, mask
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+import numpy as np
+import numpy.typing as npt
+from skimage.segmentation import felzenszwalb, slic
+
+from simpleseg.shared_variables import Region
+
+
+@dataclass(frozen=True)
+class SuperpixelSettings:
+    """
+    method: "slic" or "felzenszwalb"
+    n_segments, compactness: slic only, images are floats in [0, 1] so compactness is small
+    scale, min_size: felzenszwalb only
+    sigma: gaussian smoothing before segmenting
+    """
+
+    method: str = "slic"
+    n_segments: int = 400
+    compactness: float = 0.1
+    scale: float = 100.0
+    min_size: int = 50
+    sigma: float = 0.5
+
+    def __post_init__(self):
+        assert self.method in ("slic", "felzenszwalb"), f"unknown superpixel method {self.method}"
+
+
+def compute_superpixels(img: npt.NDArray[Any], settings: SuperpixelSettings) -> "Superpixels":
+    """img: 2d or 3d float"""
+    channel_axis = -1 if img.ndim == 3 else None
+    if settings.method == "slic":
+        labels = slic(
+            img,
+            n_segments=settings.n_segments,
+            compactness=settings.compactness,
+            sigma=settings.sigma,
+            channel_axis=channel_axis,
+            start_label=0,
+        )
+    else:
+        labels = felzenszwalb(
+            img, scale=settings.scale, sigma=settings.sigma, min_size=settings.min_size, channel_axis=channel_axis
+        )
+    return Superpixels(labels)
+
+
+class Superpixels:
+    """
+    superpixel labels of a frame with the pixels grouped by label. the grouping (one argsort) and the
+    bounding boxes are computed once, selecting the superpixel under a click is a slice of the sorted pixels then.
+    """
+
+    def __init__(self, labels: npt.NDArray[Any]):
+        # relabel to 0 .. n - 1 without gaps, every label owns at least one pixel
+        _, inverse = np.unique(labels, return_inverse=True)
+        self.labels = inverse.astype(np.int32).reshape(labels.shape)
+        self.shape = self.labels.shape
+        flat = self.labels.ravel()
+        self.order = np.argsort(flat, kind="stable")
+        self.starts = np.concatenate([[0], np.cumsum(np.bincount(flat))])
+        rows, cols = np.divmod(self.order, self.shape[1])
+        self.row_min = np.minimum.reduceat(rows, self.starts[:-1])
+        self.row_max = np.maximum.reduceat(rows, self.starts[:-1])
+        self.col_min = np.minimum.reduceat(cols, self.starts[:-1])
+        self.col_max = np.maximum.reduceat(cols, self.starts[:-1])
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return self.labels.nbytes + self.order.nbytes
+
+    def label_at(self, x: int, y: int) -> int:
+        return int(self.labels[y, x])
+
+    def pixels(self, label: int) -> npt.NDArray[Any]:
+        """flat indices of the pixels of a superpixel"""
+        return self.order[self.starts[label] : self.starts[label + 1]]
+
+    def region(self, label: int) -> Region:
+        return (
+            slice(int(self.row_min[label]), int(self.row_max[label]) + 1),
+            slice(int(self.col_min[label]), int(self.col_max[label]) + 1),
+        )
+
+    def apply(self, mask: npt.NDArray[Any], x: int, y: int, value: int) -> Region:
+        """sets the superpixel at (x, y) to value, in place, returns the touched region"""
+        assert mask.shape == self.shape, "superpixels of a different resolution"
+        label = self.label_at(x, y)
+        np.put(mask, self.pixels(label), value)
+        return self.region(label)
+
+    def selection(self, x: int, y: int) -> tuple[Region, npt.NDArray[np.bool_]]:
+        """region and the pixels inside it that belong to the superpixel at (x, y)"""
+        label = self.label_at(x, y)
+        region = self.region(label)
+        rows, cols = np.divmod(self.pixels(label), self.shape[1])
+        selected = np.zeros((region[0].stop - region[0].start, region[1].stop - region[1].start), dtype=bool)
+        selected[rows - region[0].start, cols - region[1].start] = True
+        return region, selected
+
+
+class SuperpixelCache:
+    """
+    lru cache of superpixels, keyed by (frame index, settings) and bounded by the total size of the cached
+    superpixels. the last entry is kept even if it is larger than max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024**2):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.entries: OrderedDict[Hashable, Superpixels] = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable) -> Optional[Superpixels]:
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key: Hashable, superpixels: Superpixels) -> None:
+        if key in self.entries:
+            self.evict(key)
+        self.entries[key] = superpixels
+        self.n_bytes += superpixels.nbytes
+        while self.n_bytes > self.max_bytes and len(self.entries) > 1:
+            self.evict(next(iter(self.entries)))
+
+    def evict(self, key: Hashable) -> None:
+        self.n_bytes -= self.entries.pop(key).nbytes
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.n_bytes = 0
@@ -0,0 +1,366 @@
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+import numpy as np
+import numpy.typing as npt
+from loguru import logger
+from PIL import Image
+
+from simpleseg.data.dataclass import AbstractData
+from simpleseg.data.io import to_native_dtype
+from simpleseg.data.mask_archive import MaskArchive
+from simpleseg.data.mask_store import MaskDirStore, MaskStore
+from simpleseg.validation.data_validation import is_2d_img, is_int_img, validate_image_specs
+
+
+def read_tiff_header(f: BinaryIO) -> tuple[str, int, bool]:
+    """returns the struct byte order, the offset of the first IFD and whether the file is a BigTIFF"""
+    f.seek(0)
+    header = f.read(16)
+    byteorder = {b"II": "<", b"MM": ">"}.get(header[:2])
+    if byteorder is None:
+        raise ValueError(f"{getattr(f, 'name', 'file')} is not a tiff file")
+    (magic,) = struct.unpack(byteorder + "H", header[2:4])
+    if magic == 42:
+        return byteorder, struct.unpack(byteorder + "I", header[4:8])[0], False
+    if magic == 43:
+        return byteorder, struct.unpack(byteorder + "Q", header[8:16])[0], True
+    raise ValueError(f"{getattr(f, 'name', 'file')} is not a tiff file")
+
+
+def scan_tiff_page_offsets(tiff_path: Path) -> npt.NDArray[np.uint64]:
+    """
+    walks the IFD chain of a (Big)TIFF file and returns the file offset of every page.
+    only the IFD headers are read, no pixel data is decoded.
+    """
+    with tiff_path.open("rb") as f:
+        byteorder, offset, bigtiff = read_tiff_header(f)
+        count_fmt, entry_size, next_fmt = ("Q", 20, "Q") if bigtiff else ("H", 12, "I")
+        count_size = struct.calcsize(count_fmt)
+        next_size = struct.calcsize(next_fmt)
+
+        offsets: list[int] = []
+        seen: set[int] = set()
+        while offset and offset not in seen:
+            seen.add(offset)
+            offsets.append(offset)
+            f.seek(offset)
+            (n_entries,) = struct.unpack(byteorder + count_fmt, f.read(count_size))
+            f.seek(offset + count_size + n_entries * entry_size)
+            (offset,) = struct.unpack(byteorder + next_fmt, f.read(next_size))
+    return np.array(offsets, dtype=np.uint64)
+
+
+# integer tag types, other types are not needed to locate the pixel data
+TIFF_TAG_FORMATS = {1: "B", 3: "H", 4: "I", 13: "I", 16: "Q", 18: "Q"}
+# sample format tag value: numpy kind
+TIFF_SAMPLE_KINDS = {1: "u", 2: "i", 3: "f"}
+
+
+@dataclass
+class TiffStrips:
+    """location of the pixel data of an uncompressed page, stored in strips of full rows"""
+
+    shape: tuple[int, ...]
+    dtype: np.dtype
+    offsets: list[int]
+    byte_counts: list[int]
+
+    @property
+    def row_bytes(self) -> int:
+        return int(np.prod(self.shape[1:])) * self.dtype.itemsize
+
+
+def read_tiff_tags(f: BinaryIO, ifd_offset: int, byteorder: str, bigtiff: bool) -> dict[int, tuple[int, ...]]:
+    """the integer tags of an IFD"""
+    count_fmt, entry_fmt, value_fmt = ("Q", "HHQ", "Q") if bigtiff else ("H", "HHI", "I")
+    value_size = struct.calcsize(value_fmt)
+    entry_size = struct.calcsize(byteorder + entry_fmt) + value_size
+    f.seek(ifd_offset)
+    (n_entries,) = struct.unpack(byteorder + count_fmt, f.read(struct.calcsize(count_fmt)))
+    entries = f.read(n_entries * entry_size)
+    tags = {}
+    external: dict[int, tuple[int, str]] = {}  # values that do not fit into the entry: offset, format
+    for position in range(0, len(entries), entry_size):
+        entry = entries[position : position + entry_size]
+        tag, tag_type, count = struct.unpack(byteorder + entry_fmt, entry[:-value_size])
+        if tag_type not in TIFF_TAG_FORMATS:
+            continue
+        values_fmt = f"{byteorder}{count}{TIFF_TAG_FORMATS[tag_type]}"
+        values_size = struct.calcsize(values_fmt)
+        if values_size <= value_size:
+            tags[tag] = struct.unpack(values_fmt, entry[-value_size:][:values_size])
+        else:
+            external[tag] = struct.unpack(byteorder + value_fmt, entry[-value_size:])[0], values_fmt
+    for tag, (values_offset, values_fmt) in external.items():
+        f.seek(values_offset)
+        tags[tag] = struct.unpack(values_fmt, f.read(struct.calcsize(values_fmt)))
+    return tags
+
+
+def read_tiff_strips(f: BinaryIO, ifd_offset: int, byteorder: str, bigtiff: bool) -> Optional[TiffStrips]:
+    """
+    the strips of a page, None for pages that have to be decoded by PIL:
+    compressed, tiled, planar, palette or with samples that are not 8, 16, 32 or 64 bit
+    """
+    # tags: 256 width, 257 height, 258 bits per sample, 259 compression, 262 photometric interpretation,
+    # 273 strip offsets, 277 samples per pixel, 279 strip byte counts, 284 planar configuration, 339 sample format
+    tags = read_tiff_tags(f, ifd_offset, byteorder, bigtiff)
+    width, height = tags.get(256, (0,))[0], tags.get(257, (0,))[0]
+    n_samples = tags.get(277, (1,))[0]
+    bits = set(tags.get(258, (1,)))
+    sample_format = set(tags.get(339, (1,)))
+    photometric = tags.get(262, (None,))[0]
+    if tags.get(259, (1,))[0] != 1 or 273 not in tags or 279 not in tags:
+        return None  # compressed or tiled
+    if tags.get(284, (1,))[0] != 1 and n_samples > 1:
+        return None  # planar
+    if len(bits) != 1 or bits & {8, 16, 32, 64} != bits or len(sample_format) != 1:
+        return None
+    if sample_format & TIFF_SAMPLE_KINDS.keys() != sample_format:
+        return None
+    if not ((photometric == 1 and n_samples == 1) or (photometric == 2 and n_samples in (3, 4))):
+        return None
+    dtype = np.dtype(f"{byteorder}{TIFF_SAMPLE_KINDS[sample_format.pop()]}{bits.pop() // 8}")
+    shape = (height, width) if n_samples == 1 else (height, width, n_samples)
+    strips = TiffStrips(shape=shape, dtype=dtype, offsets=list(tags[273]), byte_counts=list(tags[279]))
+    if len(strips.offsets) != len(strips.byte_counts) or sum(strips.byte_counts) != height * strips.row_bytes:
+        return None
+    return strips
+
+
+def load_tiff_page_offsets(tiff_path: Path) -> npt.NDArray[np.uint64]:
+    """
+    returns the page offsets of a tiff file. the offsets are cached in a sidecar file
+    (<tiff_path>.pageindex.npz) and only rescanned when the tiff file changed.
+    """
+    index_path = tiff_path.with_name(tiff_path.name + ".pageindex.npz")
+    stat = tiff_path.stat()
+    if index_path.is_file():
+        with np.load(index_path) as index:
+            if index["size"] == stat.st_size and index["mtime_ns"] == stat.st_mtime_ns:
+                return index["offsets"]
+    offsets = scan_tiff_page_offsets(tiff_path)
+    try:
+        with index_path.open("wb") as f:
+            np.savez(f, offsets=offsets, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    except OSError:
+        logger.warning(f"could not write page index {index_path}, index is kept in memory only")
+    return offsets
+
+
+class TiffPageReader:
+    """
+    random access to the pages of a multi-page tiff file.
+    uncompressed pages are read directly from the strips found through the cached page offsets,
+    so reading a page does not walk or decode the pages in front of it.
+    other pages are decoded by PIL, which walks the IFD chain up to a page once per session.
+    the file handles are shared, access to them is serialized with a lock.
+    """
+
+    def __init__(self, tiff_path: Path):
+        assert isinstance(tiff_path, Path)
+        assert tiff_path.is_file()
+        self.tiff_path = tiff_path
+        self.offsets = load_tiff_page_offsets(tiff_path)
+        self.file: Optional[BinaryIO] = None
+        self.image: Optional[Image.Image] = None
+        self.strips: dict[int, Optional[TiffStrips]] = {}
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def open_file(self) -> BinaryIO:
+        if self.file is None:
+            # unbuffered, so pages written in place through another handle are not read from a stale buffer
+            self.file = self.tiff_path.open("rb", buffering=0)
+            self.byteorder, _, self.bigtiff = read_tiff_header(self.file)
+        return self.file
+
+    def open(self) -> Image.Image:
+        if self.image is None:
+            self.image = Image.open(self.tiff_path)
+        return self.image
+
+    def close(self) -> None:
+        if self.image is not None:
+            self.image.close()
+            self.image = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def get_strips(self, index: int) -> Optional[TiffStrips]:
+        """the strips of an uncompressed page, None if the page has to be decoded by PIL"""
+        with self.lock:
+            if index not in self.strips:
+                f = self.open_file()
+                self.strips[index] = read_tiff_strips(f, int(self.offsets[index]), self.byteorder, self.bigtiff)
+            return self.strips[index]
+
+    def seek(self, index: int) -> Image.Image:
+        image = self.open()
+        image.seek(index)
+        return image
+
+    def read_page(self, index: int) -> npt.NDArray[Any]:
+        with self.lock:
+            strips = self.get_strips(index)
+            if strips is None:
+                return np.asarray(self.seek(index))
+            f = self.open_file()
+            data = bytearray()
+            for offset, byte_count in zip(strips.offsets, strips.byte_counts):
+                f.seek(offset)
+                data += f.read(byte_count)
+            return np.frombuffer(data, dtype=strips.dtype).reshape(strips.shape)
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["image"] = None
+        state["file"] = None
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+
+class MaskTiffStore(MaskStore):
+    """
+    stores all masks of a dataset as pages of one uncompressed uint8 multi-page tiff.
+    a page is overwritten in place, so saving a mask does not rewrite the stack.
+    """
+
+    def __init__(self, tiff_path: Path, n_frames: int, shape: tuple[int, int]):
+        assert isinstance(tiff_path, Path)
+        if not tiff_path.is_file():
+            self.create(tiff_path, n_frames, shape)
+        self.tiff_path = tiff_path
+        self.shape = shape
+        self.reader = TiffPageReader(tiff_path)
+        assert len(self.reader) == n_frames, "mask stack and image stack differ in number of pages"
+
+    @staticmethod
+    def create(tiff_path: Path, n_frames: int, shape: tuple[int, int]) -> None:
+        """
+        writes an empty BigTIFF stack. all IFDs are placed in front of the pixel data,
+        the zero filled pixel data is left as a sparse region of the file.
+        """
+        height, width = shape
+        page_size = height * width
+        # (tag, type, value), types: 3 = SHORT, 4 = LONG, 16 = LONG8
+        tags = [(256, 4, width), (257, 4, height), (258, 3, 8), (259, 3, 1), (262, 3, 1)]
+        tags_tail = [(277, 3, 1), (278, 4, height), (279, 16, page_size)]
+        ifd_size = 8 + 20 * (len(tags) + 1 + len(tags_tail)) + 8
+        data_start = 16 + n_frames * ifd_size
+        type_formats = {3: "H", 4: "I", 16: "Q"}
+
+        with tiff_path.open("wb") as f:
+            f.write(struct.pack("<2sHHHQ", b"II", 43, 8, 0, 16))
+            for page in range(n_frames):
+                entries = [*tags, (273, 16, data_start + page * page_size), *tags_tail]
+                f.write(struct.pack("<Q", len(entries)))
+                for tag, tag_type, value in entries:
+                    value_bytes = struct.pack("<" + type_formats[tag_type], value).ljust(8, b"\0")
+                    f.write(struct.pack("<HHQ", tag, tag_type, 1) + value_bytes)
+                next_offset = 16 + (page + 1) * ifd_size if page + 1 < n_frames else 0
+                f.write(struct.pack("<Q", next_offset))
+            f.truncate(data_start + n_frames * page_size)
+
+    def read(self, index: int) -> Optional[npt.NDArray[Any]]:
+        return self.reader.read_page(index).astype(int)
+
+    def write(self, mask: npt.NDArray[Any], index: int) -> None:
+        assert is_int_img(mask)
+        assert is_2d_img(mask)
+        assert mask.shape == self.shape
+        with self.reader.lock:
+            strips = self.reader.get_strips(index)
+            if strips is None or strips.dtype != np.uint8 or strips.shape != self.shape:
+                raise ValueError(f"page {index} of {self.tiff_path} is not an uncompressed 8 bit page")
+            mask_bytes = mask.astype(np.uint8).tobytes()
+            with self.tiff_path.open("r+b") as f:
+                start = 0
+                for offset, byte_count in zip(strips.offsets, strips.byte_counts):
+                    f.seek(offset)
+                    f.write(mask_bytes[start : start + byte_count])
+                    start += byte_count
+            self.reader.close()  # PIL keeps the decoded page
+
+
+class TiffStackData(AbstractData):
+    """
+    dataset of all pages of a multi-page tiff file
+
+    masks are stored either
+    * as one png per frame in mask_dir (default: <tiff name>_masks/ next to the tiff file)
+    * or as pages of a companion multi-page tiff (mask_tiff_path)
+    * or in a compressed mask archive (mask_archive_path)
+    """
+
+    def __init__(
+        self,
+        tiff_path: Path,
+        name: str,
+        mask_dir: Optional[Path] = None,
+        mask_tiff_path: Optional[Path] = None,
+        mask_archive_path: Optional[Path] = None,
+    ):
+        assert isinstance(tiff_path, Path)
+        mask_targets = [mask_dir, mask_tiff_path, mask_archive_path]
+        assert sum(target is not None for target in mask_targets) <= 1, "choose only one mask target"
+        self.dataset_path = tiff_path
+        self.name = name.replace(" ", "_")
+        self.reader = TiffPageReader(tiff_path)
+        self.frame_names = [f"{tiff_path.stem}-frame-{index:05d}" for index in range(len(self.reader))]
+
+        first_page = self.reader.read_page(0)
+        self.mask_shape: tuple[int, int] = first_page.shape[:2]
+
+        self.mask_store: MaskStore
+        if mask_tiff_path is not None:
+            self.mask_store = MaskTiffStore(mask_tiff_path, len(self), self.mask_shape)
+        elif mask_archive_path is not None:
+            self.mask_store = MaskArchive(mask_archive_path)
+        else:
+            mask_dir = mask_dir or tiff_path.with_name(f"{tiff_path.stem}_masks")
+            self.mask_store = MaskDirStore(mask_dir, self.frame_names)
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    def get_frame_names(self) -> list[str]:
+        return self.frame_names
+
+    def get_image(self, index: int) -> npt.NDArray[Any]:
+        page = self.reader.read_page(index)
+        if page.dtype == np.uint8:
+            img = page / 255
+        elif page.dtype == np.float64:
+            img = page.astype(np.float32)  # float64 is reserved for images in [0, 1]
+        else:
+            img = to_native_dtype(page)  # 16 bit and float pages keep their dtype, they are shown through a window
+        assert validate_image_specs(img)
+        return img
+
+    def get_mask(self, index: int) -> npt.NDArray[Any]:
+        mask = self.mask_store.read(index)
+        if mask is None:
+            mask = np.zeros(self.mask_shape, dtype=int)
+        assert is_int_img(mask)
+        assert is_2d_img(mask)
+        return mask
+
+    def save_mask(self, mask: npt.NDArray[Any], index: int) -> None:
+        assert mask.shape == self.mask_shape
+        self.mask_store.write(mask, index)
+
+    def get_mask_mtime(self, index: int) -> Optional[float]:
+        """only known for masks stored as png files, pages of a tiff and archive records have no own time"""
+        return self.mask_store.mtime(index)
@@ -0,0 +1,199 @@
+import getpass
+import json
+import os
+import socket
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from loguru import logger
+
+from simpleseg.data.dataclass import AbstractData
+
+# a lease not renewed for LEASE_DURATION seconds is stale (e.g. the annotator crashed) and can be claimed by others,
+# the app renews its leases every LEASE_RENEW_INTERVAL seconds
+LEASE_DURATION = 10 * 60.0
+LEASE_RENEW_INTERVAL = 60.0
+
+
+def get_lease_dir(dataset: AbstractData) -> Optional[Path]:
+    """stored next to the dataset like the frame stats, datasets without a dataset_path attribute are not shared"""
+    dataset_path = getattr(dataset, "dataset_path", None)
+    if dataset_path is None:
+        return None
+    dataset_path = Path(dataset_path)
+    base_dir = dataset_path if dataset_path.is_dir() else dataset_path.parent
+    return base_dir / f".simpleseg-leases-{dataset.name}"
+
+
+def default_owner() -> str:
+    return f"{getpass.getuser()}@{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass(frozen=True)
+class Lease:
+    owner: str
+    expires: float  # unix time
+
+
+def parse_lease(path: Path) -> Optional[Lease]:
+    try:
+        data = json.loads(path.read_text())
+        return Lease(owner=str(data["owner"]), expires=float(data["expires"]))
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class WorkQueue:
+    """
+    lease based sharding of the frames of a dataset between annotators working on it at the same time.
+    a lease is a lock file per frame in the lease directory, created with O_EXCL so exactly one annotator
+    gets a frame. the annotators claim batches of frames, a lease is
+    released when its frame was saved and expires if it is not renewed.
+    owner identifies the annotator, the same owner gets its own leases back after a restart.
+    without a lease directory every claim succeeds and nothing is written.
+    """
+
+    def __init__(
+        self, lease_dir: Optional[Path], owner: Optional[str] = None, lease_duration: float = LEASE_DURATION
+    ):
+        self.lease_dir = lease_dir
+        self.owner = owner or default_owner()
+        self.lease_duration = lease_duration
+        self.claimed: set[int] = set()
+        if lease_dir is not None:
+            lease_dir.mkdir(exist_ok=True)
+
+    @classmethod
+    def for_dataset(
+        cls, dataset: AbstractData, owner: Optional[str] = None, lease_duration: float = LEASE_DURATION
+    ) -> "WorkQueue":
+        lease_dir = get_lease_dir(dataset)
+        if lease_dir is None:
+            logger.warning(f"dataset {dataset.name} has no dataset_path, frames are not leased")
+        return cls(lease_dir, owner, lease_duration)
+
+    @property
+    def enabled(self) -> bool:
+        return self.lease_dir is not None
+
+    def lease_path(self, index: int) -> Path:
+        assert self.lease_dir is not None
+        return self.lease_dir / f"{index:06d}.lease"
+
+    def read_lease(self, index: int) -> Optional[Lease]:
+        """a lease file that cannot be parsed (being written or cut off) counts as a lease of an unknown owner"""
+        path = self.lease_path(index)
+        try:
+            modified = path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        lease = parse_lease(path)
+        return lease if lease is not None else Lease(owner="", expires=modified + self.lease_duration)
+
+    def write_lease(self, fd: int) -> None:
+        lease = {"owner": self.owner, "expires": time.time() + self.lease_duration}
+        with os.fdopen(fd, "w") as f:
+            json.dump(lease, f)
+
+    def owner_of(self, index: int) -> Optional[str]:
+        """owner of the valid lease of a frame, None if it is free"""
+        if not self.enabled:
+            return None
+        lease = self.read_lease(index)
+        if lease is None or lease.expires <= time.time():
+            return None
+        return lease.owner
+
+    def is_leased_by_other(self, index: int) -> bool:
+        owner = self.owner_of(index)
+        return owner is not None and owner != self.owner
+
+    def remove_stale_lease(self, index: int, stale: Lease) -> None:
+        """
+        moves the stale lease out of the way with a rename, which only one of several annotators wins.
+        a loser may have renamed the fresh lease of the winner instead, it is put back then.
+        """
+        path = self.lease_path(index)
+        moved = path.with_name(f"{path.name}.{os.getpid()}-{time.monotonic_ns()}.stale")
+        try:
+            os.rename(path, moved)
+        except FileNotFoundError:
+            return
+        moved_lease = parse_lease(moved)
+        if moved_lease is not None and moved_lease != stale:
+            try:
+                os.link(moved, path)
+            except FileExistsError:
+                pass
+        moved.unlink(missing_ok=True)
+
+    def claim(self, index: int) -> bool:
+        """True if the frame is leased to this owner afterwards"""
+        if not self.enabled:
+            return True
+        lease = self.read_lease(index)
+        if lease is not None:
+            if lease.owner == self.owner:
+                self.claimed.add(index)
+                return True
+            if lease.expires > time.time():
+                return False
+            logger.info(f"frame {index}: taking over the expired lease of {lease.owner or 'an unknown owner'}")
+            self.remove_stale_lease(index, lease)
+        try:
+            fd = os.open(self.lease_path(index), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False  # another annotator was faster
+        self.write_lease(fd)
+        self.claimed.add(index)
+        return True
+
+    def claim_batch(self, candidates: Iterable[int], batch_size: int) -> list[int]:
+        """claims up to batch_size of the candidates in order, frames leased by others are skipped"""
+        assert batch_size >= 1
+        batch = []
+        for index in candidates:
+            if len(batch) >= batch_size:
+                break
+            if index not in self.claimed and self.claim(index):
+                batch.append(index)
+        if batch:
+            logger.info(f"{self.owner} claimed frames {batch}")
+        return batch
+
+    def renew(self) -> list[int]:
+        """extends the leases of the claimed frames, returns the frames whose lease was taken over meanwhile"""
+        if not self.enabled:
+            return []
+        lost = []
+        for index in sorted(self.claimed):
+            lease = self.read_lease(index)
+            if lease is None:
+                if not self.claim(index):  # removed by hand, claimed again unless someone else was faster
+                    lost.append(index)
+                continue
+            if lease.owner != self.owner:
+                lost.append(index)
+                continue
+            path = self.lease_path(index)
+            temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            self.write_lease(os.open(temp_path, os.O_CREAT | os.O_TRUNC | os.O_WRONLY))
+            os.replace(temp_path, path)
+        if lost:
+            logger.warning(f"the leases of frames {lost} expired and were taken over by other annotators")
+            self.claimed.difference_update(lost)
+        return lost
+
+    def release(self, index: int) -> None:
+        self.claimed.discard(index)
+        if not self.enabled:
+            return
+        lease = self.read_lease(index)
+        if lease is not None and lease.owner == self.owner:
+            self.lease_path(index).unlink(missing_ok=True)
+
+    def release_all(self) -> None:
+        for index in sorted(self.claimed):
+            self.release(index)
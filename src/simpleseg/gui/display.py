@@ -0,0 +1,233 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from simpleseg.gui.overlay import map_bands_serial
+from simpleseg.kernels.backend import lookup
+from simpleseg.shared_variables import CHANNEL_COLORS
+
+if TYPE_CHECKING:
+    from simpleseg.gui.overlay import TiledRenderer
+
+# images of these dtypes are mapped with a lookup table of all their values
+LUT_DTYPES = (np.uint8, np.uint16)
+
+
+@dataclass(frozen=True)
+class WindowLevel:
+    """
+    intensity window that is stretched to the display range 0 .. 1, values below low are black, above high white.
+    level (center) and width are the usual contrast controls. hashable, it is part of the view cache key.
+    """
+
+    low: float
+    high: float
+
+    def __post_init__(self):
+        assert self.high > self.low, f"empty window {self.low} .. {self.high}"
+
+    @classmethod
+    def from_level_width(cls, level: float, width: float) -> "WindowLevel":
+        return cls(level - width / 2, level + width / 2)
+
+    @property
+    def level(self) -> float:
+        return (self.low + self.high) / 2
+
+    @property
+    def width(self) -> float:
+        return self.high - self.low
+
+
+IDENTITY_WINDOW = WindowLevel(0.0, 1.0)
+
+
+def intensity_range(img: npt.NDArray[Any]) -> tuple[float, float]:
+    """range of the window sliders: the value range of 8 bit and float64 images, the image min .. max else"""
+    if img.dtype == np.uint8:
+        return 0.0, 255.0
+    if img.dtype == np.float64:
+        return 0.0, 1.0
+    low, high = float(img.min()), float(img.max())
+    return low, max(high, low + 1.0)
+
+
+def auto_window(img: npt.NDArray[Any], saturated: float = 0.35, max_samples: int = 1_000_000) -> WindowLevel:
+    """saturates the darkest and brightest `saturated` percent, estimated on a subsample of large images"""
+    step = max(1, int(np.sqrt(img.size / max_samples)))
+    samples = img[::step, ::step]
+    low, high = np.percentile(samples, [saturated, 100 - saturated])
+    if high <= low:
+        low, high = intensity_range(img)
+    return WindowLevel(float(low), float(high))
+
+
+def initial_window(img: npt.NDArray[Any]) -> Optional[WindowLevel]:
+    """
+    window of a dataset, decided by the dtype of its first image (all frames share the dtype):
+    None for float64 images, they are in [0, 1] (see AbstractData.get_image) and shown as they are.
+    8 bit images get their full range, other dtypes a window estimated from the first image.
+    """
+    if img.dtype == np.float64:
+        return None
+    if img.dtype == np.uint8:
+        return WindowLevel(0.0, 255.0)
+    return auto_window(img)
+
+
+@lru_cache(maxsize=16)
+def window_lut(window: WindowLevel, n_values: int) -> npt.NDArray[np.float64]:
+    """display value of every integer 0 .. n_values - 1, read-only"""
+    lut = np.clip((np.arange(n_values, dtype=float) - window.low) / window.width, 0.0, 1.0)
+    lut.flags.writeable = False
+    return lut
+
+
+def apply_window(
+    img: npt.NDArray[Any], window: WindowLevel, out: Optional[npt.NDArray[Any]] = None
+) -> npt.NDArray[Any]:
+    """
+    maps img into out (float, same shape, allocated if not given).
+    uint8 / uint16 images are looked up in a table of all their values, other images are mapped in place in out.
+    """
+    if out is None:
+        out = np.empty(img.shape, dtype=float)
+    assert out.shape == img.shape and out.dtype == float
+    if img.dtype in LUT_DTYPES:
+        lookup(img, window_lut(window, np.iinfo(img.dtype).max + 1), out)
+        return out
+    np.subtract(img, window.low, out=out)
+    np.multiply(out, 1.0 / window.width, out=out)
+    np.clip(out, 0.0, 1.0, out=out)
+    return out
+
+
+@dataclass(frozen=True)
+class ChannelMapping:
+    """
+    selected channels of a multichannel image and their colors, the composite is the sum of the tinted channels.
+    hashable, it is part of the view cache key.
+    """
+
+    channels: tuple[int, ...]
+    colors: tuple[tuple[float, float, float], ...]
+
+    def __post_init__(self):
+        assert len(self.channels) == len(self.colors)
+
+    @classmethod
+    def from_channels(cls, channels: tuple[int, ...]) -> "ChannelMapping":
+        """every channel has its own color, toggling other channels does not change it"""
+        return cls(channels, tuple(CHANNEL_COLORS[channel % len(CHANNEL_COLORS)] for channel in channels))
+
+
+def is_multichannel(img: npt.NDArray[Any]) -> bool:
+    """images with 3 channels are shown as rgb, any other number of channels through a ChannelMapping"""
+    return img.ndim == 3 and img.shape[-1] != 3
+
+
+def initial_channel_mapping(img: npt.NDArray[Any]) -> Optional[ChannelMapping]:
+    """None for gray and rgb images, the first three channels otherwise"""
+    if not is_multichannel(img):
+        return None
+    return ChannelMapping.from_channels(tuple(range(min(3, img.shape[-1]))))
+
+
+def composite_channels(
+    img: npt.NDArray[Any], mapping: ChannelMapping, window: Optional[WindowLevel], out: npt.NDArray[Any]
+) -> npt.NDArray[Any]:
+    """
+    img: (h, w, n channels), float in [0, 1] or in its stored dtype with a window
+    out: (h, w, 3) float, the tinted channels are added up and clipped to 1
+    """
+    assert out.shape == (*img.shape[:2], 3) and out.dtype == float
+    out.fill(0.0)
+    channel_buffer = np.empty(img.shape[:2], dtype=float) if window is not None else None
+    for channel, color in zip(mapping.channels, mapping.colors):
+        values = img[..., channel]
+        if window is not None:
+            values = apply_window(values, window, channel_buffer)
+        for k in range(3):
+            if color[k] == 1.0:
+                np.add(out[..., k], values, out=out[..., k])
+            elif color[k] > 0.0:
+                np.add(out[..., k], values * color[k], out=out[..., k])
+    np.clip(out, 0.0, 1.0, out=out)
+    return out
+
+
+def get_display_shape(img: npt.NDArray[Any], mapping: Optional[ChannelMapping]) -> tuple[int, ...]:
+    return img.shape if mapping is None else (*img.shape[:2], 3)
+
+
+def render_display(
+    img: npt.NDArray[Any],
+    window: Optional[WindowLevel],
+    mapping: Optional[ChannelMapping],
+    out: npt.NDArray[Any],
+) -> npt.NDArray[Any]:
+    """maps img through window and channel mapping into out, one of them must be set"""
+    assert window is not None or mapping is not None
+    if mapping is None:
+        return apply_window(img, window, out)
+    return composite_channels(img, mapping, window, out)
+
+
+def display_image(
+    img: npt.NDArray[Any], window: Optional[WindowLevel], mapping: Optional[ChannelMapping] = None
+) -> npt.NDArray[Any]:
+    """img as float in [0, 1] gray or rgb, unchanged without window and mapping"""
+    if window is None and mapping is None:
+        return img
+    return render_display(img, window, mapping, np.empty(get_display_shape(img, mapping), dtype=float))
+
+
+DisplayKey = tuple[int, Optional[ChannelMapping]]
+
+
+class DisplayCache:
+    """
+    images mapped through a window and channel mapping, per (frame, channel mapping). switching between channel
+    selections is a lookup. mapping a frame again with another window reuses its buffer, dragging the window
+    sliders remaps the current frame in place without allocating. bounded by the total size of the buffers.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024**2):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.entries: OrderedDict[DisplayKey, tuple[Optional[WindowLevel], npt.NDArray[Any]]] = OrderedDict()
+
+    def get(
+        self,
+        index: int,
+        img: npt.NDArray[Any],
+        window: Optional[WindowLevel],
+        mapping: Optional[ChannelMapping] = None,
+        renderer: Optional["TiledRenderer"] = None,
+    ) -> npt.NDArray[Any]:
+        """renderer: maps large frames in row bands on a thread pool"""
+        key = (index, mapping)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            if entry[0] == window:
+                return entry[1]
+            buffer = entry[1]
+        else:
+            buffer = np.empty(get_display_shape(img, mapping), dtype=float)
+            self.n_bytes += buffer.nbytes
+        map_bands = map_bands_serial if renderer is None else renderer.map_bands
+        map_bands(lambda img_band, out_band: render_display(img_band, window, mapping, out_band), img, buffer)
+        self.entries[key] = (window, buffer)
+        while self.n_bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.n_bytes -= evicted.nbytes
+        return buffer
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.n_bytes = 0
@@ -1,8 +1,9 @@
 import tkinter
 import tkinter.ttk
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
 
 from simpleseg.gui.gui_canvasframe import CanvasFrameMpl
+from simpleseg.gui.gui_filmstrip import Filmstrip
 from simpleseg.gui.gui_mpl_tools import MplTools
 from simpleseg.gui.gui_tool_frame import ToolFrame
 from simpleseg.gui.gui_treeview import TreeViewDatasets, TreeViewFiles
@@ -11,6 +12,10 @@ if TYPE_CHECKING:
     from simpleseg.app import SegmentationApp
 
 
+# widgets that move their text cursor with the arrow keys, the keys do not change the frame there
+TEXT_INPUT_WIDGETS = (tkinter.Entry, tkinter.Spinbox, tkinter.Text, tkinter.ttk.Entry)  # incl. ttk Spinbox, Combobox
+
+
 class GUI:
     def __init__(self, app: "SegmentationApp"):
         # gui definition
@@ -21,6 +26,7 @@ class GUI:
         self.root.option_add("*font", "helvetica 9")
 
         self.canvas_frame = CanvasFrameMpl(master=self.root, app=self.app)
+        self.filmstrip = Filmstrip(master=self.root, app=self.app)
         self.mpl_tools = MplTools(app=self.app, canvas_frame=self.canvas_frame)
         self.sidebar_left = ToolFrame(master=self.root, app=self.app, mpl_tools=self.mpl_tools)
         self.sidebar_right = tkinter.Frame(master=self.root)
@@ -34,8 +40,19 @@ class GUI:
         self.sidebar_right.pack(side=tkinter.RIGHT, fill="y")
         self.sidebar_treeview_datasets.pack(side=tkinter.BOTTOM, fill="x")
         self.sidebar_treeview_frames.pack(side=tkinter.TOP, fill="both", expand=1)
+        self.filmstrip.pack(side=tkinter.BOTTOM, fill="x")
         self.canvas_frame.pack(side=tkinter.LEFT, fill=tkinter.BOTH, expand=1)
 
         # set functions
         self.sidebar_treeview_frames.select_func = self.app.set_frame_index
         self.sidebar_treeview_datasets.select_func = self.app.load_dataset_by_id
+
+        # frame navigation, holding a key scrubs through the frames
+        self.root.bind("<Left>", lambda event: self.on_arrow_key(event, self.app.set_frame_index_prev))
+        self.root.bind("<Right>", lambda event: self.on_arrow_key(event, self.app.set_frame_index_next))
+
+    @staticmethod
+    def on_arrow_key(event: tkinter.Event, step: Callable[[], None]) -> None:
+        if isinstance(event.widget, TEXT_INPUT_WIDGETS):
+            return
+        step()
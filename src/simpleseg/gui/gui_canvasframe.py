@@ -16,6 +16,8 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+FRAME_NAVIGATION_KEYS = ("left", "right")
+
 
 class CanvasFrameMpl(tkinter.LabelFrame):
     def __init__(self, master, app: "SegmentationApp") -> None:
@@ -35,7 +37,7 @@ class CanvasFrameMpl(tkinter.LabelFrame):
         self.canvas.get_tk_widget().pack(side=tkinter.TOP, fill=tkinter.BOTH, expand=1)
 
         # bindings
-        self.canvas.mpl_connect("key_press_event", key_press_handler)
+        self.canvas.mpl_connect("key_press_event", self.on_key_press)
 
         # mouse stuff
         self.canvas.mpl_connect("button_press_event", self.set_mouse_button)
@@ -52,9 +54,14 @@ class CanvasFrameMpl(tkinter.LabelFrame):
         self.canvas.get_tk_widget().focus_set()
 
     def init_imshow(self, shape) -> None:
-        matrix = np.zeros(shape=shape, dtype=int)
+        # zero strided placeholder, only sets the extent, the first draw_images() sets the data
+        matrix = np.broadcast_to(np.zeros(3), (*shape[:2], 3))
         self.im = self.ax.imshow(matrix, aspect="equal", vmin=0, vmax=1)
 
+    def set_title(self, title: str) -> None:
+        self.ax.set_title(title)
+        self.canvas.draw_idle()
+
     def draw_images(self, matrix) -> None:
         """
         img:     height x width x 3   -   0 to 1
@@ -68,6 +75,22 @@ class CanvasFrameMpl(tkinter.LabelFrame):
             self.im.set_data(matrix)
         self.canvas.draw_idle()
 
+    def draw_preview(self, matrix) -> None:
+        """
+        reduced resolution stand-in, stretched over the full image extent
+        matrix: height x width x 3, float 0 to 1 or uint8
+        """
+        assert is_3d_img(matrix)
+        if isinstance(self.im, AxesImage):
+            self.im.set_data(matrix)
+        self.canvas.draw_idle()
+
+    def on_key_press(self, event) -> None:
+        # left / right navigate between frames (bound in GUI), not through the toolbar history
+        if event.key in FRAME_NAVIGATION_KEYS:
+            return
+        key_press_handler(event, self.canvas, self.toolbar)
+
     def restore_focus(self, event=None) -> None:
         logger.info("set focus")
         self.canvas.get_tk_widget().focus_set()
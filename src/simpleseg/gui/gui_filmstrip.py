@@ -0,0 +1,88 @@
+import tkinter
+from typing import TYPE_CHECKING, Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+if TYPE_CHECKING:
+    from simpleseg.app import SegmentationApp
+
+THUMBNAIL_SIZE = 96
+THUMBNAIL_PADDING = 4
+
+
+def array_to_photoimage(thumbnail: npt.NDArray[np.uint8]) -> tkinter.PhotoImage:
+    """tk reads binary ppm data natively, no PIL.ImageTk required"""
+    height, width, _ = thumbnail.shape
+    header = f"P6 {width} {height} 255 ".encode()
+    return tkinter.PhotoImage(data=header + np.ascontiguousarray(thumbnail).tobytes(), format="PPM")
+
+
+class Filmstrip(tkinter.LabelFrame):
+    """
+    horizontal strip of image + mask thumbnails around the current frame, click a thumbnail to open the frame.
+    thumbnails are taken from app.thumbnails, missing ones are requested from the app and drawn when ready.
+    """
+
+    def __init__(self, master, app: "SegmentationApp", *args, **kwargs) -> None:
+        tkinter.LabelFrame.__init__(self, master, *args, **kwargs)
+        self.app = app
+        self.canvas = tkinter.Canvas(self, height=THUMBNAIL_SIZE + 2 * THUMBNAIL_PADDING, highlightthickness=0)
+        self.canvas.pack(side=tkinter.TOP, fill=tkinter.X, expand=1)
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<Button-1>", self.onclick)
+        self.photoimages: dict[int, tkinter.PhotoImage] = {}  # tk only keeps the image alive while referenced
+        self.slots: list[int] = []
+        self.center_index: Optional[int] = None
+
+    @property
+    def n_slots(self) -> int:
+        width = max(self.canvas.winfo_width(), THUMBNAIL_SIZE)
+        return max(1, width // (THUMBNAIL_SIZE + THUMBNAIL_PADDING))
+
+    def show(self, center_index: int) -> None:
+        self.center_index = center_index
+        self.redraw()
+
+    def redraw(self) -> None:
+        if self.center_index is None:
+            return
+        n_slots = self.n_slots
+        first = min(max(0, self.center_index - n_slots // 2), max(0, self.app.n - n_slots))
+        self.slots = list(range(first, min(first + n_slots, self.app.n)))
+        self.photoimages = {index: image for index, image in self.photoimages.items() if index in self.slots}
+
+        self.canvas.delete("all")
+        for position, frame_index in enumerate(self.slots):
+            self.draw_slot(position, frame_index)
+
+    def draw_slot(self, position: int, frame_index: int) -> None:
+        x0 = THUMBNAIL_PADDING + position * (THUMBNAIL_SIZE + THUMBNAIL_PADDING)
+        y0 = THUMBNAIL_PADDING
+        tag = f"slot-{frame_index}"
+        self.canvas.delete(tag)
+        thumbnail = self.app.get_thumbnail(frame_index)
+        if thumbnail is None:
+            self.app.request_thumbnail(frame_index)
+            self.canvas.create_rectangle(x0, y0, x0 + THUMBNAIL_SIZE, y0 + THUMBNAIL_SIZE, fill="gray20", tags=tag)
+        else:
+            if frame_index not in self.photoimages:
+                self.photoimages[frame_index] = array_to_photoimage(thumbnail)
+            self.canvas.create_image(x0, y0, image=self.photoimages[frame_index], anchor=tkinter.NW, tags=tag)
+        outline = "lime" if frame_index == self.center_index else "gray50"
+        width = 3 if frame_index == self.center_index else 1
+        self.canvas.create_rectangle(
+            x0, y0, x0 + THUMBNAIL_SIZE, y0 + THUMBNAIL_SIZE, outline=outline, width=width, tags=tag
+        )
+        self.canvas.create_text(x0 + 3, y0 + 3, text=str(frame_index), anchor=tkinter.NW, fill="white", tags=tag)
+
+    def update_thumbnail(self, frame_index: int) -> None:
+        """called when a thumbnail was rendered or invalidated"""
+        self.photoimages.pop(frame_index, None)
+        if frame_index in self.slots:
+            self.draw_slot(self.slots.index(frame_index), frame_index)
+
+    def onclick(self, event: Any) -> None:
+        position = int(event.x // (THUMBNAIL_SIZE + THUMBNAIL_PADDING))
+        if 0 <= position < len(self.slots):
+            self.app.set_frame_index(self.slots[position])
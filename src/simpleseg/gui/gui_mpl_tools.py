@@ -1,19 +1,28 @@
 import time
 from abc import ABC, abstractmethod
 from enum import IntEnum, auto
-from itertools import chain
 from typing import TYPE_CHECKING, Any, Optional
 
 import numpy as np
 import numpy.typing as npt
 from loguru import logger
 from matplotlib.backend_bases import Event, MouseButton, MouseEvent
-from matplotlib.patches import Ellipse, Patch
-from matplotlib.path import Path as mplPath
+from matplotlib.patches import Ellipse
 from matplotlib.widgets import LassoSelector
+from simpleseg.data.mask_ops import (
+    apply_polygon,
+    apply_polyline,
+    pixels_operation,
+    polygon_operation,
+    polyline_operation,
+    union_regions,
+)
+from simpleseg.data.morphology import apply_morphology
 from simpleseg.gui.gui_canvasframe import CanvasFrameMpl
+from simpleseg.gui.overlay import get_view_shape
+from simpleseg.kernels.backend import polygon_mask
+from simpleseg.shared_variables import Region
 from simpleseg.validation.data_validation import is_2d_img, is_int_img
-from skimage.segmentation import flood_fill
 
 if TYPE_CHECKING:
     from simpleseg.app import AppState, SegmentationApp
@@ -22,6 +31,8 @@ if TYPE_CHECKING:
 class AvailableTools(IntEnum):
     LASSO = auto()
     PENCIL = auto()
+    SUPERPIXEL = auto()
+    MORPHOLOGY = auto()
 
 
 class MplTools:
@@ -31,7 +42,12 @@ class MplTools:
         self.canvas_frame: CanvasFrameMpl = canvas_frame
 
         self.tool: Optional[Tool] = None
-        self.tools = {AvailableTools.LASSO: ToolLasso(mplTools=self), AvailableTools.PENCIL: ToolPencil(mplTools=self)}
+        self.tools = {
+            AvailableTools.LASSO: ToolLasso(mplTools=self),
+            AvailableTools.PENCIL: ToolPencil(mplTools=self),
+            AvailableTools.SUPERPIXEL: ToolSuperpixel(mplTools=self),
+            AvailableTools.MORPHOLOGY: ToolMorphology(mplTools=self),
+        }
 
         # self.activate_tool()
 
@@ -75,9 +91,27 @@ ERASER = False
 
 
 class ToolPencil(Tool):
+    """
+    motion events only collect points, the points collected since the last redraw are rasterized as one
+    polyline and drawn once per tick of REDRAW_INTERVAL_MS. the cursor is a single animated ellipse
+    that is moved instead of recreated.
+    """
+
+    REDRAW_INTERVAL_MS = 16
+
     def __init__(self, mplTools: MplTools):
         super().__init__(mplTools=mplTools)
-        self.visual_patch: Optional[Patch] = None
+        self.mask_temp: Optional[npt.NDArray[Any]] = None
+        self.frame_index: Optional[int] = None
+        self.render_buffer: Optional[npt.NDArray[Any]] = None
+        self.cursor: Optional[Ellipse] = None
+        self.cursor_position: Optional[tuple[float, float]] = None
+        self.pending_points: list[tuple[int, int]] = []
+        self.stroke_points: list[tuple[int, int]] = []  # the whole stroke, for the journal
+        self.stroke_width = 1
+        self.stroke_value = 1
+        self.stroke_region: Optional[Region] = None
+        self.tick_id: Optional[str] = None
 
         self.lastx: Optional[int] = None
         self.lasty: Optional[int] = None
@@ -92,83 +126,206 @@ class ToolPencil(Tool):
         for cid in self.cids:
             self.canvas.mpl_disconnect(cid)
         self.cids = []
-
-    def update_drawing_mask(self):
-        width = self.state.pencil_width
-        self.drawing_mask = bresenham_circle_mask(width)
+        self.cancel_tick()
+        self.cursor_position = None
+        if self.cursor is not None:
+            self.cursor.set_visible(False)
 
     def init_draw_coords(self, event: MouseEvent):
-        self.img_3d = self.app.img_2d_to_3d(self.app.get_current_img())
-        self.mask_temp = self.app.get_current_mask().copy()
-        self.update_drawing_mask()
+        if event.button not in (MouseButton.LEFT, MouseButton.RIGHT):
+            return
+        if not self.app.frame_is_loaded(self.app.current_frame_index):
+            self.mask_temp = None
+            return
+        self.frame_index = self.app.current_frame_index
+        self.img = self.app.get_display_img(self.frame_index)
+        self.mask_temp = self.app.get_mask_for_edit(self.frame_index)
+        # the live overlay of the stroke is rendered into the same buffer on every redraw
+        self.render_buffer = self.app.view_mode_selector.buffers.take(get_view_shape(self.mask_temp))
+        self.stroke_width = self.state.pencil_width
+        self.stroke_value = self.mplTools.fill_value
+        self.app.recorder.record(
+            "press",
+            frame=self.frame_index,
+            width=self.stroke_width,
+            value=self.stroke_value,
+            view=int(self.state.view_strategy_selected),
+        )
         self.draw_coords(event)
+        self.redraw()  # a click without motion paints immediately
 
     def draw_coords(self, event: MouseEvent) -> None:
+        """collects the cursor position and the stroke points, the drawing happens in redraw()"""
         if not isinstance(event, MouseEvent):
             return
-
-        self.remove_contour()
         if event.inaxes != self.ax:
-            return
-
-        if event.button == 1 or event.button == 3:
-            self.mask_temp = self.update_matrix(event, self.mask_temp)
-            overlay = self.app.get_overlay(self.img_3d, self.mask_temp)
+            self.cursor_position = None
+        else:
+            self.cursor_position = (event.xdata, event.ydata)
+            if self.mask_temp is not None:
+                point = (int(round(event.xdata)), int(round(event.ydata)))
+                if not self.pending_points or self.pending_points[-1] != point:
+                    self.pending_points.append(point)
+                    self.app.recorder.record("motion", x=point[0], y=point[1])
+        if self.tick_id is None:
+            self.tick_id = self.canvas_frame.after(self.REDRAW_INTERVAL_MS, self.redraw)
+
+    def redraw(self) -> None:
+        self.cancel_tick()
+        if self.mask_temp is not None and self.pending_points:
+            self.app.recorder.record("redraw")
+            self.rasterize_pending_points()
+            overlay = self.app.get_overlay(self.img, self.mask_temp, out=self.render_buffer)
             self.canvas_frame.im.set_data(overlay)
 
+        # the image is drawn over the previous cursor position
         self.ax.draw_artist(self.canvas_frame.im)
+        cursor = self.get_artist()
+        if self.cursor_position is not None:
+            self.ax.draw_artist(cursor)
+        self.canvas.blit(self.ax.bbox)
 
-        artist = self.get_artist(event)
-        self.ax.add_patch(artist)
-        self.ax.draw_artist(artist)
+    def cancel_tick(self) -> None:
+        if self.tick_id is not None:
+            self.canvas_frame.after_cancel(self.tick_id)
+            self.tick_id = None
+
+    def rasterize_pending_points(self) -> None:
+        """the polyline starts at the last point of the previous redraw, the stroke stays connected"""
+        assert self.mask_temp is not None
+        points = self.pending_points
+        if self.lastx is not None and self.lasty is not None:
+            points = [(self.lastx, self.lasty), *points]
+        xs, ys = np.array(points).T
+        region = apply_polyline(self.mask_temp, xs, ys, self.stroke_width, self.stroke_value)
+        self.stroke_points.extend(self.pending_points)
+        self.stroke_region = region if self.stroke_region is None else union_regions(self.stroke_region, region)
+        self.lastx, self.lasty = points[-1]
+        self.pending_points = []
 
-        self.canvas.blit(self.ax.bbox)
+    def stop_drawing(self, event: Event) -> None:
+        if self.mask_temp is not None:
+            self.app.recorder.record("release")
+        if self.mask_temp is not None and self.pending_points:
+            self.rasterize_pending_points()
+        self.pending_points = []
+        self.lastx = None
+        self.lasty = None
+        if self.mask_temp is not None and self.stroke_points:
+            assert is_2d_img(self.mask_temp)
+            assert self.frame_index is not None
+            xs, ys = zip(*self.stroke_points)
+            operation = polyline_operation(xs, ys, self.stroke_width, self.stroke_value)
+            self.app.set_mask(self.frame_index, self.mask_temp, region=self.stroke_region, operation=operation)
+        self.mask_temp = None
+        self.stroke_region = None
+        self.stroke_points = []
+        if self.render_buffer is not None:
+            self.app.view_mode_selector.buffers.release(self.render_buffer)
+            self.render_buffer = None
+
+    def get_artist(self) -> Ellipse:
+        """the cursor ellipse is created once, animated artists are only drawn by draw_artist()"""
+        width = self.state.pencil_width
+        if self.cursor is None:
+            outlineprops = {"linewidth": 5, "alpha": 0.8, "facecolor": "none", "animated": True}
+            self.cursor = Ellipse((0, 0), width, width, **outlineprops)
+            self.ax.add_patch(self.cursor)
+        self.cursor.set_edgecolor("red" if ERASER else "lime")
+        self.cursor.set_visible(self.cursor_position is not None)
+        if self.cursor_position is not None:
+            x, y = self.cursor_position
+            offset = -0.5 if width % 2 == 0 else 0
+            self.cursor.set_center((x + offset, y + offset))
+            self.cursor.set_width(width)
+            self.cursor.set_height(width)
+        return self.cursor
 
-    def update_matrix(self, event: MouseEvent, in_matrix: npt.NDArray[Any]) -> npt.NDArray[Any]:
-        newx = int(np.round(event.xdata))
-        newy = int(np.round(event.ydata))
 
-        if newx == self.lastx and newy == self.lasty:
-            return in_matrix
+class ToolLasso(Tool):
+    def __init__(self, mplTools: MplTools):
+        super().__init__(mplTools=mplTools)
+        self.lasso = LassoSelector(self.ax, onselect=self.lasso_on_select)
+        self.lasso.disconnect_events()
 
-        xcoords, ycoords = bresenham_line(self.lastx, self.lasty, newx, newy)
-        xs = self.drawing_mask[0] + xcoords[None].T
-        ys = self.drawing_mask[1] + ycoords[None].T
+    def activate(self):
+        self.lasso.connect_default_events()
 
-        # clipping to set range
-        xcoords = xs.flatten().clip(0, self.app.resolution[1])
-        ycoords = ys.flatten().clip(0, self.app.resolution[0])
+    def deactivate(self):
+        self.lasso.disconnect_events()
 
-        idcs = (ycoords, xcoords)
-        in_matrix[idcs] = self.mplTools.fill_value
+    def lasso_on_select(self, verts):
+        if not self.app.frame_is_loaded(self.app.current_frame_index):
+            return
+        logger.debug("time: lasso_on_select")
+        t0 = time.perf_counter()
+        frame_index = self.app.current_frame_index
+        mask = self.app.get_mask_for_edit(frame_index)
+        assert is_2d_img(mask)
+        assert is_int_img(mask)
+        value = self.mplTools.fill_value
+        assert isinstance(value, int)
+        self.app.recorder.record(
+            "lasso",
+            frame=frame_index,
+            verts=[[float(x), float(y)] for x, y in verts],
+            value=value,
+            view=int(self.state.view_strategy_selected),
+        )
+        region = apply_polygon(mask, verts, value)
+        if region is None:
+            return
+        logger.debug(time.perf_counter() - t0)
+        self.app.set_mask(frame_index, mask, region=region, operation=polygon_operation(verts, value))
 
-        self.lastx = newx
-        self.lasty = newy
 
-        return in_matrix
+class ToolSuperpixel(Tool):
+    """
+    a click assigns the class to the whole superpixel under the cursor.
+    the superpixels of the current and upcoming frames are computed ahead of time by the app.
+    """
 
-    def stop_drawing(self, event: Event) -> None:
-        self.lastx = None
-        self.lasty = None
-        assert is_2d_img(self.mask_temp)
-        self.app.set_current_mask(self.mask_temp)
+    def __init__(self, mplTools: MplTools):
+        super().__init__(mplTools=mplTools)
+        self.cids: list[int] = []
 
-    def get_artist(self, event: MouseEvent) -> Ellipse:
-        outlineprops = {"linewidth": 5, "alpha": 0.8, "facecolor": "none"}
-        outlineprops["edgecolor"] = "red" if ERASER else "lime"
-        width = self.state.pencil_width
-        x, y = event.xdata, event.ydata
-        offset = -0.5 if width % 2 == 0 else 0
-        self.visual_patch = Ellipse((x + offset, y + offset), width, width, **outlineprops)
-        return self.visual_patch
+    def activate(self):
+        self.cids = [self.canvas.mpl_connect("button_press_event", self.on_click)]
+        self.app.prefetch_superpixels()
+
+    def deactivate(self):
+        for cid in self.cids:
+            self.canvas.mpl_disconnect(cid)
+        self.cids = []
+
+    def on_click(self, event: MouseEvent):
+        if event.button not in (MouseButton.LEFT, MouseButton.RIGHT) or event.inaxes != self.ax:
+            return
+        frame_index = self.app.current_frame_index
+        if not self.app.frame_is_loaded(frame_index):
+            return
+        logger.debug("time: superpixel on_click")
+        t0 = time.perf_counter()
+        superpixels = self.app.get_superpixels(frame_index)
+        if superpixels is None:
+            return  # not computed yet
+        x, y = int(round(event.xdata)), int(round(event.ydata))
+        if not (0 <= y < superpixels.shape[0] and 0 <= x < superpixels.shape[1]):
+            return
+        mask = self.app.get_mask_for_edit(frame_index)
+        value = self.mplTools.fill_value
+        region = superpixels.apply(mask, x, y, value)
+        operation = pixels_operation(*superpixels.selection(x, y), value)
+        logger.debug(time.perf_counter() - t0)
+        self.app.set_mask(frame_index, mask, region=region, operation=operation)
 
-    def remove_contour(self) -> None:
-        if self.visual_patch is not None:
-            self.visual_patch.remove()
-            self.visual_patch = None
 
+class ToolMorphology(Tool):
+    """
+    applies the selected morphology operation to the pixels of the selected class inside a lasso roi,
+    apply_to_frame() applies it to the whole frame
+    """
 
-class ToolLasso(Tool):
     def __init__(self, mplTools: MplTools):
         super().__init__(mplTools=mplTools)
         self.lasso = LassoSelector(self.ax, onselect=self.lasso_on_select)
@@ -181,107 +338,27 @@ class ToolLasso(Tool):
         self.lasso.disconnect_events()
 
     def lasso_on_select(self, verts):
-        logger.debug("time: lasso_on_select")
+        if not self.app.frame_is_loaded(self.app.current_frame_index):
+            return
+        region, inside = polygon_mask(verts, self.app.get_current_mask().shape)
+        if inside.any():
+            self.apply(region, inside)
+
+    def apply_to_frame(self):
+        if self.app.frame_is_loaded(self.app.current_frame_index):
+            self.apply()
+
+    def apply(self, region: Optional[Region] = None, inside: Optional[npt.NDArray[np.bool_]] = None):
+        logger.debug("time: morphology")
         t0 = time.perf_counter()
-        path = mplPath(verts)
-        xv, yv = np.meshgrid(np.arange(self.app.resolution[0]), np.arange(self.app.resolution[1]))
-        point_coords = np.vstack((yv.flatten(), xv.flatten())).T  # all pixels (x,y) as N x 2 array
-        contains_points = path.contains_points(point_coords).reshape(self.app.resolution[:2], order="F")
-        mask = self.app.get_current_mask()
+        mask = self.app.get_mask_for_edit(self.app.current_frame_index)
         assert is_2d_img(mask)
         assert is_int_img(mask)
-        assert isinstance(self.mplTools.fill_value, int)
-        mask[contains_points] = self.mplTools.fill_value
+        operation, radius = self.state.morphology_operation, self.state.morphology_radius
+        result = apply_morphology(mask, operation, self.state.fill_value_pos, radius, region=region, inside=inside)
         logger.debug(time.perf_counter() - t0)
-        self.app.set_current_mask(mask)
-
-
-def bresenham_circle_mask(width: int):
-    """Efficient way of creating a circular drawing mask"""
-
-    assert isinstance(width, int)
-    assert width >= 1, "width must be 1 or larger"
-
-    radius = width // 2
-    if width % 2 == 0:
-        radius -= 1
-
-    coords_set = set()
-    f = 1 - radius
-    ddF_x = 0
-    ddF_y = -2 * radius
-    x = 0
-    y = radius
-
-    offset = 0
-    if width % 2 == 0:
-        offset = -1
-        coords_set.add((offset, radius))
-        coords_set.add((radius, offset))
-        coords_set.add((offset, -radius + offset))
-        coords_set.add((-radius + offset, offset))
-    coords_set.add((0, radius))
-    coords_set.add((radius, 0))
-    coords_set.add((0, -radius + offset))
-    coords_set.add((-radius + offset, 0))
-
-    while x < y:
-        if f >= 0:
-            y -= 1
-            ddF_y += 2
-            f += ddF_y
-        x += 1
-        ddF_x += 2
-        f += ddF_x + 1
-
-        coords_set.add((x, y))
-        coords_set.add((-x + offset, y))
-        coords_set.add((x, -y + offset))
-        coords_set.add((-x + offset, -y + offset))
-        coords_set.add((y, x))
-        coords_set.add((-y + offset, x))
-        coords_set.add((y, -x + offset))
-        coords_set.add((-y + offset, -x + offset))
-
-    arr = np.fromiter(chain.from_iterable(coords_set), int)
-    num_coords = len(coords_set)
-    arr.shape = num_coords, 2
-
-    # filling cirlce with 1 to generate mask depending on pencil width
-    min_val = arr.min()
-    val_range = arr.max() - min_val
-    temp_mask = np.zeros((val_range + 1, val_range + 1))
-    temp_mask[arr[:, 0] - min_val, arr[:, 1] - min_val] = 1
-    flood_mask = flood_fill(temp_mask, (abs(min_val), abs(min_val)), 1, connectivity=1)
-    idcs = np.where(flood_mask == 1)
-    return idcs[0] + min_val, idcs[1] + min_val  # xcoords, ycoords
-
-
-def bresenham_line(x0, y0, x1, y1) -> tuple[npt.NDArray[Any], npt.NDArray[Any]]:
-    """Returns coordinates of a line connecting two points."""
-
-    if x0 is None or y0 is None:
-        return np.array([x1]), np.array([y1])
-
-    xcoords = []
-    ycoords = []
-    dx = abs(x1 - x0)
-    sx = 1 if x0 < x1 else -1
-    dy = -abs(y1 - y0)
-    sy = 1 if y0 < y1 else -1
-    err = dx + dy  # error value e_xy
-
-    while True:
-        xcoords.append(x0)
-        ycoords.append(y0)
-        if x0 == x1 and y0 == y1:
-            break
-        e2 = 2 * err
-        if e2 > dy:
-            err += dy
-            x0 += sx
-        if e2 < dx:
-            err += dx
-            y0 += sy
-
-    return np.array(xcoords, dtype=int), np.array(ycoords, dtype=int)
+        if result is None:
+            return
+        changed_region, changed, value = result
+        operation = pixels_operation(changed_region, changed, value)
+        self.app.set_current_mask(mask, region=changed_region, operation=operation)
@@ -2,9 +2,12 @@ import tkinter as tk
 from tkinter.font import Font
 from typing import TYPE_CHECKING
 
+from simpleseg.data.morphology import MorphologyOperation
+from simpleseg.data.propagation import PropagationMethod
+from simpleseg.gui.display import WindowLevel
 from simpleseg.gui.gui_mpl_tools import AvailableTools
 from simpleseg.gui.overlay import AvailableViewModes
-from simpleseg.shared_variables import COLORS, N_CLASSES_MAX
+from simpleseg.shared_variables import CHANNEL_COLORS, COLORS, N_CLASSES_MAX
 
 if TYPE_CHECKING:
     from simpleseg.app import SegmentationApp
@@ -23,7 +26,11 @@ class ToolFrame(tk.LabelFrame):
         self.app.state._tool_selected_int = tk.IntVar(value=1)
         self.app.state._view_mode_selected_int = tk.IntVar(value=1)
         self.app.state._pencil_width = tk.IntVar(value=5)
+        self.app.state._morphology_operation_int = tk.IntVar(value=MorphologyOperation.DILATE.value)
+        self.app.state._morphology_radius = tk.IntVar(value=1)
         self.app.state._fill_value_pos_int = tk.IntVar(value=1)
+        self.app.state._window_level = tk.DoubleVar(value=0.5)
+        self.app.state._window_width = tk.DoubleVar(value=1.0)
         self.app.state._n_classes = tk.IntVar(value=self.app.state._n_classes_init_val)
 
         # ─── Drawing Tools ────────────────────────────────────────────
@@ -50,6 +57,16 @@ class ToolFrame(tk.LabelFrame):
             height=RADIO_HEIGHT,
             command=mpl_tools.activate_tool,
         )
+        self.radio_superpixel = tk.Radiobutton(
+            master=self.drawing_tools_frame,
+            text="Superpixel",
+            indicatoron=0,
+            variable=self.app.state._tool_selected_int,
+            value=AvailableTools.SUPERPIXEL.value,
+            width=RADIO_WIDTH,
+            height=RADIO_HEIGHT,
+            command=mpl_tools.activate_tool,
+        )
         self.spinbox_pencil = tk.Spinbox(
             master=self.drawing_tools_frame,
             justify=tk.RIGHT,
@@ -64,10 +81,63 @@ class ToolFrame(tk.LabelFrame):
         # packing
         self.radio_lasso.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
         self.radio_pencil.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
+        self.radio_superpixel.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
         self.spinbox_pencil.pack(side=tk.RIGHT, anchor="w")
         self.label_pencil.pack(side=tk.RIGHT, anchor="e")
         self.drawing_tools_frame.pack(side=tk.TOP, fill=tk.BOTH)
 
+        # ─── Morphology ───────────────────────────────────────────────
+
+        self.morphology_frame = tk.LabelFrame(master=self, text="Morphology (selected class)")
+
+        self.radio_morphology = tk.Radiobutton(
+            master=self.morphology_frame,
+            text="Lasso ROI",
+            indicatoron=0,
+            variable=self.app.state._tool_selected_int,
+            value=AvailableTools.MORPHOLOGY.value,
+            width=RADIO_WIDTH,
+            height=RADIO_HEIGHT,
+            command=mpl_tools.activate_tool,
+        )
+        self.button_morphology_frame = tk.Button(
+            master=self.morphology_frame,
+            text="Apply to frame",
+            command=mpl_tools.tools[AvailableTools.MORPHOLOGY].apply_to_frame,
+        )
+        self.morphology_operations_frame = tk.Frame(master=self.morphology_frame)
+        morphology_operation_names = {
+            MorphologyOperation.DILATE: "Dilate",
+            MorphologyOperation.ERODE: "Erode",
+            MorphologyOperation.FILL_HOLES: "Fill holes",
+            MorphologyOperation.REMOVE_SMALL_OBJECTS: "Remove small",
+        }
+        for column, (operation, text) in enumerate(morphology_operation_names.items()):
+            tk.Radiobutton(
+                master=self.morphology_operations_frame,
+                text=text,
+                variable=self.app.state._morphology_operation_int,
+                value=operation.value,
+            ).grid(row=column // 2, column=column % 2, sticky="w")
+        self.spinbox_morphology = tk.Spinbox(
+            master=self.morphology_frame,
+            justify=tk.RIGHT,
+            from_=1,
+            to=50,
+            textvariable=self.app.state._morphology_radius,
+            width=int(RADIO_WIDTH / 2),
+            font=Font(family="Helvetica", size=16, weight="bold"),
+        )
+        self.label_morphology = tk.Label(master=self.morphology_frame, text="Radius")
+
+        # packing
+        self.radio_morphology.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
+        self.button_morphology_frame.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
+        self.morphology_operations_frame.pack(side=tk.TOP, fill=tk.X)
+        self.spinbox_morphology.pack(side=tk.RIGHT, anchor="w")
+        self.label_morphology.pack(side=tk.RIGHT, anchor="e")
+        self.morphology_frame.pack(side=tk.TOP, fill=tk.BOTH)
+
         # ─── View Actions ─────────────────────────────────────────────
 
         self.view_frame = tk.LabelFrame(master=self, text="View Options")
@@ -105,6 +175,23 @@ class ToolFrame(tk.LabelFrame):
             command=app.refresh_images,
         )
 
+        # window / level of the image intensities, the range is set per dataset by set_window_range()
+        self.scale_window_level = tk.Scale(
+            master=self.view_frame,
+            label="Level",
+            orient=tk.HORIZONTAL,
+            variable=self.app.state._window_level,
+            command=lambda value: app.refresh_images(),
+        )
+        self.scale_window_width = tk.Scale(
+            master=self.view_frame,
+            label="Width",
+            orient=tk.HORIZONTAL,
+            variable=self.app.state._window_width,
+            command=lambda value: app.refresh_images(),
+        )
+        self.button_auto_window = tk.Button(master=self.view_frame, text="Auto contrast", command=app.auto_window)
+
         self.view_frame.pack(side=tk.TOP, fill=tk.BOTH)
 
         # ─── Mask Actions ─────────────────────────────────────────────
@@ -112,6 +199,15 @@ class ToolFrame(tk.LabelFrame):
         self.radio_viewmode1.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
         self.radio_viewmode2.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
         self.radio_viewmode3.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
+        self.scale_window_level.pack(side=tk.TOP, fill=tk.X)
+        self.scale_window_width.pack(side=tk.TOP, fill=tk.X)
+        self.button_auto_window.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
+
+        # ─── Channels ─────────────────────────────────────────────────
+
+        # only shown for multichannel images, the check buttons are created per dataset by set_channels()
+        self.channels_frame = tk.LabelFrame(master=self, text="Channels")
+        self.channel_buttons: list[tk.Checkbutton] = []
 
         self.file_frame = tk.LabelFrame(master=self, text="Mask Actions")
 
@@ -137,10 +233,23 @@ class ToolFrame(tk.LabelFrame):
             command=self.app.discard_current_mask,
         )
 
+        self.button_propagate_nearest = tk.Button(
+            master=self.file_frame,
+            text="propagate keyframes (copy)",
+            command=lambda: self.app.propagate_keyframes(PropagationMethod.NEAREST),
+        )
+        self.button_propagate_interpolate = tk.Button(
+            master=self.file_frame,
+            text="propagate keyframes (interpolate)",
+            command=lambda: self.app.propagate_keyframes(PropagationMethod.INTERPOLATE),
+        )
+
         # packing
         self.button_save.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
         self.button_save_all.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
         self.button_discard.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
+        self.button_propagate_nearest.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
+        self.button_propagate_interpolate.pack(side=tk.TOP, anchor="center", fill=tk.BOTH)
         self.file_frame.pack(side=tk.TOP, fill=tk.BOTH)
 
         self.classes_frame = tk.LabelFrame(master=self, text="Class Actions")
@@ -167,6 +276,38 @@ class ToolFrame(tk.LabelFrame):
 
         self.update_classes_buttons()
 
+    def set_window_range(self, low: float, high: float):
+        """the level covers the intensity range, the width up to twice of it"""
+        resolution = (high - low) / 1000
+        self.scale_window_level.configure(from_=low, to=high, resolution=resolution)
+        self.scale_window_width.configure(from_=resolution, to=2 * (high - low), resolution=resolution)
+
+    def set_window(self, window: WindowLevel):
+        self.app.state._window_level.set(window.level)
+        self.app.state._window_width.set(window.width)
+
+    def set_channels(self, n_channels: int):
+        """one check button per channel, the first three are selected. no channels: gray or rgb images"""
+        for button in self.channel_buttons:
+            button.destroy()
+        self.app.state._channels_selected = [tk.BooleanVar(value=channel < 3) for channel in range(n_channels)]
+        self.channel_buttons = []
+        for channel, selected in enumerate(self.app.state._channels_selected):
+            r, g, b = CHANNEL_COLORS[channel % len(CHANNEL_COLORS)]
+            button = tk.Checkbutton(
+                master=self.channels_frame,
+                text=f"channel {channel}",
+                variable=selected,
+                fg=f"#{int(r * 200):02x}{int(g * 200):02x}{int(b * 200):02x}",
+                command=self.app.refresh_images,
+            )
+            button.grid(row=channel // 2, column=channel % 2, sticky="w")
+            self.channel_buttons.append(button)
+        if n_channels:
+            self.channels_frame.pack(side=tk.TOP, fill=tk.BOTH, after=self.view_frame)
+        else:
+            self.channels_frame.pack_forget()
+
     def update_classes_buttons(self):
         def rgb_to_hex(r: int, g: int, b: int) -> str:
             """r, g, b within 0-255"""
@@ -1,46 +1,154 @@
+import time
 import tkinter
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
     from simpleseg.app import SegmentationApp
+    from simpleseg.data.frame_stats import FrameStatsIndex
 
 
 class TreeViewFiles(tkinter.LabelFrame):
+    FILTER_ALL = "all frames"
+    FILTER_EMPTY = "empty"
+    FILTER_LABELLED = "labelled"
+    FILTER_MODIFIED = "modified"
+    FILTER_CLAIMED = "claimed"  # frames leased by the work queue
+
     def __init__(self, master, app: "SegmentationApp", *args, **kwargs) -> None:
         self.app = app
         self.select_func = lambda x: x  # placeholder
         tkinter.LabelFrame.__init__(self, master, *args, **kwargs)
-        self.tree = tkinter.ttk.Treeview(self, columns=("modified", "filename"), show="headings")
+        self.tree = tkinter.ttk.Treeview(self, columns=("modified", "filename", "classes", "saved"), show="headings")
         self.tree.column("modified", stretch=tkinter.NO, width=50)
-        self.tree.heading("modified", text="mod.")
-        self.tree.column("filename", stretch=tkinter.NO, width=350)
-        self.tree.heading("filename", text="filename")
+        self.tree.heading("modified", text="mod.", command=lambda: self.sort_by("modified"))
+        self.tree.column("filename", stretch=tkinter.NO, width=250)
+        self.tree.heading("filename", text="filename", command=lambda: self.sort_by("filename"))
+        self.tree.column("classes", stretch=tkinter.NO, width=70)
+        self.tree.heading("classes", text="classes", command=lambda: self.sort_by("classes"))
+        self.tree.column("saved", stretch=tkinter.NO, width=110)
+        self.tree.heading("saved", text="saved", command=lambda: self.sort_by("saved"))
         self.tree.bind("<<TreeviewSelect>>", self.onselect)
 
+        self.filter_var = tkinter.StringVar(value=self.FILTER_ALL)
+        self.filter_box = tkinter.ttk.Combobox(self, textvariable=self.filter_var, state="readonly")
+        self.filter_box.bind("<<ComboboxSelected>>", lambda event: self.apply_view())
+        self.sort_column = "filename"
+        self.sort_reverse = False
+        self.stats_version = -1
+        self.tree_identifiers: list[str] = []
+        self.visible_identifiers: set[str] = set()
+
     def init_tree(self, item_paths: list[str]):
         self.clear_view()
         self.tree_identifiers = []
+        self.filenames = item_paths
         for frame_index, string in enumerate(item_paths):
             modified = self.app.mask_is_modified(frame_index)
             modified_string = self.get_modified_string(modified)
-            identifier = self.tree.insert("", "end", values=(modified_string, string))
+            identifier = self.tree.insert("", "end", iid=str(frame_index), values=(modified_string, string, "", ""))
             self.tree_identifiers.append(identifier)
+        self.visible_identifiers = set(self.tree_identifiers)
+        self.stats_version = -1
+        self.filter_var.set(self.FILTER_ALL)
+        self.update_filter_options()
         self.selected_item = None
         self.select(0)
         scrollbar = tkinter.ttk.Scrollbar(self, orient=tkinter.VERTICAL, command=self.tree.yview)
         self.tree.configure(yscroll=scrollbar.set)
-        self.tree.grid(row=0, column=0, sticky=tkinter.NSEW)
+        self.filter_box.grid(row=0, column=0, columnspan=2, sticky=tkinter.EW)
+        self.tree.grid(row=1, column=0, sticky=tkinter.NSEW)
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(0, weight=1)
-        scrollbar.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(1, weight=1)
+        scrollbar.grid(row=1, column=1, sticky="ns")
+
+    def update_filter_options(self) -> None:
+        class_options = [f"class {i}" for i in range(1, self.app.state.n_classes + 1)]
+        claimed_options = [self.FILTER_CLAIMED] if self.app.work_queue.enabled else []
+        self.filter_box.configure(
+            values=[
+                self.FILTER_ALL,
+                *claimed_options,
+                self.FILTER_EMPTY,
+                self.FILTER_LABELLED,
+                self.FILTER_MODIFIED,
+                *class_options,
+            ]
+        )
+
+    def set_filter(self, filter_string: str) -> None:
+        self.filter_var.set(filter_string)
+        self.apply_view()
+
+    def update_claimed(self) -> None:
+        if self.filter_var.get() == self.FILTER_CLAIMED:
+            self.apply_view()
 
     def update_tree(self, is_modified_list: list[bool]):
         for frame_index, identifier in enumerate(self.tree_identifiers):
             is_modified = is_modified_list[frame_index]
             # modified = self.app.mask_is_modified(frame_index)
             modified_string = self.get_modified_string(is_modified)
-            filename_string = self.tree.item(identifier, "values")[1]
-            self.tree.item(identifier, values=(modified_string, filename_string))
+            self.tree.set(identifier, "modified", modified_string)
+        if self.filter_var.get() == self.FILTER_MODIFIED or self.sort_column == "modified":
+            self.apply_view()
+
+    def update_stats(self, stats_index: "FrameStatsIndex") -> None:
+        """fills the stats columns, skipped if nothing changed since the last call"""
+        if stats_index.version == self.stats_version:
+            return
+        self.stats_version = stats_index.version
+        for frame_index, identifier in enumerate(self.tree_identifiers):
+            stats = stats_index[frame_index]
+            if stats is None:
+                continue
+            classes_string = " ".join(str(class_int) for class_int in stats.classes) or "-"
+            saved_string = ""
+            if stats.last_modified:
+                saved_string = time.strftime("%Y-%m-%d %H:%M", time.localtime(stats.last_modified))
+            self.tree.set(identifier, "classes", classes_string)
+            self.tree.set(identifier, "saved", saved_string)
+        if self.filter_var.get() != self.FILTER_ALL or self.sort_column in ("classes", "saved"):
+            self.apply_view()
+
+    def sort_by(self, column: str) -> None:
+        self.sort_reverse = not self.sort_reverse if column == self.sort_column else False
+        self.sort_column = column
+        self.apply_view()
+
+    def get_visible_frames(self) -> list[int]:
+        stats_index = self.app.stats_index
+        filter_string = self.filter_var.get()
+        if filter_string == self.FILTER_EMPTY:
+            return stats_index.filter(labelled=False)
+        if filter_string == self.FILTER_LABELLED:
+            return stats_index.filter(labelled=True)
+        if filter_string == self.FILTER_CLAIMED:
+            return sorted(self.app.work_queue.claimed)
+        if filter_string == self.FILTER_MODIFIED:
+            return [index for index in range(len(self.tree_identifiers)) if self.app.mask_is_modified(index)]
+        if filter_string.startswith("class "):
+            return stats_index.filter(class_int=int(filter_string.split()[1]))
+        return list(range(len(self.tree_identifiers)))
+
+    def get_sort_key(self, frame_index: int) -> Any:
+        stats = self.app.stats_index[frame_index]
+        if self.sort_column == "modified":
+            return self.app.mask_is_modified(frame_index)
+        if self.sort_column == "classes":
+            return sum(stats.class_counts[1:]) if stats else -1
+        if self.sort_column == "saved":
+            return (stats.last_modified or 0.0) if stats else 0.0
+        return self.filenames[frame_index]
+
+    def apply_view(self) -> None:
+        """shows only the frames that pass the filter, ordered by the sort column"""
+        visible_frames = sorted(self.get_visible_frames(), key=self.get_sort_key, reverse=self.sort_reverse)
+        self.tree.detach(*self.tree_identifiers)
+        for position, frame_index in enumerate(visible_frames):
+            self.tree.move(self.tree_identifiers[frame_index], "", position)
+        self.visible_identifiers = {self.tree_identifiers[frame_index] for frame_index in visible_frames}
+        if self.selected_item in self.visible_identifiers:
+            self.tree.see(self.selected_item)
 
     @staticmethod
     def get_modified_string(modified: bool) -> str:
@@ -49,16 +157,25 @@ class TreeViewFiles(tkinter.LabelFrame):
     def clear_view(self) -> None:
         for item in self.tree.get_children():
             self.tree.delete(item)
+        # items hidden by the filter are detached and not part of get_children()
+        for item in self.tree_identifiers:
+            if self.tree.exists(item):
+                self.tree.delete(item)
 
     def select(self, i: int) -> None:
         self.selected_item = self.tree_identifiers[i]
         self.tree.focus(self.selected_item)
         self.tree.selection_set(self.selected_item)
-        self.tree.see(self.selected_item)
+        if self.selected_item in self.visible_identifiers:
+            self.tree.see(self.selected_item)
 
     def onselect(self, event) -> None:
         self.selected_item = self.tree.focus()
-        img_id = self.tree.index(self.selected_item)
+        if not self.selected_item:
+            return
+        img_id = int(self.selected_item)
+        if img_id == self.app.current_frame_index:
+            return  # selected by the app itself, see SegmentationApp.set_frame_index()
         self.select_func(img_id)
 
 
@@ -0,0 +1,223 @@
+import gzip
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from simpleseg.data.dataclass import AbstractData
+from simpleseg.data.mask_ops import apply_polygon, apply_polyline
+from simpleseg.gui.display import display_image, initial_channel_mapping, initial_window
+from simpleseg.gui.overlay import AvailableViewModes, ViewModeSelector, get_view_shape
+
+# event types, one json object per line, every event has the time t in seconds since the start:
+# frame {index}, press {frame, width, value, view}, motion {x, y}, redraw {}, release {},
+# lasso {frame, verts, value, view}, discard {frame}, end {masks: {frame: sha1 of the final mask}}
+# motion events are the pencil points, redraw events the ticks that rasterized them
+
+
+def open_text(path: Path, mode: str) -> IO[str]:
+    """.gz files are compressed"""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t")
+    return path.open(mode)
+
+
+def hash_mask(mask: npt.NDArray[Any]) -> str:
+    return hashlib.sha1(np.ascontiguousarray(mask, dtype=np.uint8).tobytes()).hexdigest()
+
+
+class InteractionRecorder:
+    """
+    records the pencil, lasso and navigation events of a session, they are replayed headless with
+    replay_interactions(). with path None nothing is recorded.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.file: Optional[IO[str]] = open_text(path, "w") if path is not None else None
+        self.t0 = time.perf_counter()
+        self.edited_frames: set[int] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.file is not None
+
+    def record(self, kind: str, **data: Any) -> None:
+        if self.file is None:
+            return
+        if "frame" in data and kind in ("press", "lasso"):
+            self.edited_frames.add(data["frame"])
+        event = {"type": kind, "t": round(time.perf_counter() - self.t0, 4), **data}
+        self.file.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self.file.flush()  # a crash loses at most the event being written
+
+    def close(self, get_mask: Callable[[int], npt.NDArray[Any]]) -> None:
+        """get_mask(frame) returns the final mask of an edited frame, its hash lets the replay verify the result"""
+        if self.file is None:
+            return
+        self.record("end", masks={str(index): hash_mask(get_mask(index)) for index in sorted(self.edited_frames)})
+        self.file.close()
+        self.file = None
+
+
+@dataclass
+class ReplayState:
+    """stands in for AppState in the ViewModeSelector"""
+
+    view_strategy_selected: AvailableViewModes = AvailableViewModes.OVERLAY
+
+
+@dataclass
+class ReplayReport:
+    """
+    latencies: seconds per event type
+    masks: final masks of the edited frames
+    expected_hashes: hashes of the final masks of the recorded session, empty if the recording was cut off
+    """
+
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    masks: dict[int, npt.NDArray[Any]] = field(default_factory=dict)
+    expected_hashes: dict[int, str] = field(default_factory=dict)
+
+    def percentiles(self, qs: tuple[float, ...] = (50, 90, 99)) -> dict[str, dict[float, float]]:
+        """milliseconds per event type and percentile"""
+        return {
+            kind: {q: float(np.percentile(times, q)) * 1000 for q in qs} for kind, times in self.latencies.items()
+        }
+
+    @property
+    def matches_recording(self) -> Optional[bool]:
+        """None if the recording has no final hashes"""
+        if not self.expected_hashes:
+            return None
+        hashes = {index: hash_mask(mask) for index, mask in self.masks.items()}
+        return all(hashes.get(index) == expected for index, expected in self.expected_hashes.items())
+
+    def summary(self) -> str:
+        lines = [f"{'event':10s} {'n':>6s} {'p50 ms':>10s} {'p90 ms':>10s} {'p99 ms':>10s}"]
+        for kind, values in self.percentiles().items():
+            n = len(self.latencies[kind])
+            lines.append(f"{kind:10s} {n:6d} {values[50]:10.2f} {values[90]:10.2f} {values[99]:10.2f}")
+        lines.append(f"final masks of {len(self.masks)} frames, matching the recording: {self.matches_recording}")
+        return "\n".join(lines)
+
+
+class Replay:
+    """
+    applies recorded events to the masks of a dataset the way the tools do, without a gui.
+    the timed work per event is what the app does on the tk thread, except drawing on the canvas:
+    loading and rendering a frame, rasterizing pencil points and rendering the live overlay, lasso fills.
+    """
+
+    def __init__(self, dataset: AbstractData):
+        self.dataset = dataset
+        self.state = ReplayState()
+        self.view_mode_selector = ViewModeSelector(self.state)
+        # mapped through the initial window and channel mapping of the dataset
+        self.images: dict[int, npt.NDArray[Any]] = {}
+        first_image = dataset.get_image(0)
+        self.window = initial_window(first_image)
+        self.mapping = initial_channel_mapping(first_image)
+        self.masks: dict[int, npt.NDArray[Any]] = {}  # edited masks
+        self.frame = 0
+        self.buffer: Optional[npt.NDArray[Any]] = None
+        self.mask_temp: Optional[npt.NDArray[Any]] = None
+        self.stroke: dict[str, Any] = {}
+        self.pending_points: list[tuple[int, int]] = []
+        self.last_point: Optional[tuple[int, int]] = None
+
+    def get_image(self, index: int) -> npt.NDArray[Any]:
+        if index not in self.images:
+            self.images[index] = display_image(self.dataset.get_image(index), self.window, self.mapping)
+        return self.images[index]
+
+    def get_mask(self, index: int) -> npt.NDArray[Any]:
+        return self.masks[index] if index in self.masks else self.dataset.get_mask(index)
+
+    def render(self, mask: npt.NDArray[Any]) -> None:
+        if self.buffer is None or self.buffer.shape != get_view_shape(mask):
+            self.buffer = np.empty(get_view_shape(mask), dtype=float)
+        self.view_mode_selector.get_view(self.get_image(self.frame), mask, out=self.buffer)
+
+    def rasterize_pending_points(self) -> None:
+        assert self.mask_temp is not None
+        points = self.pending_points if self.last_point is None else [self.last_point, *self.pending_points]
+        xs, ys = np.array(points).T
+        apply_polyline(self.mask_temp, xs, ys, self.stroke["width"], self.stroke["value"])
+        self.last_point = points[-1]
+        self.pending_points = []
+
+    def apply(self, event: dict[str, Any]) -> None:
+        kind = event["type"]
+        if kind == "frame":
+            self.frame = event["index"]
+            self.render(self.get_mask(self.frame))
+        elif kind == "press":
+            self.frame = event["frame"]
+            self.state.view_strategy_selected = AvailableViewModes(event["view"])
+            self.stroke = event
+            self.mask_temp = self.masks[self.frame] if self.frame in self.masks else self.get_mask(self.frame).copy()
+        elif kind == "motion":
+            if self.mask_temp is not None:
+                self.pending_points.append((event["x"], event["y"]))
+        elif kind == "redraw":
+            if self.mask_temp is not None and self.pending_points:
+                self.rasterize_pending_points()
+                self.render(self.mask_temp)
+        elif kind == "release":
+            if self.mask_temp is not None:
+                if self.pending_points:
+                    self.rasterize_pending_points()
+                self.masks[self.frame] = self.mask_temp
+            self.mask_temp = None
+            self.pending_points = []
+            self.last_point = None
+        elif kind == "lasso":
+            self.frame = event["frame"]
+            self.state.view_strategy_selected = AvailableViewModes(event["view"])
+            mask = self.masks[self.frame] if self.frame in self.masks else self.get_mask(self.frame).copy()
+            if apply_polygon(mask, event["verts"], event["value"]) is not None:
+                self.masks[self.frame] = mask
+                self.render(mask)
+        elif kind == "discard":
+            self.masks.pop(event["frame"], None)
+
+
+def read_lines(f: IO[str]) -> Iterator[str]:
+    """the lines of a recording, a .gz recording cut off by a crash has no end of stream marker"""
+    try:
+        yield from f
+    except EOFError:
+        return
+
+
+def replay_interactions(path: Path, dataset: AbstractData) -> ReplayReport:
+    """
+    replays a recording of InteractionRecorder on the masks of dataset, nothing is saved.
+    the dataset must be in the state it had when the recording started for the final masks to match.
+    """
+    replay = Replay(dataset)
+    report = ReplayReport()
+    edited_frames: set[int] = set()
+    with open_text(path, "r") as f:
+        for line in read_lines(f):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                break  # cut off by a crash
+            kind = event["type"]
+            if kind == "end":
+                report.expected_hashes = {int(index): value for index, value in event["masks"].items()}
+                continue
+            if kind in ("press", "lasso"):
+                edited_frames.add(event["frame"])
+            t0 = time.perf_counter()
+            replay.apply(event)
+            report.latencies.setdefault(kind, []).append(time.perf_counter() - t0)
+    report.masks = {index: replay.get_mask(index) for index in sorted(edited_frames)}
+    return report
@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from enum import IntEnum, auto
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Optional
 
 import numpy as np
 import numpy.typing as npt
-from simpleseg.data.io import img_2d_to_3d
+from simpleseg.kernels.backend import blend_colorized, colorize
 from simpleseg.shared_variables import COLORS
 from simpleseg.validation.data_validation import is_2d_img, is_3d_img, is_float_img, is_int_img
 
@@ -26,116 +28,253 @@ class ViewModeSelector:
             AvailableViewModes.IMG_ONLY: ImgOnlyView,
             AvailableViewModes.MASK_ONLY: MaskOnlyView,
         }
+        self.buffers = BufferPool()
+        self.renderer: Optional[TiledRenderer] = None
 
-    def get_view(self, img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    def set_render_threads(self, n_threads: int) -> None:
+        """n_threads > 1 renders large frames in row bands on a thread pool"""
+        if self.renderer is not None:
+            self.renderer.shutdown()
+        self.renderer = TiledRenderer(n_threads) if n_threads > 1 else None
+
+    def get_view(
+        self, img: npt.NDArray[Any], mask: npt.NDArray[Any], out: Optional[npt.NDArray[Any]] = None
+    ) -> npt.NDArray[Any]:
+        """without out, the view is rendered into a buffer of the pool, the caller owns it until it is released"""
         view_strategy: type[ViewStrategy] = self.view_strategies[self.state.view_strategy_selected]
-        return view_strategy.get_view(img, mask)
+        if out is None:
+            out = self.buffers.take(get_view_shape(mask))
+        return view_strategy.get_view(img, mask, out=out, renderer=self.renderer)
+
+
+class TiledRenderer:
+    """
+    splits frames into row bands that are processed on a thread pool. numpy releases the gil
+    in its ufuncs and np.take, the bands are computed in parallel. all view strategies are elementwise,
+    the result is bit-identical to rendering the frame at once.
+    frames with less than 2 * min_rows_per_band rows are rendered on the calling thread.
+    """
+
+    def __init__(self, n_threads: int, min_rows_per_band: int = 256):
+        assert n_threads >= 1
+        self.n_threads = n_threads
+        self.min_rows_per_band = min_rows_per_band
+        self.executor = ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="simpleseg-render")
+
+    def get_bands(self, n_rows: int) -> list[slice]:
+        n_bands = max(1, min(self.n_threads, n_rows // self.min_rows_per_band))
+        bounds = np.linspace(0, n_rows, n_bands + 1).astype(int)
+        return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def map_bands(self, func: Callable[..., Any], *arrays: npt.NDArray[Any]) -> list[Any]:
+        """calls func with the same row band of every array, returns the results in band order"""
+        bands = self.get_bands(len(arrays[0]))
+        if len(bands) == 1:
+            return [func(*arrays)]
+        return list(self.executor.map(lambda band: func(*(array[band] for array in arrays)), bands))
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+def map_bands_serial(func: Callable[..., Any], *arrays: npt.NDArray[Any]) -> list[Any]:
+    return [func(*arrays)]
+
+
+class BufferPool:
+    """
+    free render buffers by shape. views evicted from the ViewCache are released into the pool and reused
+    for the next render of the same resolution, in steady state no full frame buffers are allocated.
+    """
+
+    def __init__(self, max_buffers_per_shape: int = 4):
+        self.max_buffers_per_shape = max_buffers_per_shape
+        self.free: dict[tuple[int, ...], list[npt.NDArray[Any]]] = {}
+
+    def take(self, shape: tuple[int, ...]) -> npt.NDArray[Any]:
+        buffers = self.free.get(shape)
+        if buffers:
+            return buffers.pop()
+        return np.empty(shape, dtype=float)
+
+    def release(self, buffer: npt.NDArray[Any]) -> None:
+        if buffer.base is not None or buffer.dtype != float:
+            return  # only arrays owning their memory can be made writable again
+        buffers = self.free.setdefault(buffer.shape, [])
+        if len(buffers) < self.max_buffers_per_shape:
+            buffer.flags.writeable = True
+            buffers.append(buffer)
+
+    def clear(self) -> None:
+        self.free.clear()
+
+
+class ViewCache:
+    """
+    lru cache of rendered views, bounded by the total size of the cached arrays.
+    the key has to identify everything the view depends on, e.g. (frame index, mask version, view mode).
+    one view is kept per key, variant tells the views of a key apart that replace each other, e.g. the window:
+    dragging the window sliders replaces the view of the frame instead of evicting the views of other frames.
+    cached views are read-only, they are shared between all users of the cache.
+    on_evict is called with every view that drops out of the cache, e.g. BufferPool.release.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 512 * 1024**2,
+        on_evict: Optional[Callable[[npt.NDArray[Any]], None]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.n_bytes = 0
+        self.views: OrderedDict[Hashable, tuple[Hashable, npt.NDArray[Any]]] = OrderedDict()
+
+    def get(self, key: Hashable, variant: Hashable = None) -> Optional[npt.NDArray[Any]]:
+        entry = self.views.get(key)
+        if entry is None or entry[0] != variant:
+            return None
+        self.views.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, view: npt.NDArray[Any], variant: Hashable = None) -> None:
+        if key in self.views:
+            self.evict(key)
+        view.flags.writeable = False
+        self.views[key] = variant, view
+        self.n_bytes += view.nbytes
+        while self.n_bytes > self.max_bytes and len(self.views) > 1:
+            self.evict(next(iter(self.views)))
+
+    def evict(self, key: Hashable) -> None:
+        _, view = self.views.pop(key)
+        self.n_bytes -= view.nbytes
+        if self.on_evict is not None:
+            self.on_evict(view)
+
+    def clear(self) -> None:
+        for key in list(self.views):
+            self.evict(key)
+
+
+def check_band(img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> int:
+    """validates a band of the inputs, returns the maximum of the mask"""
+    assert is_float_img(img)
+    assert is_int_img(mask)
+    return int(mask.max())
+
+
+def get_view_shape(mask: npt.NDArray[Any]) -> tuple[int, int, int]:
+    return (*mask.shape, 3)
+
+
+def as_broadcastable(img: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    """gray images get a channel axis of length 1, numpy broadcasts it to rgb without repeating the data"""
+    return img[..., None] if img.ndim == 2 else img
 
 
 class ViewStrategy(ABC):
     @classmethod
-    def get_view(cls, img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
-        img_3d = img_2d_to_3d(img)
-        assert is_float_img(img_3d)
-        assert is_3d_img(img_3d)
+    def get_view(
+        cls,
+        img: npt.NDArray[Any],
+        mask: npt.NDArray[Any],
+        out: Optional[npt.NDArray[Any]] = None,
+        renderer: Optional["TiledRenderer"] = None,
+    ) -> npt.NDArray[Any]:
+        """
+        img: 2d or 3d float
+        mask: 2d int
+        out: 3d float buffer of shape (*mask.shape, 3), allocated if not given, the view is rendered into it
+        renderer: renders in row bands on a thread pool, without it the frame is rendered at once
+        """
+        assert is_2d_img(img) or is_3d_img(img)
         assert is_2d_img(mask)
-        assert is_int_img(mask)
-        return cls._get_view(img_3d, mask)
+        assert img.shape[:2] == mask.shape
+        if out is None:
+            out = np.empty(get_view_shape(mask), dtype=float)
+        assert out.shape == get_view_shape(mask) and out.dtype == float
+        map_bands = map_bands_serial if renderer is None else renderer.map_bands
+
+        # decisions that depend on the whole frame are made before the frame is split
+        mask_max = max(map_bands(check_band, img, mask))
+        strategy = cls.resolve(mask_max)
+        map_bands(strategy._render, as_broadcastable(img), mask, out)
+        return out
+
+    @classmethod
+    def resolve(cls, mask_max: int) -> type["ViewStrategy"]:
+        """returns the strategy that renders a frame whose mask has the maximum value mask_max"""
+        return cls
 
     @staticmethod
     @abstractmethod
-    def _get_view(img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    def _render(img: npt.NDArray[Any], mask: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+        """img: 3d float with 1 or 3 channels, mask: 2d int, out: 3d float, written in place"""
         ...
 
 
 class ImgOnlyView(ViewStrategy):
     @staticmethod
-    def _get_view(img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
-        return img
+    def _render(img: npt.NDArray[Any], mask: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+        np.copyto(out, img)
 
 
 class MaskOnlyView(ViewStrategy):
+    @classmethod
+    def resolve(cls, mask_max: int) -> type[ViewStrategy]:
+        return MaskOnlyMultiView if mask_max > 1 else MaskOnlySingleView
+
     @staticmethod
-    def _get_view(img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
-        assert is_int_img(mask)
-        if np.max(mask) <= 1:
-            # only one class
-            mask_2d = mask.astype(float)
-            mask_3d = img_2d_to_3d(mask_2d)
-        else:
-            # many classes
-            mask_3d = colorize_mask(mask)
-        assert is_float_img(mask_3d)
-        return mask_3d
+    def _render(img: npt.NDArray[Any], mask: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+        MaskOnlyView.resolve(mask.max())._render(img, mask, out)
 
 
-class OverlayView(ViewStrategy):
+class MaskOnlySingleView(ViewStrategy):
     @staticmethod
-    def _get_view(img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
-        if mask.max() > 1:
-            return OverlayMultiView._get_view(img, mask)
-        else:
-            return OverlaySingleView._get_view(img, mask)
+    def _render(img: npt.NDArray[Any], mask: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+        """only one class, shown in white"""
+        np.copyto(out, mask[..., None])
 
 
-class OverlaySingleView(ViewStrategy):
+class MaskOnlyMultiView(ViewStrategy):
     @staticmethod
-    def _get_view(img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
-        """
-        generates a mask visualization for binary masks
-        img: 3d float
-        mask: 2d int
-        """
-        # checks
-        assert is_3d_img(img)
-        assert is_float_img(img)
-        assert is_2d_img(mask)
-        assert is_int_img(mask)
+    def _render(img: npt.NDArray[Any], mask: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+        colorize_mask(mask, out=out)
 
-        # combine matrices
-        out = img.copy()
-        out[:, :, 2] = np.where(mask[:, :] > 0, 1, 0)
 
-        # check output
-        assert is_3d_img(out)
-        assert is_float_img(out)
-        return out
+class OverlayView(ViewStrategy):
+    @classmethod
+    def resolve(cls, mask_max: int) -> type[ViewStrategy]:
+        return OverlayMultiView if mask_max > 1 else OverlaySingleView
 
+    @staticmethod
+    def _render(img: npt.NDArray[Any], mask: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+        OverlayView.resolve(mask.max())._render(img, mask, out)
 
-class OverlayMultiView(ViewStrategy):
+
+class OverlaySingleView(ViewStrategy):
     @staticmethod
-    def _get_view(img: npt.NDArray[Any], mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
-        """
-        generates a mask visualization for binary masks
-        img: 3d float
-        mask: 2d int
-        """
-        # checks
-        assert is_3d_img(img)
-        assert is_float_img(img)
-        assert is_2d_img(mask)
-        assert is_int_img(mask)
+    def _render(img: npt.NDArray[Any], mask: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+        """binary masks are shown in the blue channel"""
+        np.copyto(out, img)
+        np.greater(mask, 0, out=out[..., 2])
 
-        # combine matrices
-        mask_colorized = colorize_mask(mask)
 
-        WEIGHT_IMG = 1.0
-        WEIGHT_MASK = 1.0
-        out = (WEIGHT_IMG * img + WEIGHT_MASK * mask_colorized) / (WEIGHT_IMG + WEIGHT_MASK)
+class OverlayMultiView(ViewStrategy):
+    @staticmethod
+    def _render(img: npt.NDArray[Any], mask: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+        """equally weighted mean of image and colorized mask"""
+        blend_colorized(img, mask, COLOR_LUT, out)
 
-        # check output
-        assert is_3d_img(out)
-        assert is_float_img(out)
-        return out
+
+# row i holds the color of class i, class 0 is black, colors repeat for classes beyond the defined colors
+COLOR_LUT = np.array([(0.0, 0.0, 0.0)] + [COLORS[(i - 1) % len(COLORS)] for i in range(1, 256)], dtype=float)
+COLOR_LUT.flags.writeable = False
 
 
-def colorize_mask(mask: npt.NDArray[Any]) -> npt.NDArray[Any]:
-    out = np.zeros((*mask.shape, 3), dtype=float)  # shape: height x width x 3
-    classes = np.unique(mask).tolist()  # returns [1, 2, 3] if classes 0, 1, 2, 3 are present in mask
-    classes.remove(0)
-    for class_int in classes:
-        mask_class = (mask == class_int)[..., None]
-        color = COLORS[class_int - 1]
-        color_array = np.array(color)[None, None, ...]
-        out = np.where(mask_class.repeat(3, axis=-1), color_array, out)
+def colorize_mask(mask: npt.NDArray[Any], out: Optional[npt.NDArray[Any]] = None) -> npt.NDArray[Any]:
+    """looks up the color of every pixel, out: optional (*mask.shape, 3) float buffer"""
+    if out is None:
+        out = np.empty(get_view_shape(mask), dtype=float)
+    colorize(mask, COLOR_LUT, out)
     return out
@@ -0,0 +1,71 @@
+import time
+from typing import Any, Callable, Optional
+
+# longest side of the reduced resolution previews shown while scrubbing
+PREVIEW_SIZE = 512
+
+
+class RenderScheduler:
+    """
+    coalesces frame changes, only the latest requested frame is rendered.
+    a single frame change is rendered as soon as tk is idle, all requests that arrived until then are merged.
+    while frames are requested faster than scrub_interval_ms (held navigation key, scrolling the file list)
+    only render_preview is called, render_full follows once no request came in for settle_ms.
+    """
+
+    def __init__(
+        self,
+        root: Any,
+        render_full: Callable[[int], None],
+        render_preview: Callable[[int], None],
+        scrub_interval_ms: int = 150,
+        settle_ms: int = 150,
+    ):
+        self.root = root
+        self.render_full = render_full
+        self.render_preview = render_preview
+        self.scrub_interval_ms = scrub_interval_ms
+        self.settle_ms = settle_ms
+        self.target: Optional[int] = None
+        self.scrubbing = False
+        self.last_request = -float("inf")
+        self.idle_id: Optional[str] = None
+        self.settle_id: Optional[str] = None
+
+    def request(self, index: int) -> None:
+        now = time.monotonic()
+        self.scrubbing = (now - self.last_request) * 1000 < self.scrub_interval_ms
+        self.last_request = now
+        self.target = index
+        if self.idle_id is None:
+            self.idle_id = self.root.after_idle(self.flush)
+
+    def flush(self) -> None:
+        self.idle_id = None
+        if self.target is None:
+            return
+        self.cancel_settle()
+        if self.scrubbing:
+            self.render_preview(self.target)
+            self.settle_id = self.root.after(self.settle_ms, self.settle)
+        else:
+            self.render_full(self.target)
+
+    def settle(self) -> None:
+        self.settle_id = None
+        if self.target is not None:
+            self.render_full(self.target)
+
+    def cancel_settle(self) -> None:
+        if self.settle_id is not None:
+            self.root.after_cancel(self.settle_id)
+            self.settle_id = None
+
+    def cancel(self) -> None:
+        """drops pending renders, e.g. when the dataset changes"""
+        if self.idle_id is not None:
+            self.root.after_cancel(self.idle_id)
+            self.idle_id = None
+        self.cancel_settle()
+        self.target = None
+        self.last_request = -float("inf")
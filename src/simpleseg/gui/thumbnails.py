@@ -0,0 +1,107 @@
+import math
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from loguru import logger
+
+from simpleseg.gui.display import ChannelMapping, WindowLevel, display_image
+from simpleseg.gui.overlay import OverlayView
+
+
+def make_thumbnail(
+    img: npt.NDArray[Any],
+    mask: npt.NDArray[Any],
+    max_size: int,
+    window: Optional[WindowLevel] = None,
+    mapping: Optional[ChannelMapping] = None,
+) -> npt.NDArray[np.uint8]:
+    """
+    renders a reduced resolution overlay of image and mask
+    img: 2d or 3d, float or in its stored dtype with a window, multichannel images with a channel mapping
+    mask: 2d int
+    window, mapping: applied to the reduced image
+    out: 3d uint8, longest side <= max_size
+    """
+    step = max(1, math.ceil(max(mask.shape) / max_size))
+    img_small = display_image(np.ascontiguousarray(img[::step, ::step]), window, mapping)
+    mask_small = np.ascontiguousarray(mask[::step, ::step])
+    overlay = OverlayView.get_view(img_small, mask_small)
+    return (overlay * 255).astype(np.uint8)
+
+
+class ThumbnailCache:
+    """
+    bounded lru cache of thumbnails, optionally backed by a directory of .npz files.
+    every frame has a generation that is increased by invalidate(), thumbnails that were rendered
+    for an older generation are rejected by put().
+    thumbnails of stored masks carry the time of the mask (FrameStats.timestamp), get() ignores thumbnails
+    of another time, e.g. files left from before the mask was changed by another program or annotator.
+    """
+
+    def __init__(self, max_entries: int = 512, cache_dir: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+        # thumbnail and mask time, None for thumbnails of unsaved masks
+        self.thumbnails: OrderedDict[int, tuple[npt.NDArray[np.uint8], Optional[float]]] = OrderedDict()
+        self.generations: dict[int, int] = {}
+
+    def get_path(self, index: int) -> Optional[Path]:
+        return None if self.cache_dir is None else self.cache_dir / f"{index:06d}.npz"
+
+    def generation(self, index: int) -> int:
+        return self.generations.get(index, 0)
+
+    def get(self, index: int, mask_time: Optional[float] = None) -> Optional[npt.NDArray[np.uint8]]:
+        """mask_time: time of the stored mask, None if unknown, thumbnails on disk are not used then"""
+        if index in self.thumbnails:
+            thumbnail, thumbnail_time = self.thumbnails[index]
+            if thumbnail_time is None or thumbnail_time == mask_time:
+                self.thumbnails.move_to_end(index)
+                return thumbnail
+            del self.thumbnails[index]
+        path = self.get_path(index)
+        if path is None or mask_time is None or not path.is_file():
+            return None
+        try:
+            with np.load(path) as content:
+                thumbnail, thumbnail_time = content["thumbnail"], float(content["mask_time"])
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"could not read thumbnail {path}")
+            return None
+        if thumbnail_time != mask_time:
+            return None
+        self.store(index, thumbnail, mask_time)
+        return thumbnail
+
+    def put(
+        self, index: int, thumbnail: npt.NDArray[np.uint8], generation: int, mask_time: Optional[float] = None
+    ) -> bool:
+        """mask_time = None for thumbnails of unsaved masks, they must not outlive the session"""
+        if generation != self.generation(index):
+            return False
+        self.store(index, thumbnail, mask_time)
+        path = self.get_path(index)
+        if mask_time is not None and path is not None:
+            try:
+                np.savez(path, thumbnail=thumbnail, mask_time=mask_time)
+            except OSError:
+                logger.warning(f"could not write thumbnail {path}")
+        return True
+
+    def store(self, index: int, thumbnail: npt.NDArray[np.uint8], mask_time: Optional[float]) -> None:
+        self.thumbnails[index] = thumbnail, mask_time
+        self.thumbnails.move_to_end(index)
+        while len(self.thumbnails) > self.max_entries:
+            self.thumbnails.popitem(last=False)
+
+    def invalidate(self, index: int) -> None:
+        self.generations[index] = self.generation(index) + 1
+        self.thumbnails.pop(index, None)
+        path = self.get_path(index)
+        if path is not None:
+            path.unlink(missing_ok=True)
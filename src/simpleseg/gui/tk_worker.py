@@ -0,0 +1,92 @@
+import queue
+import threading
+import tkinter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+from loguru import logger
+
+
+class TkWorker:
+    """
+    runs blocking functions (disk i/o, decoding) on a small thread pool.
+    tkinter must only be used from the thread running the mainloop, so results are not delivered
+    from the worker threads. they are put into a queue that is polled with after() on the tk thread,
+    the callbacks passed to submit() are called from there.
+    """
+
+    def __init__(self, root: tkinter.Misc, max_workers: int = 2, poll_interval_ms: int = 15, name: str = "worker"):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"simpleseg-{name}")
+        self.poll_interval_ms = poll_interval_ms
+        self.done: queue.SimpleQueue[tuple[Future, Callable[[Any], None], Optional[Callable]]] = queue.SimpleQueue()
+        self.n_pending = 0
+        self.polling = False
+        self.running: set[Future] = set()  # not finished yet, see drain()
+        self.running_lock = threading.Lock()
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        on_done: Callable[[Any], None],
+        on_error: Optional[Callable[[BaseException], None]] = None,
+    ) -> Future:
+        """calls func(*args) on a worker thread and on_done(result) on the tk thread"""
+        future = self.executor.submit(func, *args)
+        self.n_pending += 1
+        with self.running_lock:
+            self.running.add(future)
+        future.add_done_callback(self.on_future_done)
+        future.add_done_callback(lambda f: self.done.put((f, on_done, on_error)))
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval_ms, self.poll)
+        return future
+
+    def on_future_done(self, future: Future) -> None:
+        with self.running_lock:
+            self.running.discard(future)
+
+    def poll(self) -> None:
+        try:
+            while True:
+                try:
+                    future, on_done, on_error = self.done.get_nowait()
+                except queue.Empty:
+                    break
+                self.n_pending -= 1
+                self.deliver(future, on_done, on_error)
+        finally:
+            # polling only runs while tasks are pending
+            if self.n_pending:
+                self.root.after(self.poll_interval_ms, self.poll)
+            else:
+                self.polling = False
+
+    @staticmethod
+    def deliver(future: Future, on_done: Callable[[Any], None], on_error: Optional[Callable]) -> None:
+        """a failing callback is logged, the results of the other tasks are still delivered"""
+        exception = future.exception()
+        try:
+            if exception is None:
+                on_done(future.result())
+            elif on_error is not None:
+                on_error(exception)
+            else:
+                logger.opt(exception=exception).error("background task failed")
+        except Exception:
+            logger.opt(exception=True).error("callback of a background task failed")
+
+    @property
+    def busy(self) -> bool:
+        return self.n_pending > 0
+
+    def drain(self) -> None:
+        """blocks until all submitted functions returned, their callbacks still run on the next poll"""
+        with self.running_lock:
+            running = list(self.running)
+        wait(running)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=False)
@@ -0,0 +1,37 @@
+"""
+drawing and rendering kernels used by the tools and view strategies.
+the numba compiled kernels are used when numba is installed (pip install simpleseg[numba]),
+otherwise the numpy kernels. set the environment variable SIMPLESEG_KERNELS=numpy to force the numpy kernels.
+"""
+import os
+from types import ModuleType
+from typing import Optional
+
+from loguru import logger
+
+from simpleseg.kernels import numpy_kernels
+
+
+def load_backend(name: Optional[str] = None) -> ModuleType:
+    """name: "numba", "numpy" or None for the fastest installed backend"""
+    assert name in (None, "numba", "numpy"), f"unknown kernel backend {name}"
+    if name == "numpy":
+        return numpy_kernels
+    try:
+        from simpleseg.kernels import numba_kernels
+    except ImportError:
+        if name == "numba":
+            logger.warning("numba is not installed, falling back to the numpy kernels")
+        return numpy_kernels
+    return numba_kernels
+
+
+backend = load_backend(os.environ.get("SIMPLESEG_KERNELS") or None)
+BACKEND = backend.NAME
+
+bresenham_line = backend.bresenham_line
+draw_polyline = backend.draw_polyline
+colorize = backend.colorize
+lookup = backend.lookup
+blend_colorized = backend.blend_colorized
+polygon_mask = backend.polygon_mask
@@ -0,0 +1,162 @@
+"""numba compiled versions of the drawing and rendering kernels, same signatures as numpy_kernels"""
+import math
+from typing import Any
+
+import numba
+import numpy as np
+import numpy.typing as npt
+
+from simpleseg.kernels.numpy_kernels import get_polygon_region
+from simpleseg.shared_variables import Region
+
+NAME = "numba"
+
+
+@numba.njit(cache=True, nogil=True)
+def _bresenham_line(x0, y0, x1, y1):
+    dx = abs(x1 - x0)
+    sx = 1 if x0 < x1 else -1
+    dy = -abs(y1 - y0)
+    sy = 1 if y0 < y1 else -1
+    err = dx + dy
+    n_points = max(dx, -dy) + 1
+    xs = np.empty(n_points, dtype=np.int64)
+    ys = np.empty(n_points, dtype=np.int64)
+    for i in range(n_points):
+        xs[i] = x0
+        ys[i] = y0
+        e2 = 2 * err
+        if e2 > dy:
+            err += dy
+            x0 += sx
+        if e2 < dx:
+            err += dx
+            y0 += sy
+    return xs, ys
+
+
+def bresenham_line(x0: int, y0: int, x1: int, y1: int) -> tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+    return _bresenham_line(int(x0), int(y0), int(x1), int(y1))
+
+
+@numba.njit(cache=True, nogil=True)
+def _stamp(mask, x, y, brush_x, brush_y, value):
+    height, width = mask.shape
+    for j in range(len(brush_x)):
+        px = x + brush_x[j]
+        py = y + brush_y[j]
+        if 0 <= px < width and 0 <= py < height:
+            mask[py, px] = value
+
+
+@numba.njit(cache=True, nogil=True)
+def _draw_polyline(mask, xs, ys, brush_x, brush_y, value):
+    if len(xs) == 1:
+        _stamp(mask, xs[0], ys[0], brush_x, brush_y, value)
+    for i in range(len(xs) - 1):
+        x0, y0, x1, y1 = xs[i], ys[i], xs[i + 1], ys[i + 1]
+        dx = abs(x1 - x0)
+        sx = 1 if x0 < x1 else -1
+        dy = -abs(y1 - y0)
+        sy = 1 if y0 < y1 else -1
+        err = dx + dy
+        while True:
+            _stamp(mask, x0, y0, brush_x, brush_y, value)
+            if x0 == x1 and y0 == y1:
+                break
+            e2 = 2 * err
+            if e2 > dy:
+                err += dy
+                x0 += sx
+            if e2 < dx:
+                err += dx
+                y0 += sy
+
+
+def draw_polyline(
+    mask: npt.NDArray[Any],
+    xs: npt.NDArray[Any],
+    ys: npt.NDArray[Any],
+    brush_x: npt.NDArray[Any],
+    brush_y: npt.NDArray[Any],
+    value: int,
+) -> None:
+    _draw_polyline(
+        mask,
+        np.asarray(xs, dtype=np.int64),
+        np.asarray(ys, dtype=np.int64),
+        np.asarray(brush_x, dtype=np.int64),
+        np.asarray(brush_y, dtype=np.int64),
+        value,
+    )
+
+
+@numba.njit(cache=True, nogil=True)
+def _lut_index(value, n_colors):
+    # same as np.take(..., mode="clip")
+    return min(max(value, 0), n_colors - 1)
+
+
+@numba.njit(cache=True, nogil=True)
+def colorize(mask, lut, out):
+    height, width = mask.shape
+    for r in range(height):
+        for c in range(width):
+            color = _lut_index(mask[r, c], len(lut))
+            for k in range(3):
+                out[r, c, k] = lut[color, k]
+
+
+@numba.njit(cache=True, nogil=True)
+def _lookup(img, lut, out):
+    n_values = len(lut)
+    for i in range(img.size):
+        out[i] = lut[_lut_index(img[i], n_values)]
+
+
+def lookup(img: npt.NDArray[Any], lut: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+    assert out.flags.c_contiguous
+    _lookup(img.ravel(), lut, out.reshape(-1))
+
+
+@numba.njit(cache=True, nogil=True)
+def blend_colorized(img, mask, lut, out):
+    height, width = mask.shape
+    single_channel = img.shape[2] == 1
+    for r in range(height):
+        for c in range(width):
+            color = _lut_index(mask[r, c], len(lut))
+            for k in range(3):
+                out[r, c, k] = (lut[color, k] + img[r, c, 0 if single_channel else k]) * 0.5
+
+
+@numba.njit(cache=True, nogil=True)
+def _polygon_inside(verts, x_min, y_min, height, width):
+    """even-odd rule, scanline by scanline: pixels between pairs of sorted edge crossings are inside"""
+    inside = np.zeros((height, width), dtype=np.bool_)
+    n_verts = len(verts)
+    crossings = np.empty(n_verts, dtype=np.float64)
+    for r in range(height):
+        y = y_min + r
+        n_crossings = 0
+        for i in range(n_verts):
+            x0, y0 = verts[i - 1, 0], verts[i - 1, 1]  # i - 1 == -1 closes the polygon
+            x1, y1 = verts[i, 0], verts[i, 1]
+            if (y0 >= y) != (y1 >= y):
+                crossings[n_crossings] = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+                n_crossings += 1
+        row_crossings = np.sort(crossings[:n_crossings])
+        for j in range(0, n_crossings - 1, 2):
+            start = max(0, math.ceil(row_crossings[j]) - x_min)
+            stop = min(width, math.ceil(row_crossings[j + 1]) - x_min)
+            for c in range(start, stop):
+                inside[r, c] = True
+    return inside
+
+
+def polygon_mask(verts: Any, shape: tuple[int, ...]) -> tuple[Region, npt.NDArray[np.bool_]]:
+    verts = np.asarray(verts, dtype=float)
+    region = get_polygon_region(verts, shape)
+    rows, cols = region
+    inside = _polygon_inside(verts, cols.start, rows.start, rows.stop - rows.start, cols.stop - cols.start)
+    return region, inside
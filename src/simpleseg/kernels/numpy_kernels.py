@@ -0,0 +1,107 @@
+"""numpy versions of the drawing and rendering kernels, used when numba is not installed"""
+import math
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from simpleseg.shared_variables import Region
+
+NAME = "numpy"
+
+
+def bresenham_line(x0: int, y0: int, x1: int, y1: int) -> tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+    """
+    coordinates of the 8-connected line from (x0, y0) to (x1, y1), both end points included.
+    closed form of the bresenham algorithm, along the major axis every step is one pixel,
+    the minor coordinate is the rounded exact position with ties rounded towards the start.
+    """
+    dx, dy = abs(x1 - x0), abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    n_steps = max(dx, dy)
+    if n_steps == 0:
+        return np.array([x0]), np.array([y0])
+    steps = np.arange(n_steps + 1)
+    if dx >= dy:
+        return x0 + sx * steps, y0 + sy * ((2 * steps * dy + dx - 1) // (2 * dx))
+    return x0 + sx * ((2 * steps * dx + dy - 1) // (2 * dy)), y0 + sy * steps
+
+
+def draw_polyline(
+    mask: npt.NDArray[Any],
+    xs: npt.NDArray[Any],
+    ys: npt.NDArray[Any],
+    brush_x: npt.NDArray[Any],
+    brush_y: npt.NDArray[Any],
+    value: int,
+) -> None:
+    """
+    stamps the brush along the polyline through the points (xs[i], ys[i]), in place.
+    brush_x, brush_y: pixel offsets of the brush relative to its center
+    pixels outside the mask are skipped
+    """
+    lines = [bresenham_line(xs[i], ys[i], xs[i + 1], ys[i + 1]) for i in range(len(xs) - 1)]
+    if not lines:
+        lines = [(np.asarray(xs[:1]), np.asarray(ys[:1]))]
+    line_x = np.concatenate([line[0] for line in lines])
+    line_y = np.concatenate([line[1] for line in lines])
+    pixels_x = (line_x[:, None] + brush_x[None, :]).ravel()
+    pixels_y = (line_y[:, None] + brush_y[None, :]).ravel()
+    inside = (pixels_x >= 0) & (pixels_x < mask.shape[1]) & (pixels_y >= 0) & (pixels_y < mask.shape[0])
+    mask[pixels_y[inside], pixels_x[inside]] = value
+
+
+def colorize(mask: npt.NDArray[Any], lut: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+    """out[r, c] = lut[mask[r, c]]"""
+    # mode="clip" lets take() write into out directly, with "raise" the result is buffered
+    np.take(lut, mask, axis=0, out=out, mode="clip")
+
+
+def lookup(img: npt.NDArray[Any], lut: npt.NDArray[Any], out: npt.NDArray[Any]) -> None:
+    """out[...] = lut[img[...]], img: integer array of any shape, lut: 1d"""
+    np.take(lut, img, out=out, mode="clip")
+
+
+def blend_colorized(
+    img: npt.NDArray[Any], mask: npt.NDArray[Any], lut: npt.NDArray[Any], out: npt.NDArray[Any]
+) -> None:
+    """out = (img + lut[mask]) / 2, img: 3d with 1 or 3 channels"""
+    colorize(mask, lut, out)
+    np.add(out, img, out=out)
+    np.multiply(out, 0.5, out=out)
+
+
+def get_polygon_region(verts: npt.NDArray[Any], shape: tuple[int, ...]) -> Region:
+    """bounding box of the polygon in pixels, clipped to the image, may be empty"""
+    x_min = max(0, math.ceil(verts[:, 0].min()))
+    x_max = min(shape[1] - 1, math.floor(verts[:, 0].max()))
+    y_min = max(0, math.ceil(verts[:, 1].min()))
+    y_max = min(shape[0] - 1, math.floor(verts[:, 1].max()))
+    return slice(y_min, max(y_min, y_max + 1)), slice(x_min, max(x_min, x_max + 1))
+
+
+def polygon_mask(verts: Any, shape: tuple[int, ...]) -> tuple[Region, npt.NDArray[np.bool_]]:
+    """
+    pixels whose centers lie inside the polygon verts [(x, y), ...] by the even-odd rule,
+    only the bounding box is tested. returns (region, inside), inside is a bool array of the size of mask[region]
+    """
+    verts = np.asarray(verts, dtype=float)
+    region = get_polygon_region(verts, shape)
+    rows, cols = region
+    height, width = rows.stop - rows.start, cols.stop - cols.start
+
+    # crossings of every scanline with every edge, an edge connects the previous vertex with the vertex
+    x0, y0 = np.roll(verts, 1, axis=0).T
+    x1, y1 = verts.T
+    y = np.arange(rows.start, rows.stop)[:, None]
+    row_indices, edge_indices = np.nonzero((y0 >= y) != (y1 >= y))
+    x0, y0, x1, y1 = x0[edge_indices], y0[edge_indices], x1[edge_indices], y1[edge_indices]
+    crossings = x0 + (y[row_indices, 0] - y0) * (x1 - x0) / (y1 - y0)
+
+    # a pixel is inside if an odd number of crossings lies left of it, every crossing toggles the pixels right of it
+    toggles = np.zeros((height, width + 1), dtype=np.uint8)
+    columns = np.clip(np.ceil(crossings).astype(int) - cols.start, 0, width)
+    np.add.at(toggles, (row_indices, columns), 1)
+    inside = np.bitwise_xor.accumulate(toggles & 1, axis=1)[:, :width]
+    return region, inside.astype(bool)
@@ -1,5 +1,8 @@
 N_CLASSES_MAX = 10
 
+# (rows, columns) of a rectangular part of a frame, e.g. the pixels touched by an edit
+Region = tuple[slice, slice]
+
 # 10 colors
 COLORS = [
     (0.0, 0.0, 1.0),  # blue
@@ -14,3 +17,15 @@ COLORS = [
     (1.0, 0.5, 0.0),
 ]
 assert len(COLORS) >= N_CLASSES_MAX, "not enough colors defined"
+
+# tint of the image channels in the channel composite, by channel index
+CHANNEL_COLORS = [
+    (1.0, 0.0, 0.0),  # red
+    (0.0, 1.0, 0.0),
+    (0.0, 0.0, 1.0),
+    (1.0, 0.0, 1.0),
+    (0.0, 1.0, 1.0),
+    (1.0, 1.0, 0.0),
+    (1.0, 1.0, 1.0),
+    (1.0, 0.5, 0.0),
+]
@@ -9,7 +9,7 @@ def validate_mask_specs(img: npt.NDArray[Any]) -> bool:
 
 
 def validate_image_specs(img: npt.NDArray[Any]) -> bool:
-    return all([is_2d_img(img) or is_3d_img(img), is_float_img(img)])
+    return all([is_2d_img(img) or is_multichannel_img(img), is_float_img(img) or is_raw_img(img)])
 
 
 def is_3d_img(img: npt.NDArray[Any]) -> bool:
@@ -21,6 +21,16 @@ def is_3d_img(img: npt.NDArray[Any]) -> bool:
     return all([isinstance(img, np.ndarray), img.ndim == 3, img.shape[-1] == 3])
 
 
+def is_multichannel_img(img: npt.NDArray[Any]) -> bool:
+    """
+    rgb or any other number of channels, e.g. fluorescence channels shown through a ChannelMapping
+    checks for:
+    * ndim == 3
+    * shape[-1] >= 1
+    """
+    return all([isinstance(img, np.ndarray), img.ndim == 3, img.shape[-1] >= 1])
+
+
 def is_2d_img(img: npt.NDArray[Any]) -> bool:
     """
     checks for:
@@ -39,6 +49,20 @@ def is_float_img(img: npt.NDArray[Any]) -> bool:
     return all([isinstance(img, np.ndarray), img.dtype == float, img.min() >= 0.0, img.max() <= 1.0])
 
 
+def is_raw_img(img: npt.NDArray[Any]) -> bool:
+    """
+    images in their stored dtype, they are shown through a window (see WindowLevel)
+    checks for:
+    * dtype == uint8, uint16 or any float dtype
+    * finite values
+    """
+    if not isinstance(img, np.ndarray):
+        return False
+    if img.dtype in (np.uint8, np.uint16):
+        return True
+    return bool(np.issubdtype(img.dtype, np.floating) and np.isfinite(img).all())
+
+
 def is_int_img(img: npt.NDArray[Any]) -> bool:
     """
     checks for:
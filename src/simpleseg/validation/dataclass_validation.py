@@ -1,7 +1,13 @@
-from typing import Callable
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
 
+import numpy as np
 from loguru import logger
 from simpleseg.data.dataclass import AbstractData
+from simpleseg.data.parallel import FrameCheckpoint, map_frames
+from simpleseg.validation.data_validation import validate_image_specs, validate_mask_specs
 
 
 def validate_length(dataclass):
@@ -21,18 +27,139 @@ def validate_name(dataclass):
     return result
 
 
+def validate_frame_names(dataclass):
+    n_names = len(dataclass.get_frame_names())
+    result = n_names == len(dataclass)
+    if not result:
+        logger.warning(f"get_frame_names() returns {n_names} names for {len(dataclass)} frames")
+    return result
+
+
 TESTS: list[Callable] = [validate_length, validate_name]
+DEEP_TESTS: list[Callable] = [validate_frame_names]
+
+
+def describe_array(array: Any) -> str:
+    if not isinstance(array, np.ndarray):
+        return f"type={type(array).__name__}"
+    return f"dtype={array.dtype}, shape={array.shape}, range=[{array.min()}, {array.max()}]"
+
+
+def validate_frame(dataclass: AbstractData, index: int) -> dict[str, Any]:
+    """
+    checks image and mask of a single frame, runs inside the worker processes of validate_frames()
+    returns the errors and the image shape (json serializable, stored in the checkpoint)
+    """
+    errors = []
+    img_shape = mask_shape = None
+    try:
+        img = dataclass.get_image(index)
+        if isinstance(img, np.ndarray):
+            img_shape = list(img.shape)
+        if not validate_image_specs(img):
+            errors.append(f"image violates specs ({describe_array(img)})")
+    except Exception as e:
+        errors.append(f"get_image() raised {type(e).__name__}: {e}")
+    try:
+        mask = dataclass.get_mask(index)
+        if isinstance(mask, np.ndarray):
+            mask_shape = list(mask.shape)
+        if not validate_mask_specs(mask):
+            errors.append(f"mask violates specs ({describe_array(mask)})")
+    except Exception as e:
+        errors.append(f"get_mask() raised {type(e).__name__}: {e}")
+    if img_shape is not None and mask_shape is not None and img_shape[:2] != mask_shape:
+        errors.append(f"shape mismatch: image {img_shape}, mask {mask_shape}")
+    return {"errors": errors, "img_shape": img_shape}
+
 
+@dataclass
+class ValidationReport:
+    n_frames: int
+    frame_errors: dict[int, list[str]] = field(default_factory=dict)
 
-def validate_data(dataclass: AbstractData):
+    @property
+    def ok(self) -> bool:
+        return not self.frame_errors
+
+    def summary(self, max_frames: int = 10) -> str:
+        lines = [f"{self.n_frames - len(self.frame_errors)} of {self.n_frames} frames passed validation"]
+        for index in sorted(self.frame_errors)[:max_frames]:
+            lines.append(f"frame {index}: " + "; ".join(self.frame_errors[index]))
+        if len(self.frame_errors) > max_frames:
+            lines.append(f"... and {len(self.frame_errors) - max_frames} more frames with errors")
+        return "\n".join(lines)
+
+    def write(self, path: Path) -> None:
+        report = {"n_frames": self.n_frames, "frame_errors": self.frame_errors}
+        path.write_text(json.dumps(report, indent=2))
+
+
+def validate_frames(
+    dataclass: AbstractData,
+    n_workers: Optional[int] = None,
+    checkpoint_path: Optional[Path] = None,
+) -> ValidationReport:
+    """
+    loads and checks every frame of the dataset in a process pool
+    * images and masks must satisfy validate_image_specs() / validate_mask_specs()
+    * image and mask must have the same height and width
+    * all images must have the same shape as the first frame that passed the other checks
+    with checkpoint_path set, results are stored per frame and an interrupted run continues where it stopped
+    """
+    indices = range(len(dataclass))
+    checkpoint = FrameCheckpoint(checkpoint_path) if checkpoint_path else None
+    results: dict[int, dict[str, Any]] = dict(checkpoint.results) if checkpoint else {}
+    todo = checkpoint.todo(indices) if checkpoint else list(indices)
+    logger.info(f"validating {len(todo)} frames ({len(results)} already done)")
+
+    results_iter = map_frames(dataclass, validate_frame, todo, n_workers=n_workers)
+    if checkpoint:
+        results_iter = checkpoint.record(results_iter)
+    for index, result in results_iter:
+        results[index] = result
+
+    report = ValidationReport(n_frames=len(dataclass))
+    reference = next((index for index in indices if not results[index]["errors"]), None)
+    reference_shape = results[reference]["img_shape"] if reference is not None else None
+    for index in indices:
+        errors = list(results[index]["errors"])
+        img_shape = results[index]["img_shape"]
+        if img_shape is not None and reference_shape is not None and img_shape != reference_shape:
+            errors.append(f"image shape {tuple(img_shape)} differs from frame {reference} {tuple(reference_shape)}")
+        if errors:
+            report.frame_errors[index] = errors
+    return report
+
+
+def validate_data(
+    dataclass: AbstractData,
+    deep: bool = False,
+    n_workers: Optional[int] = None,
+    checkpoint_path: Optional[Path] = None,
+    report_path: Optional[Path] = None,
+):
+    """
+    deep = True additionally loads every frame, see validate_frames()
+    """
+    tests = TESTS + DEEP_TESTS if deep else TESTS
     counter_success = 0
-    for i, t in enumerate(TESTS):
+    for i, t in enumerate(tests):
         result = t(dataclass)
         if result:
             counter_success += 1
-            logger.debug(f"test {i}/{len(TESTS)} passed successfully")
+            logger.debug(f"test {i}/{len(tests)} passed successfully")
         else:
-            logger.error(f"test {i}/{len(TESTS)} resulted in an error")
-    logger.info(f"{counter_success} of {len(TESTS)} tests of dataclass passed successfully")
-    if counter_success < len(TESTS):
+            logger.error(f"test {i}/{len(tests)} resulted in an error")
+    logger.info(f"{counter_success} of {len(tests)} tests of dataclass passed successfully")
+    if counter_success < len(tests):
         raise Exception("Dataclass should pass validate_dataclass() before use")
+
+    if deep:
+        report = validate_frames(dataclass, n_workers=n_workers, checkpoint_path=checkpoint_path)
+        if report_path:
+            report.write(report_path)
+        if not report.ok:
+            logger.error(report.summary())
+            raise Exception("Dataclass should pass validate_dataclass(deep=True) before use")
+        logger.info(report.summary())
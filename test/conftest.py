@@ -0,0 +1,71 @@
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from simpleseg.data.dataclass import AbstractData
+
+
+class ArrayData(AbstractData):
+    """
+    in-memory dataset of the tests, picklable for the worker processes.
+    frames without an entry in images / masks get a zero float image / an empty mask of the given shape,
+    an exception as entry is raised when the frame is read.
+    with a dataset_path, masks are saved as <index>.npy files there and read from them if present,
+    so saves of worker processes are visible. the dataset_path also places the sidecar files of the app.
+    """
+
+    def __init__(
+        self,
+        n_frames: int,
+        shape: tuple[int, int],
+        images: Optional[dict[int, Any]] = None,
+        masks: Optional[dict[int, Any]] = None,
+        dataset_path: Optional[Path] = None,
+        name: str = "array_data",
+    ):
+        self.n_frames = n_frames
+        self.shape = shape
+        self.images = images or {}
+        self.masks = masks or {}
+        self.dataset_path = dataset_path
+        self.name = name
+
+    def __len__(self) -> int:
+        return self.n_frames
+
+    def get_frame_names(self) -> list[str]:
+        return [f"frame-{index:04d}" for index in range(len(self))]
+
+    @staticmethod
+    def entry(entries: dict[int, Any], index: int, default: npt.NDArray[Any]) -> npt.NDArray[Any]:
+        value = entries.get(index, default)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def mask_path(self, index: int) -> Optional[Path]:
+        return self.dataset_path / f"{index}.npy" if self.dataset_path is not None else None
+
+    def get_image(self, index: int) -> npt.NDArray[Any]:
+        return self.entry(self.images, index, np.zeros(self.shape))
+
+    def get_mask(self, index: int) -> npt.NDArray[Any]:
+        path = self.mask_path(index)
+        if path is not None and path.is_file():
+            return np.load(path)
+        return self.entry(self.masks, index, np.zeros(self.shape, dtype=int))
+
+    def get_mask_mtime(self, index: int) -> Optional[float]:
+        path = self.mask_path(index)
+        if path is None:
+            return None
+        return path.stat().st_mtime if path.is_file() else 0.0
+
+    def save_mask(self, mask: npt.NDArray[Any], index: int) -> None:
+        path = self.mask_path(index)
+        if path is None:
+            self.masks[index] = mask.copy()
+        else:
+            np.save(path, mask)
@@ -0,0 +1,100 @@
+import numpy as np
+
+from simpleseg.gui.display import (
+    IDENTITY_WINDOW,
+    ChannelMapping,
+    DisplayCache,
+    WindowLevel,
+    apply_window,
+    auto_window,
+    composite_channels,
+    display_image,
+    initial_channel_mapping,
+    initial_window,
+    intensity_range,
+)
+from simpleseg.validation.data_validation import validate_image_specs
+
+
+def reference_window(img, window):
+    return np.clip((img.astype(float) - window.low) / (window.high - window.low), 0.0, 1.0)
+
+
+def test_window_level():
+    window = WindowLevel.from_level_width(1000.0, 400.0)
+    assert (window.low, window.high) == (800.0, 1200.0)
+    assert (window.level, window.width) == (1000.0, 400.0)
+    assert WindowLevel.from_level_width(0.5, 1.0) == IDENTITY_WINDOW
+
+
+def test_apply_window():
+    rng = np.random.default_rng(0)
+    window = WindowLevel(100.0, 3000.0)
+    for img in (
+        rng.integers(0, 4096, (20, 30)).astype(np.uint16),
+        rng.integers(0, 256, (20, 30, 3)).astype(np.uint8),
+        rng.normal(1000.0, 800.0, (20, 30)).astype(np.float32),
+    ):
+        out = apply_window(img, window)
+        assert out.dtype == float and out.shape == img.shape
+        assert np.allclose(out, reference_window(img, window))
+
+
+def test_initial_window():
+    assert initial_window(np.full((4, 4), 0.5)) is None
+    assert initial_window(np.full((4, 4), 0.5, dtype=np.float32)) is not None  # decided by dtype, not by range
+    assert initial_window(np.zeros((4, 4), dtype=np.uint8)) == WindowLevel(0.0, 255.0)
+    img = np.arange(10000, dtype=np.uint16).reshape(100, 100) + 500
+    window = initial_window(img)
+    assert 500 < window.low < 600 and 10400 < window.high < 10500
+    assert intensity_range(img) == (500.0, 10499.0)
+    assert auto_window(np.full((4, 4), 7, dtype=np.uint16)).width > 0  # constant image
+
+
+def test_display_cache_reuses_buffer():
+    img = np.random.default_rng(1).integers(0, 4096, (20, 30)).astype(np.uint16)
+    cache = DisplayCache(max_bytes=2 * img.size * 8)  # two frames
+    a, b = WindowLevel(0.0, 4095.0), WindowLevel(500.0, 1500.0)
+    display_a = cache.get(0, img, a)
+    assert cache.get(0, img, a) is display_a
+    display_b = cache.get(0, img, b)
+    assert display_b is display_a  # remapped in place
+    assert np.allclose(display_b, reference_window(img, b))
+    cache.get(1, img, a)
+    cache.get(2, img, a)
+    assert list(cache.entries) == [(1, None), (2, None)]
+
+
+def test_composite_channels():
+    rng = np.random.default_rng(2)
+    img = rng.random((20, 30, 5))
+    assert validate_image_specs(img)
+    mapping = initial_channel_mapping(img)
+    assert mapping.channels == (0, 1, 2)
+    assert initial_channel_mapping(img[..., :3]) is None  # rgb
+    out = np.empty((20, 30, 3))
+    composite_channels(img, mapping, None, out)
+    assert np.array_equal(out, img[..., :3])  # red, green and blue
+
+    mapping = ChannelMapping.from_channels((1, 3))  # green, magenta
+    composite = display_image(img, None, mapping)
+    assert np.allclose(composite[..., 0], img[..., 3])
+    assert np.allclose(composite[..., 1], img[..., 1])
+    assert np.allclose(composite[..., 2], img[..., 3])
+
+    window = WindowLevel(0.0, 0.5)
+    composite = display_image(img, window, mapping)
+    assert np.allclose(composite[..., 1], reference_window(img[..., 1], window))
+
+
+def test_display_cache_per_channel_mapping():
+    img = np.random.default_rng(3).integers(0, 4096, (20, 30, 4)).astype(np.uint16)
+    cache = DisplayCache()
+    window = WindowLevel(0.0, 4095.0)
+    a, b = ChannelMapping.from_channels((0,)), ChannelMapping.from_channels((1, 2))
+    composite_a = cache.get(0, img, window, a)
+    composite_b = cache.get(0, img, window, b)
+    assert composite_a.shape == composite_b.shape == (20, 30, 3)
+    assert cache.get(0, img, window, a) is composite_a  # switching back is a lookup
+    assert np.allclose(composite_a[..., 0], reference_window(img[..., 0], window))
+    assert not composite_a[..., 1:].any()
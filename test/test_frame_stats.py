@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+from conftest import ArrayData
+
+from simpleseg.data.frame_stats import FrameStatsIndex, compute_frame_stats
+
+SHAPE = (10, 10)
+
+
+def class_mask(index: int):
+    mask = np.zeros(SHAPE, dtype=int)
+    mask[:index] = index  # frame 0 is empty, frame i contains class i
+    return mask
+
+
+def mask_data(dataset_path):
+    return ArrayData(4, SHAPE, masks={index: class_mask(index) for index in range(4)}, dataset_path=dataset_path)
+
+
+def test_compute_frame_stats():
+    stats = compute_frame_stats(class_mask(3))
+    assert stats.class_counts == [70, 0, 0, 30]
+    assert stats.classes == [3]
+    assert stats.labelled
+    assert not stats.contains(2)
+    assert not stats.contains(7)
+
+
+def test_frame_stats_index(tmp_path):
+    dataset = mask_data(tmp_path)
+    index = FrameStatsIndex.for_dataset(dataset)
+    index.compute(dataset, n_workers=0)
+    assert index.complete
+    assert index.filter(labelled=False) == [0]
+    assert index.filter(labelled=True) == [1, 2, 3]
+    assert index.filter(class_int=2) == [2]
+
+    index.update(0, np.full(SHAPE, 2))
+    assert index[0].last_modified is not None
+    assert index.filter(class_int=2) == [0, 2]
+
+    reloaded = FrameStatsIndex.for_dataset(dataset)
+    assert reloaded.complete
+    assert reloaded.filter(class_int=2) == [0, 2]
+
+
+def test_frame_stats_log(tmp_path):
+    dataset = mask_data(tmp_path)
+    index = FrameStatsIndex.for_dataset(dataset)
+    index.compute(dataset, n_workers=0)
+    snapshot = index.path.read_text()
+
+    # updates are appended to the log, the index file is not rewritten
+    index.update(1, np.full(SHAPE, 3))
+    assert index.path.read_text() == snapshot
+    assert len(index.log_path.read_text().splitlines()) == 1
+    assert FrameStatsIndex.for_dataset(dataset).filter(class_int=3) == [1, 3]
+
+    # a second instance saving does not drop the entries of the first one
+    other = FrameStatsIndex.for_dataset(dataset)
+    index.update(2, np.full(SHAPE, 3))
+    other.update(0, np.full(SHAPE, 1))
+    other.save()
+    assert not index.log_path.exists()
+    assert FrameStatsIndex.for_dataset(dataset).filter(class_int=3) == [1, 2, 3]
+    assert FrameStatsIndex.for_dataset(dataset).filter(class_int=1) == [0]
+
+
+def test_frame_stats_stale(tmp_path):
+    dataset = mask_data(tmp_path)
+    dataset.save_mask(class_mask(2), 0)
+    index = FrameStatsIndex.for_dataset(dataset)
+    index.compute(dataset, n_workers=0)
+    assert index.filter(class_int=2) == [0, 2]
+
+    # mask changed by another program, the cached entry is recomputed
+    mtime = dataset.get_mask_mtime(0)
+    dataset.save_mask(class_mask(1), 0)
+    os.utime(dataset.mask_path(0), (mtime + 1, mtime + 1))
+    index = FrameStatsIndex.for_dataset(dataset)
+    assert index.find_stale(dataset) == [0]
+    index.compute(dataset, n_workers=0)
+    assert index.filter(class_int=1) == [0, 1]
+    assert index.find_stale(dataset) == []
+
+
+def test_frame_stats_cancel(tmp_path):
+    dataset = mask_data(tmp_path)
+    index = FrameStatsIndex.for_dataset(dataset)
+    index.cancel()
+    index.compute(dataset, n_workers=0)
+    assert len(index) == 0
+
+
+def test_frame_stats_refresh(tmp_path):
+    dataset = mask_data(tmp_path)
+    index = FrameStatsIndex.for_dataset(dataset)
+    index.compute(dataset, n_workers=0)
+    other = FrameStatsIndex.for_dataset(dataset)
+    other.update(0, np.full(SHAPE, 1))
+    version = index.version
+    index.refresh()
+    assert index.filter(labelled=False) == []
+    assert index.version == version + 1
+    index.refresh()
+    assert index.version == version + 1
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from conftest import ArrayData
+
+from simpleseg.data.mask_ops import apply_polygon, apply_polyline
+from simpleseg.gui.interactions import InteractionRecorder, replay_interactions
+
+SHAPE = (40, 50)
+
+
+def blank_data():
+    return ArrayData(3, SHAPE, images={index: np.full(SHAPE, 0.5) for index in range(3)})
+
+
+def record_session(recorder, crash=False):
+    """records what the tools would record, returns the final masks of the session"""
+    masks = {1: np.zeros(SHAPE, dtype=int), 2: np.zeros(SHAPE, dtype=int)}
+    recorder.record("frame", index=1)
+    recorder.record("press", frame=1, width=3, value=2, view=1)
+    points = [(5, 5), (10, 8), (20, 8), (30, 20)]
+    for x, y in points[:2]:
+        recorder.record("motion", x=x, y=y)
+    recorder.record("redraw")
+    for x, y in points[2:]:
+        recorder.record("motion", x=x, y=y)
+    recorder.record("release")
+    xs, ys = np.array(points).T
+    apply_polyline(masks[1], xs, ys, 3, 2)
+
+    verts = [[2.5, 30.2], [25.0, 20.7], [40.1, 35.3]]
+    recorder.record("frame", index=2)
+    recorder.record("lasso", frame=2, verts=verts, value=1, view=3)
+    recorder.record("discard", frame=2)
+    recorder.record("lasso", frame=2, verts=verts, value=3, view=3)
+    apply_polygon(masks[2], verts, 3)
+    if not crash:
+        recorder.close(masks.__getitem__)
+    return masks
+
+
+@pytest.mark.parametrize("name", ["session.jsonl", "session.jsonl.gz"])
+def test_replay_interactions(tmp_path, name):
+    masks = record_session(InteractionRecorder(tmp_path / name))
+    report = replay_interactions(tmp_path / name, blank_data())
+    assert sorted(report.masks) == [1, 2]
+    for index, mask in masks.items():
+        assert np.array_equal(report.masks[index], mask)
+    assert report.matches_recording
+    assert len(report.latencies["motion"]) == 4
+    assert set(report.percentiles()) == {"frame", "press", "motion", "redraw", "release", "lasso", "discard"}
+    assert "matching the recording: True" in report.summary()
+
+
+def test_replay_cut_off_recording(tmp_path):
+    path = tmp_path / "session.jsonl"
+    record_session(InteractionRecorder(path))
+    lines = path.read_text().splitlines()
+    path.write_text("\n".join(lines[:-3]) + "\n" + lines[-3][:10])  # crashed while writing the discard
+    report = replay_interactions(path, blank_data())
+    assert report.matches_recording is None
+    assert set(np.unique(report.masks[2])) == {0, 1}
+
+
+@pytest.mark.parametrize("name", ["session.jsonl", "session.jsonl.gz"])
+def test_replay_crashed_session(tmp_path, name):
+    recorder = InteractionRecorder(tmp_path / name)
+    masks = record_session(recorder, crash=True)  # not closed, the events must be on disk already
+    report = replay_interactions(tmp_path / name, blank_data())
+    assert report.matches_recording is None
+    for index, mask in masks.items():
+        assert np.array_equal(report.masks[index], mask)
+    recorder.close(masks.__getitem__)
@@ -1,6 +1,7 @@
 from pathlib import Path
 
 import numpy as np
+from PIL import Image
 
 from simpleseg.data.io import read_image
 from simpleseg.validation.data_validation import validate_image_specs
@@ -31,3 +32,14 @@ def test_read_image_rgb_3c():
 def test_read_image_rgb_value_range():
     assert np.min(img_rgb) >= 0.0
     assert np.max(img_rgb) <= 1.0
+
+
+def test_read_image_16_bit(tmp_path):
+    img = np.array([[0, 1000], [4095, 65535]], dtype=np.uint16)
+    path = tmp_path / "img16.png"
+    Image.fromarray(img).save(path)
+    native = read_image(path, dtype=None)
+    assert native.dtype == np.uint16
+    assert np.array_equal(native, img)
+    assert np.allclose(read_image(path), img / 65535)
+    assert validate_image_specs(native)
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from matplotlib.path import Path as mplPath
+
+from simpleseg.kernels import numpy_kernels
+from simpleseg.kernels.backend import load_backend
+
+
+def reference_bresenham_line(x0, y0, x1, y1):
+    xcoords, ycoords = [], []
+    dx, sx = abs(x1 - x0), 1 if x0 < x1 else -1
+    dy, sy = -abs(y1 - y0), 1 if y0 < y1 else -1
+    err = dx + dy
+    while True:
+        xcoords.append(x0)
+        ycoords.append(y0)
+        if x0 == x1 and y0 == y1:
+            return xcoords, ycoords
+        e2 = 2 * err
+        if e2 > dy:
+            err += dy
+            x0 += sx
+        if e2 < dx:
+            err += dx
+            y0 += sy
+
+
+@pytest.fixture(params=["numpy", "numba"])
+def kernels(request):
+    if request.param == "numba":
+        pytest.importorskip("numba")
+    return load_backend(request.param)
+
+
+def test_bresenham_line(kernels):
+    rng = np.random.default_rng(0)
+    for x0, y0, x1, y1 in [(0, 0, 0, 0), (0, 0, 5, 0), (3, 3, -4, 1), *rng.integers(-50, 50, (200, 4)).tolist()]:
+        xcoords, ycoords = kernels.bresenham_line(x0, y0, x1, y1)
+        assert (xcoords.tolist(), ycoords.tolist()) == reference_bresenham_line(x0, y0, x1, y1)
+
+
+def test_draw_polyline(kernels):
+    mask = np.zeros((10, 12), dtype=int)
+    brush_x, brush_y = np.array([0, 1]), np.array([0, 0])
+    kernels.draw_polyline(mask, np.array([0, 11, 11]), np.array([0, 0, 9]), brush_x, brush_y, 2)
+    expected = np.zeros_like(mask)
+    expected[0, :] = 2
+    expected[:, 11] = 2
+    assert np.array_equal(mask, expected)  # the brush pixels right of the image are skipped
+
+    kernels.draw_polyline(mask, np.array([5]), np.array([5]), brush_x, brush_y, 1)
+    assert mask[5, 5:7].tolist() == [1, 1]
+
+
+def test_draw_polyline_matches_numpy(kernels):
+    rng = np.random.default_rng(1)
+    brush_x, brush_y = np.array([-1, 0, 1, 0, 0]), np.array([0, 0, 0, -1, 1])
+    for n_points in (1, 2, 7):
+        xs, ys = rng.integers(-5, 45, n_points), rng.integers(-5, 35, n_points)
+        expected, mask = np.zeros((30, 40), dtype=int), np.zeros((30, 40), dtype=int)
+        numpy_kernels.draw_polyline(expected, xs, ys, brush_x, brush_y, 3)
+        kernels.draw_polyline(mask, xs, ys, brush_x, brush_y, 3)
+        assert np.array_equal(mask, expected)
+
+
+def test_colorize_and_blend(kernels):
+    rng = np.random.default_rng(2)
+    lut = rng.random((256, 3))
+    mask = rng.integers(0, 6, (20, 30))
+    out = np.empty((20, 30, 3))
+    kernels.colorize(mask, lut, out)
+    assert np.array_equal(out, lut[mask])
+    for img in (rng.random((20, 30, 1)), rng.random((20, 30, 3))):
+        kernels.blend_colorized(img, mask, lut, out)
+        assert np.array_equal(out, (img + lut[mask]) / 2)
+
+
+def test_lookup(kernels):
+    rng = np.random.default_rng(4)
+    lut = rng.random(65536)
+    img = rng.integers(0, 65536, (20, 30, 3)).astype(np.uint16)
+    out = np.empty(img.shape)
+    kernels.lookup(img[:, ::-1], lut, out)  # non contiguous input
+    assert np.array_equal(out, lut[img[:, ::-1]])
+
+
+def test_polygon_mask(kernels):
+    rng = np.random.default_rng(3)
+    shape = (40, 50)
+    rows, cols = np.mgrid[0 : shape[0], 0 : shape[1]]
+    pixels = np.column_stack((cols.ravel(), rows.ravel()))
+    for _ in range(50):
+        verts = rng.random((int(rng.integers(3, 20)), 2)) * [60, 50] - 5  # partly outside, self-intersecting
+        expected = mplPath(verts).contains_points(pixels).reshape(shape)
+        region, inside = kernels.polygon_mask(verts, shape)
+        result = np.zeros(shape, dtype=bool)
+        result[region] = inside
+        assert np.array_equal(result, expected)
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+import pytest
+
+import simpleseg
+
+HEAVY_MODULES = ("tkinter", "matplotlib", "skimage", "scipy", "numba")
+
+
+def loaded_heavy_modules(statement: str) -> list[str]:
+    check = f"import sys\n{statement}\nprint(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], check=True, capture_output=True, text=True)
+    return result.stdout.split()
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import simpleseg",
+        "from simpleseg import AbstractData, validate_data, TiffStackData, remap_classes",
+        "from simpleseg.data.io import read_image",
+        "from simpleseg.data.frame_stats import frame_stats_worker",
+    ],
+)
+def test_data_only_imports_are_light(statement):
+    assert loaded_heavy_modules(statement) == []
+
+
+def test_lazy_exports():
+    from simpleseg.data.remap import remap_classes
+
+    assert simpleseg.remap_classes is remap_classes
+    assert set(simpleseg.__all__) == set(simpleseg._LAZY_EXPORTS)
+    assert set(simpleseg.__all__) <= set(dir(simpleseg))
+    with pytest.raises(AttributeError):
+        simpleseg.does_not_exist
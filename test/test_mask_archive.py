@@ -0,0 +1,119 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from simpleseg.data.mask_archive import RECORD_HEADER, MaskArchive
+
+SHAPE = (24, 32)
+
+
+def make_mask(value: int) -> np.ndarray:
+    mask = np.zeros(SHAPE, dtype=int)
+    mask[value : value + 5, 2:20] = value
+    return mask
+
+
+def test_archive_roundtrip(tmp_path):
+    path = tmp_path / "masks.ssma"
+    with MaskArchive(path) as archive:
+        for index in range(5):
+            archive.write(make_mask(index + 1), index)
+        assert archive.read(7) is None
+        assert np.array_equal(archive.read(3), make_mask(4))
+
+    with MaskArchive(path) as archive:
+        assert archive.frames() == [0, 1, 2, 3, 4]
+        for index in range(5):
+            assert np.array_equal(archive.read(index), make_mask(index + 1))
+
+
+def test_archive_overwrite_and_compact(tmp_path):
+    path = tmp_path / "masks.ssma"
+    archive = MaskArchive(path)
+    archive.write(make_mask(1), 0)
+    archive.write(make_mask(2), 1)
+    archive.write(make_mask(9), 0)
+    assert np.array_equal(archive.read(0), make_mask(9))
+
+    size_before = path.stat().st_size
+    archive.compact()
+    assert path.stat().st_size < size_before
+    assert np.array_equal(archive.read(0), make_mask(9))
+    assert np.array_equal(archive.read(1), make_mask(2))
+    archive.close()
+
+
+def test_archive_index_picks_up_unindexed_records(tmp_path):
+    path = tmp_path / "masks.ssma"
+    archive = MaskArchive(path)
+    archive.write(make_mask(1), 0)
+    archive.persist_index()
+    archive.write(make_mask(2), 1)
+    archive.file.close()  # simulate a crash, index sidecar only knows frame 0
+
+    reopened = MaskArchive(path)
+    assert reopened.frames() == [0, 1]
+    assert np.array_equal(reopened.read(1), make_mask(2))
+    reopened.close()
+
+
+def test_archive_ignores_truncated_record(tmp_path):
+    path = tmp_path / "masks.ssma"
+    archive = MaskArchive(path)
+    archive.write(make_mask(1), 0)
+    archive.close()
+    with path.open("ab") as f:
+        f.write(b"MREC" + bytes(RECORD_HEADER.size))
+
+    reopened = MaskArchive(path)
+    assert reopened.frames() == [0]
+    reopened.write(make_mask(3), 2)
+    assert np.array_equal(reopened.read(2), make_mask(3))
+    reopened.close()
+
+
+def test_archive_handles_see_each_others_records(tmp_path):
+    path = tmp_path / "masks.ssma"
+    first, second = MaskArchive(path), MaskArchive(path)
+    for index in range(6):
+        (first if index % 2 else second).write(make_mask(index + 1), index)
+    for archive in (first, second):
+        for index in range(6):
+            assert np.array_equal(archive.read(index), make_mask(index + 1))
+
+    first.compact()
+    second.write(make_mask(9), 0)  # appends to the compacted archive, not to the replaced one
+    assert np.array_equal(first.read(0), make_mask(9))
+    first.close()
+    second.close()
+    with MaskArchive(path) as archive:
+        assert archive.frames() == list(range(6))
+
+
+def write_frames(path: Path, indices: list[int]) -> None:
+    with MaskArchive(path) as archive:
+        for index in indices:
+            archive.write(make_mask(index % 15 + 1), index)
+
+
+def test_archive_concurrent_processes(tmp_path):
+    path = tmp_path / "masks.ssma"
+    archive = MaskArchive(path)
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(write_frames, [path] * 4, [list(range(start, 80, 4)) for start in range(4)]))
+    # picked up by the handle opened before the writes
+    for index in range(80):
+        assert np.array_equal(archive.read(index), make_mask(index % 15 + 1))
+    archive.close()
+    with MaskArchive(path) as reopened:
+        assert reopened.frames() == list(range(80))
+
+
+def test_archive_export_png(tmp_path):
+    path = tmp_path / "masks.ssma"
+    with MaskArchive(path) as archive:
+        archive.write(make_mask(2), 1)
+        archive.export_png(tmp_path / "masks", ["a.jpg", "b.jpg"])
+    assert not (tmp_path / "masks" / "a.png").exists()
+    assert (tmp_path / "masks" / "b.png").is_file()
@@ -0,0 +1,24 @@
+import numpy as np
+
+from simpleseg.data.mask_ops import brush_region, count_changed_pixels, union_regions
+
+
+def test_union_regions():
+    region = union_regions((slice(2, 5), slice(0, 3)), (slice(4, 9), slice(1, 2)))
+    assert region == (slice(2, 9), slice(0, 3))
+
+
+def test_brush_region_is_clipped():
+    brush_x, brush_y = np.array([-2, 0, 2]), np.array([-1, 0, 1])
+    region = brush_region(np.array([0, 5]), np.array([3, 8]), brush_x, brush_y, shape=(9, 6))
+    assert region == (slice(2, 9), slice(0, 6))
+
+
+def test_count_changed_pixels():
+    clean = np.zeros((10, 10), dtype=int)
+    mask = clean.copy()
+    mask[2:4, 2:4] = 1
+    region = (slice(0, 5), slice(0, 5))
+    assert count_changed_pixels(mask, clean, region) == 4
+    mask[2:4, 2:4] = 0
+    assert count_changed_pixels(mask, clean, region) == 0
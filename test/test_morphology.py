@@ -0,0 +1,63 @@
+import numpy as np
+
+from simpleseg.data.morphology import MorphologyOperation, apply_morphology
+
+
+def make_mask():
+    mask = np.zeros((20, 20), dtype=int)
+    mask[2:12, 2:12] = 1
+    mask[6, 6] = 0  # hole
+    mask[16, 16] = 1  # speck
+    mask[15:18, 2:5] = 2
+    mask[3, 10] = 2  # enclosed pixel of another class
+    return mask
+
+
+def test_dilate_whole_frame():
+    mask = make_mask()
+    region, changed, value = apply_morphology(mask, MorphologyOperation.DILATE, class_int=1, radius=1)
+    assert value == 1 and region == (slice(0, 20), slice(0, 20))
+    assert mask[1, 5] == 1 and mask[6, 6] == 1 and mask[16, 15] == 1
+    assert mask[1, 1] == 0  # disk footprint, no corners
+    assert np.all(mask[15:18, 2:5] == 2) and mask[3, 10] == 2  # other classes are not overwritten
+    assert np.array_equal(changed, (mask == 1) & (make_mask() != 1))
+
+
+def test_erode_in_roi_uses_padding():
+    mask = make_mask()
+    region = (slice(4, 8), slice(0, 20))
+    apply_morphology(mask, MorphologyOperation.ERODE, class_int=1, radius=1, region=region)
+    # pixels outside the roi are untouched, the roi border inside the object is not eroded
+    assert np.array_equal(mask[:4], make_mask()[:4]) and np.array_equal(mask[8:], make_mask()[8:])
+    assert np.all(mask[4, 3:6] == 1)
+    assert np.all(mask[4:8, 2] == 0) and mask[5, 6] == 0
+
+
+def test_fill_holes_and_remove_small_objects():
+    mask = make_mask()
+    apply_morphology(mask, MorphologyOperation.FILL_HOLES, class_int=1, radius=1)
+    assert mask[6, 6] == 1 and mask[3, 10] == 2
+    apply_morphology(mask, MorphologyOperation.REMOVE_SMALL_OBJECTS, class_int=1, radius=1)
+    assert mask[16, 16] == 0 and mask[2, 2] == 1
+    assert apply_morphology(mask, MorphologyOperation.REMOVE_SMALL_OBJECTS, class_int=1, radius=1) is None
+
+
+def test_remove_small_objects_measures_whole_objects():
+    mask = np.zeros((30, 30), dtype=int)
+    mask[11:25, 11:25] = 1  # large object, a single pixel of it is inside the roi
+    mask[2:4, 2:5] = 1  # small object inside the roi
+    mask[5:7, 10:14] = 1  # small object, half inside the roi
+    region = (slice(0, 12), slice(0, 12))
+    apply_morphology(mask, MorphologyOperation.REMOVE_SMALL_OBJECTS, class_int=1, radius=2, region=region)
+    assert mask[11, 11] == 1
+    assert not mask[2:4, 2:5].any()
+    assert not mask[5:7, 10:12].any() and mask[5:7, 12:14].all()  # only pixels in the roi change
+
+
+def test_lasso_inside():
+    mask = make_mask()
+    region = (slice(0, 14), slice(0, 14))
+    inside = np.zeros((14, 14), dtype=bool)
+    inside[:, :7] = True
+    apply_morphology(mask, MorphologyOperation.DILATE, class_int=1, radius=1, region=region, inside=inside)
+    assert mask[1, 5] == 1 and mask[1, 8] == 0
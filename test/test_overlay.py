@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from simpleseg.gui.overlay import (
+    BufferPool,
+    ImgOnlyView,
+    MaskOnlyView,
+    OverlayView,
+    TiledRenderer,
+    ViewCache,
+    colorize_mask,
+)
+from simpleseg.shared_variables import COLORS
+
+
+def test_view_cache_lru_by_bytes():
+    view = np.zeros((10, 10, 3))
+    cache = ViewCache(max_bytes=2 * view.nbytes)
+    for frame_index in range(3):
+        cache.put((frame_index, 0), view.copy())
+    assert cache.get((0, 0)) is None
+    assert cache.get((1, 0)) is not None
+    assert cache.n_bytes == 2 * view.nbytes
+
+
+def test_view_cache_variants():
+    view = np.zeros((10, 10, 3))
+    cache = ViewCache(max_bytes=2 * view.nbytes)
+    cache.put(0, view.copy(), variant="window a")
+    cache.put(1, view.copy(), variant="window a")
+    for window in ("window b", "window c", "window d"):  # dragging the window of frame 1
+        assert cache.get(1, window) is None
+        cache.put(1, view.copy(), variant=window)
+    assert cache.get(0, "window a") is not None
+    assert cache.get(1, "window d") is not None and cache.get(1, "window a") is None
+    assert cache.n_bytes == 2 * view.nbytes
+
+
+def test_view_cache_views_are_read_only():
+    cache = ViewCache()
+    cache.put("key", np.zeros((2, 2, 3)))
+    assert not cache.get("key").flags.writeable
+
+
+def test_view_cache_releases_evicted_views_into_pool():
+    pool = BufferPool()
+    view = pool.take((10, 10, 3))
+    cache = ViewCache(max_bytes=view.nbytes, on_evict=pool.release)
+    cache.put(0, view)
+    cache.put(1, pool.take((10, 10, 3)))
+    reused = pool.take((10, 10, 3))
+    assert reused is view
+    assert reused.flags.writeable
+
+
+def test_views_render_into_given_buffer():
+    rng = np.random.default_rng(0)
+    img = rng.random((8, 9))
+    mask = rng.integers(0, 4, (8, 9))
+    out = np.empty((8, 9, 3))
+    assert OverlayView.get_view(img, mask, out=out) is out
+
+    img_3d = img[..., None].repeat(3, axis=-1)
+    assert np.array_equal(out, (img_3d + colorize_mask(mask)) / 2)
+
+    binary = (mask > 1).astype(int)
+    expected = img_3d.copy()
+    expected[..., 2] = binary
+    assert np.array_equal(OverlayView.get_view(img, binary, out=out), expected)
+    assert np.array_equal(ImgOnlyView.get_view(img, binary, out=out), img_3d)
+    assert np.array_equal(MaskOnlyView.get_view(img, binary), binary[..., None].repeat(3, axis=-1))
+
+
+def test_colorize_mask():
+    mask = np.array([[0, 1], [2, len(COLORS) + 1]])
+    colorized = colorize_mask(mask)
+    assert colorized[0, 0].tolist() == [0.0, 0.0, 0.0]
+    assert colorized[0, 1].tolist() == list(COLORS[0])
+    assert colorized[1, 0].tolist() == list(COLORS[1])
+    assert colorized[1, 1].tolist() == list(COLORS[0])
+
+
+@pytest.mark.parametrize("strategy", [OverlayView, MaskOnlyView, ImgOnlyView])
+def test_tiled_render_is_bit_identical(strategy):
+    rng = np.random.default_rng(0)
+    img = rng.random((101, 37, 3))
+    mask = np.zeros((101, 37), dtype=int)
+    mask[:10] = rng.integers(0, 2, (10, 37))
+    mask[-1, -1] = 3  # the multi class decision is made for the whole frame, not per band
+    renderer = TiledRenderer(n_threads=4, min_rows_per_band=8)
+    assert len(renderer.get_bands(len(mask))) == 4
+    expected = strategy.get_view(img, mask)
+    assert np.array_equal(strategy.get_view(img, mask, renderer=renderer), expected)
+    renderer.shutdown()
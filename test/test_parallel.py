@@ -0,0 +1,29 @@
+import threading
+import time
+
+from conftest import ArrayData
+
+from simpleseg.data.parallel import map_frames
+
+
+def slow_frame(dataset, index: int) -> int:
+    time.sleep(0.05 if index == 0 else 2.0)
+    return index
+
+
+def test_map_frames_cancel():
+    cancel = threading.Event()
+    results = map_frames(ArrayData(8, (4, 4)), slow_frame, n_workers=2, chunksize=1, cancel=cancel)
+    assert next(results) == (0, 0)
+    t0 = time.perf_counter()
+    cancel.set()
+    assert list(results) == []
+    assert time.perf_counter() - t0 < 1.0  # the chunks in flight are not waited for
+
+
+def test_map_frames_close_early():
+    results = map_frames(ArrayData(8, (4, 4)), slow_frame, n_workers=2, chunksize=1)
+    assert next(results) == (0, 0)
+    t0 = time.perf_counter()
+    results.close()
+    assert time.perf_counter() - t0 < 1.0
@@ -0,0 +1,65 @@
+import numpy as np
+from conftest import ArrayData
+
+from simpleseg.data.presegmentation import (
+    Presegmentation,
+    PresegmentationSettings,
+    presegment_image,
+    remove_small_components,
+)
+
+SHAPE = (40, 40)
+
+
+def make_image():
+    img = np.full(SHAPE, 0.1)
+    img[5:15, 5:15] = 0.5
+    img[20:35, 20:35] = 0.9
+    img[2, 30] = 0.9  # single pixel noise
+    return img
+
+
+def image_data():
+    """frame 1 is labelled already, frame 2 has no foreground"""
+    labelled = np.zeros(SHAPE, dtype=int)
+    labelled[0, 0] = 1
+    return ArrayData(3, SHAPE, images={0: make_image(), 1: make_image()}, masks={1: labelled})
+
+
+def test_presegment_image():
+    mask = presegment_image(make_image(), PresegmentationSettings(n_classes=2, min_size=4))
+    assert mask.dtype == int
+    assert np.all(mask[5:15, 5:15] == 1)
+    assert np.all(mask[20:35, 20:35] == 2)
+    assert mask[2, 30] == 0
+    assert np.count_nonzero(mask) == 100 + 225
+
+    mask = presegment_image(make_image(), PresegmentationSettings(n_classes=1, min_size=4))
+    assert np.count_nonzero(mask) == 100 + 225 and mask.max() == 1
+
+    inverted = presegment_image(1.0 - make_image(), PresegmentationSettings(n_classes=2, min_size=4, invert=True))
+    assert np.array_equal(inverted, presegment_image(make_image(), PresegmentationSettings(n_classes=2, min_size=4)))
+
+    rgb = np.repeat(make_image()[:, :, np.newaxis], 3, axis=2)
+    assert np.count_nonzero(presegment_image(rgb, PresegmentationSettings(min_size=4))) == 325
+    assert not presegment_image(np.zeros(SHAPE), PresegmentationSettings()).any()
+
+
+def test_remove_small_components():
+    mask = np.zeros((5, 5), dtype=int)
+    mask[0, 0:3] = 1
+    mask[4, 4] = 1
+    mask[2:4, 2:4] = 2
+    remove_small_components(mask, min_size=3)
+    assert np.count_nonzero(mask == 1) == 3 and mask[4, 4] == 0
+    assert np.count_nonzero(mask == 2) == 4
+
+
+def test_presegmentation():
+    presegmentation = Presegmentation(image_data(), PresegmentationSettings(min_size=4))
+    presegmentation.run(n_workers=0)
+    results = presegmentation.pop_results()
+    # frame 1 is labelled, frame 2 has no foreground
+    assert [index for index, _ in results] == [0]
+    assert np.count_nonzero(results[0][1]) == 325
+    assert presegmentation.pop_results() == []
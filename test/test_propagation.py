@@ -0,0 +1,74 @@
+import numpy as np
+from conftest import ArrayData
+
+from simpleseg.data.propagation import (
+    Propagation,
+    PropagationMethod,
+    class_distances,
+    interpolate_masks,
+    propagate_masks,
+)
+
+SHAPE = (30, 30)
+
+
+def square(start: int, size: int, class_int: int = 1):
+    mask = np.zeros(SHAPE, dtype=int)
+    mask[start : start + size, start : start + size] = class_int
+    return mask
+
+
+def sequence_data():
+    """keyframes 2 and 6"""
+    return ArrayData(9, SHAPE, masks={2: square(4, 10), 6: square(8, 14)})
+
+
+def test_interpolate_masks():
+    a, b = square(4, 10), square(8, 14)
+    masks = list(interpolate_masks(class_distances(a), class_distances(b), SHAPE, [0.0, 0.5, 1.0]))
+    assert np.array_equal(masks[0], a) and np.array_equal(masks[2], b)
+    assert masks[1].dtype == int
+    # halfway between both in position and size, the corners are rounded by the distance transforms
+    rows, cols = np.nonzero(masks[1])
+    assert (rows.min(), rows.max(), cols.min(), cols.max()) == (6, 17, 6, 17)
+    assert np.all(masks[1][(a == 1) & (b == 1)] == 1)
+    assert not np.any(masks[1][(a == 0) & (b == 0)])
+
+
+def test_interpolate_class_missing_in_one_mask():
+    a = square(4, 6, class_int=2)
+    masks = list(interpolate_masks(class_distances(a), {}, SHAPE, [0.0, 0.5, 0.9]))
+    assert np.array_equal(masks[0], a)
+    assert np.array_equal(masks[1], square(5, 4, class_int=2))
+    assert not masks[2].any()
+
+
+def test_propagate_masks_nearest():
+    masks = {2: square(4, 6), 6: square(12, 14)}
+    results = dict(propagate_masks([2, 6], [0, 3, 4, 5, 8], masks.__getitem__, PropagationMethod.NEAREST))
+    assert list(results) == [0, 3, 4, 5, 8]
+    for index, keyframe in [(0, 2), (3, 2), (4, 2), (5, 6), (8, 6)]:
+        assert np.array_equal(results[index], masks[keyframe])
+    results[0][0, 0] = 1
+    assert masks[2][0, 0] == 0  # copies
+
+
+def test_propagation_job():
+    modified = {4: square(6, 12, class_int=2)}  # a modified keyframe, replaces the saved mask
+    propagation = Propagation(sequence_data(), PropagationMethod.INTERPOLATE, modified, labelled={0: False})
+    propagation.run()
+    results = dict(propagation.pop_results())
+    assert sorted(results) == [0, 1, 3, 5, 7, 8]
+    assert np.array_equal(results[0], square(4, 10))
+    assert np.array_equal(results[8], square(8, 14))
+    assert set(np.unique(results[3])) == {0, 1, 2}
+    assert set(np.unique(results[5])) == {0, 1, 2}
+
+
+def test_propagation_job_stale_stats():
+    dataset = sequence_data()
+    dataset.masks[8] = square(0, 3)  # labelled after the frame stats were taken
+    propagation = Propagation(dataset, PropagationMethod.NEAREST, {}, labelled={2: True, 6: True, 8: False})
+    propagation.run()
+    results = dict(propagation.pop_results())
+    assert sorted(results) == [0, 1, 3, 4, 5, 7]
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pytest
+from conftest import ArrayData
+
+from simpleseg.data.parallel import FrameCheckpoint
+from simpleseg.data.remap import make_lut, preview_remap_classes, remap_classes
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    for index in range(5):
+        mask = np.zeros((6, 6), dtype=int)
+        mask[:index] = 3  # frame 0 has no pixels of class 3
+        mask[5, 5] = 2
+        np.save(tmp_path / f"{index}.npy", mask)
+    return ArrayData(5, (6, 6), dataset_path=tmp_path)  # masks as .npy files, saved by the worker processes
+
+
+def test_make_lut():
+    lut = make_lut({3: 1, 7: 0})
+    assert lut[3] == 1 and lut[7] == 0 and lut[2] == 2
+    with pytest.raises(AssertionError):
+        make_lut({1: 2, 2: 1})  # a swap is not idempotent
+
+
+@pytest.mark.parametrize("n_workers", [0, 2])
+def test_remap_classes(dataset, n_workers):
+    preview = preview_remap_classes(dataset, {3: 1}, n_workers=n_workers)
+    assert preview.pixels == {3: 6 * (1 + 2 + 3 + 4)}
+    assert preview.frames == {3: 4}
+    assert dataset.get_mask(1)[0, 0] == 3  # dry run
+
+    report = remap_classes(dataset, {3: 1}, n_workers=n_workers)
+    assert report.n_changed_frames == 4
+    assert report.n_changed_pixels == preview.n_pixels
+    for index in range(5):
+        assert set(np.unique(dataset.get_mask(index))) <= {0, 1, 2}
+    assert preview_remap_classes(dataset, {3: 1}, n_workers=n_workers).n_pixels == 0  # frame stats were updated
+
+
+def test_remap_classes_saves_in_calling_process():
+    # in-memory masks, saves of worker processes would be lost
+    masks = {index: np.full((6, 6), 3 if index % 2 else 2) for index in range(40)}
+    dataset = ArrayData(40, (6, 6), masks=masks)
+    report = remap_classes(dataset, {3: 1}, n_workers=2)
+    assert report.n_changed_frames == 20
+    for index in range(40):
+        assert dataset.get_mask(index)[0, 0] == (1 if index % 2 else 2)
+
+
+def test_remap_classes_resumes(dataset, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.jsonl"
+    checkpoint = FrameCheckpoint(checkpoint_path)
+    done = [(0, {"changed": 0, "class_counts": []}), (1, {"changed": 6, "class_counts": [29, 0, 1, 6]})]
+    list(checkpoint.record(done))
+    report = remap_classes(dataset, {3: 1}, n_workers=0, checkpoint_path=checkpoint_path)
+    assert dataset.get_mask(1)[0, 0] == 3  # recorded as done, not processed again
+    assert dataset.get_mask(2)[0, 0] == 1
+    assert report.n_changed_frames == 3  # frames 2 to 4, frame 1 was done by the interrupted run
+    assert report.n_resumed_frames == 2
+    assert not checkpoint_path.exists()
+
+
+def test_remap_classes_rerun(dataset):
+    assert remap_classes(dataset, {3: 1}, n_workers=0).n_changed_frames == 4
+    assert not list(dataset.dataset_path.glob(".simpleseg-remap-*"))  # the checkpoint was deleted
+
+    # new labels of class 3 after the first run are remapped by a second run with the same mapping
+    mask = dataset.get_mask(0)
+    mask[3, 3] = 3
+    dataset.save_mask(mask, 0)
+    report = remap_classes(dataset, {3: 1}, n_workers=0)
+    assert report.n_changed_frames == 1 and report.n_resumed_frames == 0
+    assert dataset.get_mask(0)[3, 3] == 1
+
+
+def test_preview_remap_classes_stale_stats(dataset):
+    assert preview_remap_classes(dataset, {2: 1}, n_workers=0).frames == {2: 5}
+    # mask changed by another program after the stats were cached
+    mtime = dataset.get_mask_mtime(4)
+    dataset.save_mask(np.zeros((6, 6), dtype=int), 4)
+    os.utime(dataset.mask_path(4), (mtime + 1, mtime + 1))
+    assert preview_remap_classes(dataset, {2: 1}, n_workers=0).frames == {2: 4}
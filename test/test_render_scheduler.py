@@ -0,0 +1,54 @@
+from simpleseg.gui import render_scheduler
+from simpleseg.gui.render_scheduler import RenderScheduler
+
+
+class FakeRoot:
+    """collects after() callbacks, run() executes them in order, timers only if timers=True"""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.counter = 0
+
+    def after(self, ms, func):
+        self.counter += 1
+        self.callbacks[self.counter] = (ms, func)
+        return self.counter
+
+    def after_idle(self, func):
+        return self.after(0, func)
+
+    def after_cancel(self, identifier):
+        self.callbacks.pop(identifier, None)
+
+    def run(self, timers=False):
+        for identifier in sorted(self.callbacks):
+            ms, func = self.callbacks[identifier]
+            if ms == 0 or timers:
+                del self.callbacks[identifier]
+                func()
+
+
+def test_render_scheduler_coalesces_and_previews(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(render_scheduler.time, "monotonic", lambda: now[0])
+    root = FakeRoot()
+    rendered = []
+    scheduler = RenderScheduler(
+        root,
+        render_full=lambda index: rendered.append(("full", index)),
+        render_preview=lambda index: rendered.append(("preview", index)),
+    )
+
+    scheduler.request(1)
+    root.run()
+    assert rendered == [("full", 1)]
+
+    # held key: requests 30 ms apart, the frames requested before tk was idle are skipped
+    rendered.clear()
+    for index in range(2, 8):
+        now[0] += 0.03
+        scheduler.request(index)
+        if index % 2:
+            root.run()
+    root.run(timers=True)
+    assert rendered == [("preview", 3), ("preview", 5), ("preview", 7), ("full", 7)]
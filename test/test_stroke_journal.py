@@ -0,0 +1,68 @@
+import numpy as np
+from conftest import ArrayData
+
+from simpleseg.data.mask_ops import apply_operation, mask_operation, polygon_operation, polyline_operation
+from simpleseg.data.stroke_journal import StrokeJournal
+
+
+def test_journal_replays_operations(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    clean_masks = {index: np.zeros((30, 40), dtype=int) for index in range(3)}
+    operations = {
+        0: [
+            polyline_operation([2, 30, 35], [3, 20, 4], width=3, value=1),
+            polygon_operation([(1, 1), (9, 2), (5, 8)], value=2),
+        ],
+        2: [mask_operation(np.full((30, 40), 4))],
+    }
+    journal = StrokeJournal(path)
+    expected = {}
+    for frame_index, frame_operations in operations.items():
+        expected[frame_index] = clean_masks[frame_index].copy()
+        for operation in frame_operations:
+            apply_operation(expected[frame_index], operation)
+            journal.append(frame_index, operation)
+
+    # a new session, e.g. after a crash
+    recovered = StrokeJournal(path)
+    replayed = {index: mask for index, _, mask in recovered.replay(clean_masks.__getitem__, n_frames=3)}
+    assert sorted(replayed) == [0, 2]
+    for frame_index, mask in replayed.items():
+        assert np.array_equal(mask, expected[frame_index])
+    assert not clean_masks[0].any()
+
+
+def test_journal_drop_compacts(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = StrokeJournal(path)
+    journal.append(0, polyline_operation([1], [1], width=1, value=1))
+    journal.append(1, polyline_operation([2], [2], width=1, value=1))
+    journal.drop(0)
+    assert StrokeJournal(path).frames() == [1]
+    journal.drop(1)
+    assert not path.exists()
+
+
+def test_journal_skips_cut_off_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = StrokeJournal(path)
+    journal.append(0, polyline_operation([1], [1], width=1, value=1))
+    journal.close()
+    with open(path, "a") as file:
+        file.write('{"frame": 1, "op": "poly')
+    recovered = StrokeJournal(path)
+    assert recovered.frames() == [0]
+    recovered.append(2, polyline_operation([1], [1], width=1, value=1))
+    assert StrokeJournal(path).frames() == [0, 2]
+
+
+def test_journal_per_annotator(tmp_path):
+    dataset = ArrayData(3, (4, 4), dataset_path=tmp_path)
+    alice = StrokeJournal.for_dataset(dataset, owner="alice@host:12")
+    bob = StrokeJournal.for_dataset(dataset, owner="bob@host:34")
+    assert alice.path != bob.path and ":" not in alice.path.name
+    alice.append(0, polyline_operation([1], [1], width=1, value=1))
+    bob.append(1, polyline_operation([2], [2], width=1, value=1))
+    alice.drop(0)  # does not rewrite the journal of bob
+    assert StrokeJournal.for_dataset(dataset, owner="bob@host:34").frames() == [1]
+    assert StrokeJournal.for_dataset(dataset, owner="alice@host:12").frames() == []
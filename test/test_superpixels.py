@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from simpleseg.data.mask_ops import apply_operation, pixels_operation
+from simpleseg.data.superpixels import SuperpixelCache, Superpixels, SuperpixelSettings, compute_superpixels
+
+
+def make_labels():
+    labels = np.full((6, 8), 5)  # labels with gaps are relabelled
+    labels[1:3, 2:5] = 9
+    labels[4, 7] = 2
+    return labels
+
+
+def test_superpixels_apply():
+    superpixels = Superpixels(make_labels())
+    assert len(superpixels) == 3
+    mask = np.zeros((6, 8), dtype=int)
+    region = superpixels.apply(mask, x=3, y=2, value=2)
+    assert region == (slice(1, 3), slice(2, 5))
+    assert np.array_equal(mask == 2, make_labels() == 9)
+    assert superpixels.apply(mask, x=7, y=4, value=1) == (slice(4, 5), slice(7, 8))
+    assert mask[4, 7] == 1
+    assert superpixels.region(superpixels.label_at(0, 0)) == (slice(0, 6), slice(0, 8))
+
+
+def test_superpixels_selection_operation():
+    superpixels = Superpixels(make_labels())
+    mask = np.zeros((6, 8), dtype=int)
+    superpixels.apply(mask, x=0, y=0, value=3)
+    replayed = np.zeros_like(mask)
+    apply_operation(replayed, pixels_operation(*superpixels.selection(x=0, y=0), value=3))
+    assert np.array_equal(replayed, mask)
+
+
+@pytest.mark.parametrize("method", ["slic", "felzenszwalb"])
+def test_compute_superpixels(method):
+    img = np.zeros((40, 40))
+    img[10:30, 10:30] = 1.0
+    superpixels = compute_superpixels(img, SuperpixelSettings(method=method, n_segments=16, min_size=10))
+    assert superpixels.shape == img.shape
+    assert len(superpixels) > 1
+    # no superpixel crosses the edge of the square
+    square = superpixels.labels[15, 15]
+    assert np.all(img[superpixels.labels == square] == 1.0)
+
+
+def test_superpixel_cache():
+    superpixels = Superpixels(make_labels())
+    cache = SuperpixelCache(max_bytes=2 * superpixels.nbytes)
+    settings = SuperpixelSettings()
+    for index in range(3):
+        cache.put((index, settings), superpixels)
+    assert (0, settings) not in cache
+    assert cache.get((2, settings)) is superpixels
+    assert cache.get((2, SuperpixelSettings(n_segments=10))) is None
+    assert cache.n_bytes == 2 * superpixels.nbytes
+
+    cache = SuperpixelCache(max_bytes=1)
+    cache.put((0, settings), superpixels)
+    assert cache.get((0, settings)) is superpixels  # the last entry is kept
@@ -0,0 +1,50 @@
+import numpy as np
+
+from simpleseg.gui.thumbnails import ThumbnailCache, make_thumbnail
+
+
+def test_make_thumbnail():
+    img = np.random.default_rng(0).random((300, 200))
+    mask = np.zeros((300, 200), dtype=int)
+    mask[:100] = 2
+    thumbnail = make_thumbnail(img, mask, max_size=64)
+    assert thumbnail.dtype == np.uint8
+    assert thumbnail.shape[2] == 3
+    assert max(thumbnail.shape[:2]) <= 64
+
+
+def test_thumbnail_cache_lru():
+    cache = ThumbnailCache(max_entries=2)
+    for index in range(3):
+        assert cache.put(index, np.full((4, 4, 3), index, dtype=np.uint8), generation=0)
+    assert cache.get(0) is None
+    assert cache.get(2) is not None
+
+
+def test_thumbnail_cache_invalidate(tmp_path):
+    cache = ThumbnailCache(cache_dir=tmp_path)
+    thumbnail = np.zeros((4, 4, 3), dtype=np.uint8)
+    generation = cache.generation(5)
+    cache.invalidate(5)
+    assert not cache.put(5, thumbnail, generation)  # rendered before the mask changed
+    assert cache.put(5, thumbnail, cache.generation(5), mask_time=1.0)
+    assert ThumbnailCache(cache_dir=tmp_path).get(5, mask_time=1.0) is not None
+
+    cache.invalidate(5)
+    assert cache.get(5, mask_time=1.0) is None
+    assert ThumbnailCache(cache_dir=tmp_path).get(5, mask_time=1.0) is None
+
+
+def test_thumbnail_cache_mask_time(tmp_path):
+    cache = ThumbnailCache(cache_dir=tmp_path)
+    thumbnail = np.zeros((4, 4, 3), dtype=np.uint8)
+    assert cache.put(3, thumbnail, generation=0, mask_time=1.0)
+    # the mask was changed outside the session
+    assert ThumbnailCache(cache_dir=tmp_path).get(3, mask_time=2.0) is None
+    assert ThumbnailCache(cache_dir=tmp_path).get(3) is None
+    assert cache.get(3, mask_time=2.0) is None
+
+    # thumbnails of unsaved masks stay in memory only
+    assert cache.put(4, thumbnail, generation=0)
+    assert cache.get(4) is not None
+    assert ThumbnailCache(cache_dir=tmp_path).get(4, mask_time=1.0) is None
@@ -0,0 +1,114 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from simpleseg.data.remap import remap_classes
+from simpleseg.data.tiff_data import (
+    MaskTiffStore,
+    TiffPageReader,
+    TiffStackData,
+    load_tiff_page_offsets,
+    scan_tiff_page_offsets,
+)
+from simpleseg.validation.data_validation import validate_image_specs, validate_mask_specs
+
+N_PAGES = 12
+SHAPE = (20, 30)
+
+
+def write_stack(path: Path, **kwargs) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    pages = [rng.integers(0, 256, SHAPE, dtype=np.uint8) for _ in range(N_PAGES)]
+    images = [Image.fromarray(page) for page in pages]
+    images[0].save(path, save_all=True, append_images=images[1:], **kwargs)
+    return pages
+
+
+def test_tiff_page_offsets(tmp_path):
+    path = tmp_path / "stack.tif"
+    write_stack(path)
+    offsets = scan_tiff_page_offsets(path)
+    assert len(offsets) == N_PAGES
+    assert np.all(load_tiff_page_offsets(path) == offsets)
+    assert (tmp_path / "stack.tif.pageindex.npz").is_file()
+
+
+def test_tiff_stack_random_access(tmp_path):
+    path = tmp_path / "stack.tif"
+    pages = write_stack(path)
+    dataset = TiffStackData(path, name="stack")
+    assert len(dataset) == N_PAGES
+    for index in (9, 2, 11, 0):
+        img = dataset.get_image(index)
+        assert validate_image_specs(img)
+        assert np.allclose(img, pages[index] / 255)
+
+
+def test_tiff_stack_mask_dir(tmp_path):
+    path = tmp_path / "stack.tif"
+    write_stack(path)
+    dataset = TiffStackData(path, name="stack")
+    assert validate_mask_specs(dataset.get_mask(4))
+    assert dataset.get_mask(4).max() == 0
+
+    mask = np.zeros(SHAPE, dtype=int)
+    mask[5:10, 3:8] = 2
+    dataset.save_mask(mask, 4)
+    assert (tmp_path / "stack_masks" / "stack-frame-00004.png").is_file()
+    assert np.array_equal(dataset.get_mask(4), mask)
+
+
+def test_tiff_stack_mask_tiff(tmp_path):
+    path = tmp_path / "stack.tif"
+    write_stack(path)
+    mask_path = tmp_path / "stack_masks.tif"
+    dataset = TiffStackData(path, name="stack", mask_tiff_path=mask_path)
+    assert mask_path.is_file()
+
+    mask = np.zeros(SHAPE, dtype=int)
+    mask[2:4] = 3
+    dataset.save_mask(mask, 7)
+    dataset.save_mask(mask * 0 + 1, 8)
+    assert np.array_equal(dataset.get_mask(7), mask)
+    assert np.all(dataset.get_mask(8) == 1)
+    assert dataset.get_mask(6).max() == 0
+
+    reopened = TiffStackData(path, name="stack", mask_tiff_path=mask_path)
+    assert np.array_equal(reopened.get_mask(7), mask)
+
+
+def test_tiff_stack_mask_archive_remap(tmp_path):
+    path = tmp_path / "stack.tif"
+    write_stack(path)
+    archive_path = tmp_path / "stack_masks.ssma"
+    dataset = TiffStackData(path, name="stack", mask_archive_path=archive_path)
+    for index in range(N_PAGES):
+        dataset.save_mask(np.full(SHAPE, index % 3), index)
+
+    remap_classes(dataset, {2: 1}, n_workers=4)
+    for masks in (dataset, TiffStackData(path, name="stack", mask_archive_path=archive_path)):
+        for index in range(N_PAGES):
+            assert np.all(masks.get_mask(index) == [0, 1, 1][index % 3])
+
+
+def test_tiff_page_reader_compressed(tmp_path):
+    path = tmp_path / "stack.tif"
+    pages = write_stack(path, compression="tiff_lzw")
+    reader = TiffPageReader(path)
+    assert reader.get_strips(5) is None  # decoded by PIL
+    for index in (9, 2, 11):
+        assert np.array_equal(reader.read_page(index), pages[index])
+
+    uncompressed = TiffPageReader(MaskTiffStore(tmp_path / "masks.tif", N_PAGES, SHAPE).tiff_path)
+    strips = uncompressed.get_strips(5)
+    assert strips is not None and strips.shape == SHAPE and strips.dtype == np.uint8
+
+
+def test_mask_tiff_store_compressed(tmp_path):
+    mask_path = tmp_path / "masks.tif"
+    write_stack(mask_path, compression="tiff_lzw")
+    store = MaskTiffStore(mask_path, N_PAGES, SHAPE)
+    with pytest.raises(ValueError):
+        store.write(np.zeros(SHAPE, dtype=int), 3)
@@ -0,0 +1,40 @@
+from simpleseg.gui.tk_worker import TkWorker
+
+
+class FakeRoot:
+    """collects after() callbacks, run() executes the pending ones"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, func):
+        self.callbacks.append(func)
+
+    def run(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for func in callbacks:
+            func()
+
+
+def fail(message):
+    raise RuntimeError(message)
+
+
+def test_tk_worker_survives_failing_callbacks():
+    root = FakeRoot()
+    worker = TkWorker(root)
+    results = []
+    worker.submit(lambda: 1, on_done=fail)
+    worker.submit(fail, "task", on_done=results.append, on_error=lambda exception: fail("on_error"))
+    worker.submit(lambda: 3, on_done=results.append)
+    worker.drain()
+    root.run()
+    assert results == [3]
+    assert not worker.busy and not worker.polling
+
+    # polling starts again for later tasks
+    worker.submit(lambda: 4, on_done=results.append)
+    worker.drain()
+    root.run()
+    assert results == [3, 4]
+    worker.shutdown()
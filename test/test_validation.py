@@ -0,0 +1,57 @@
+import json
+from typing import Any
+
+import numpy as np
+import pytest
+from conftest import ArrayData
+
+from simpleseg.validation.dataclass_validation import validate_data, validate_frames
+
+SHAPE = (16, 16)
+
+
+def broken_data(broken: dict[int, str]) -> ArrayData:
+    """frames with an image of an invalid dtype, a mask of another shape or an image that cannot be read"""
+    images: dict[int, Any] = {index: np.zeros(SHAPE, dtype=np.int64) for index in broken if broken[index] == "dtype"}
+    images.update({index: FileNotFoundError("missing") for index in broken if broken[index] == "raise"})
+    masks = {index: np.zeros((8, 8), dtype=int) for index in broken if broken[index] == "shape"}
+    return ArrayData(6, SHAPE, images, masks)
+
+
+@pytest.mark.parametrize("n_workers", [0, 2])
+def test_validate_frames(n_workers):
+    report = validate_frames(broken_data({1: "dtype", 3: "shape", 4: "raise"}), n_workers=n_workers)
+    assert not report.ok
+    assert sorted(report.frame_errors) == [1, 3, 4]
+    assert "dtype=int64" in report.frame_errors[1][0]
+    assert "shape mismatch" in report.frame_errors[3][0]
+    assert "FileNotFoundError" in report.frame_errors[4][0]
+    assert "3 of 6 frames passed" in report.summary()
+
+
+def test_validate_frames_reference_shape():
+    # the shapes are compared with the first frame that passed, frame 0 cannot be read
+    dataset = broken_data({0: "raise"})
+    dataset.images[3] = np.zeros((8, 16))
+    report = validate_frames(dataset, n_workers=0)
+    assert sorted(report.frame_errors) == [0, 3]
+    assert "differs from frame 1" in report.frame_errors[3][-1]
+
+
+def test_validate_frames_resume(tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.jsonl"
+    validate_frames(broken_data({2: "dtype"}), n_workers=0, checkpoint_path=checkpoint_path)
+    assert len(checkpoint_path.read_text().splitlines()) == 6
+
+    # frames in the checkpoint are not loaded again
+    report = validate_frames(broken_data({2: "raise"}), n_workers=0, checkpoint_path=checkpoint_path)
+    assert "dtype=int64" in report.frame_errors[2][0]
+    assert len(checkpoint_path.read_text().splitlines()) == 6
+
+
+def test_validate_data_deep(tmp_path):
+    validate_data(broken_data({}), deep=True, n_workers=0)
+    report_path = tmp_path / "report.json"
+    with pytest.raises(Exception):
+        validate_data(broken_data({5: "shape"}), deep=True, n_workers=0, report_path=report_path)
+    assert list(json.loads(report_path.read_text())["frame_errors"]) == ["5"]
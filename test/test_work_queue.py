@@ -0,0 +1,73 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from simpleseg.data.work_queue import WorkQueue
+
+
+def test_claims_are_exclusive(tmp_path):
+    alice, bob = WorkQueue(tmp_path, owner="alice"), WorkQueue(tmp_path, owner="bob")
+    assert alice.claim_batch(range(10), 3) == [0, 1, 2]
+    assert bob.claim_batch(range(10), 3) == [3, 4, 5]
+    assert not bob.claim(1)
+    assert alice.claim(1)  # own lease
+    assert bob.owner_of(1) == "alice"
+    assert bob.is_leased_by_other(1)
+    assert not alice.is_leased_by_other(1)
+
+
+def test_concurrent_claims_do_not_overlap(tmp_path):
+    queues = [WorkQueue(tmp_path, owner=f"annotator-{i}") for i in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        batches = list(executor.map(lambda queue: queue.claim_batch(range(40), 10), queues))
+    claimed = [index for batch in batches for index in batch]
+    assert sorted(claimed) == list(range(40))
+
+
+def test_release(tmp_path):
+    alice, bob = WorkQueue(tmp_path, owner="alice"), WorkQueue(tmp_path, owner="bob")
+    alice.claim(0)
+    bob.release(0)  # not the owner, nothing happens
+    assert alice.owner_of(0) == "alice"
+    alice.release(0)
+    assert alice.claimed == set()
+    assert bob.claim(0)
+    bob.claim(1)
+    bob.release_all()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    crashed = WorkQueue(tmp_path, owner="crashed", lease_duration=-1.0)
+    crashed.claim(0)
+    bob = WorkQueue(tmp_path, owner="bob")
+    assert bob.owner_of(0) is None
+    assert bob.claim(0)
+    assert bob.owner_of(0) == "bob"
+    assert crashed.renew() == [0]
+    assert crashed.claimed == set()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["000000.lease"]
+
+
+def test_renew_extends_the_lease(tmp_path):
+    alice = WorkQueue(tmp_path, owner="alice", lease_duration=60.0)
+    alice.claim(0)
+    expires = json.loads(alice.lease_path(0).read_text())["expires"]
+    time.sleep(0.01)
+    assert alice.renew() == []
+    assert json.loads(alice.lease_path(0).read_text())["expires"] > expires
+
+
+def test_unreadable_lease_counts_until_it_expires(tmp_path):
+    bob = WorkQueue(tmp_path, owner="bob")
+    bob.lease_path(0).write_text("")  # being written by another annotator
+    assert bob.owner_of(0) == ""
+    assert not bob.claim(0)
+
+
+def test_disabled_queue(tmp_path):
+    queue = WorkQueue(None)
+    assert not queue.enabled
+    assert queue.claim(0)
+    assert queue.owner_of(0) is None
+    assert queue.renew() == []